@@ -1,40 +1,108 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
 from app.core.x402 import verify_x402_payment
-from app.core.contracts import Contracts
+from app.core.contracts import Contracts, SendUnconfirmed
+from app.models.bet import QuoteRecord
+from app.services.market_manager import MarketManager
+from app.services.mint_pipeline import MintPipeline
+from app.services.quotes import get_quote_store
 from app.services.redis import publish_market_update
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import os
 
 router = APIRouter()
 contracts = Contracts()
+market_mgr = MarketManager()
+
+# How long confirm waits for the mint before answering 202 "queued"
+MINT_WAIT_SECONDS = float(os.getenv("MINT_WAIT_SECONDS", "5"))
+
+async def mint_quote(quote: QuoteRecord) -> str:
+    return await contracts.mint_position(
+        quote.quote_id,
+        quote.market_id,
+        quote.side,
+        quote.stake,  # 6-decimal base units
+        int(round(quote.odds * 10**18)),  # 18-decimal fixed point
+        quote.wallet or "0xUserWallet"
+    )
+
+async def settle_mint(quote: QuoteRecord, tx_hash: Optional[str], error: Optional[BaseException]):
+    """Hand back the committed exposure of mints that failed, and tell the frontend"""
+    if error is None:
+        await publish_market_update(quote.quote_id, {"status": "confirmed", "tx_hash": tx_hash})
+    elif isinstance(error, SendUnconfirmed):
+        # May still be mined: keep the exposure rather than understate it
+        print(f"⚠️ Mint of quote {quote.quote_id} unconfirmed: {error.tx_hash}")
+        await publish_market_update(quote.quote_id, {"status": "unconfirmed", "tx_hash": error.tx_hash})
+    else:
+        print(f"❌ Mint failed for quote {quote.quote_id}: {error}")
+        await market_mgr.refund_exposure(quote.market_id, quote.side, quote.stake)
+        await publish_market_update(quote.quote_id, {"status": "failed"})
+
+mint_pipeline = MintPipeline(
+    mint_quote,
+    on_settled=settle_mint,
+    concurrency=int(os.getenv("MINT_CONCURRENCY", "4")),
+    # Only retry mints that never reached the node; see Contracts._send
+    retryable=lambda error: not isinstance(error, SendUnconfirmed),
+    maxsize=int(os.getenv("MINT_QUEUE_SIZE", "1000")),
+)
 
 class ConfirmBet(BaseModel):
     quote_id: str
 
 @router.post("/confirm")
-async def confirm_bet(confirm: ConfirmBet, background_tasks: BackgroundTasks):
+async def confirm_bet(confirm: ConfirmBet):
     """Confirm bet after x402 payment"""
     
-    # Verify payment
+    quote = await get_quote_store().get(confirm.quote_id)
+    if quote is None:
+        # Expired or unknown: hand back any exposure it still holds
+        await market_mgr.release_exposure(confirm.quote_id)
+        raise HTTPException(410, "Quote expired or not found")
+    
+    # Verify payment; an unpaid quote stays confirmable until it expires
     payment = await verify_x402_payment(confirm.quote_id)
     if not payment["paid"]:
         raise HTTPException(400, "Payment not verified")
     
-    # Mint position token
-    tx_hash = contracts.mint_position(
-        confirm.quote_id, 
-        "next-point-123", 
-        "home", 
-        10000000000000000,  # 0.01 CRO
-        1920000000000000000,  # 1.92 odds
-        "0xUserWallet"
-    )
+    # Taking the quote removes it, so a quote can only be confirmed once
+    if await get_quote_store().take(confirm.quote_id) is None:
+        raise HTTPException(410, "Quote expired or already confirmed")
     
-    # Notify frontend
-    background_tasks.add_task(
-        publish_market_update, 
-        confirm.quote_id, 
-        {"status": "confirmed", "tx_hash": tx_hash}
-    )
+    # Keep the stake now: the mint can wait in the queue or retry for longer
+    # than the reservation's TTL, and the sweep would hand it back meanwhile
+    if not await market_mgr.commit_exposure(confirm.quote_id):
+        raise HTTPException(410, "Quote expired")
+    
+    # Mint position token (queued; workers bound concurrent submissions)
+    try:
+        minted = mint_pipeline.submit(quote)
+    except asyncio.QueueFull:
+        await market_mgr.refund_exposure(quote.market_id, quote.side, quote.stake)
+        raise HTTPException(503, "Mint queue full", headers={"Retry-After": "5"})
+    
+    try:
+        tx_hash = await asyncio.wait_for(asyncio.shield(minted), MINT_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        # Still queued or in flight; the outcome is published as a market update
+        return JSONResponse({
+            "success": True,
+            "position_id": confirm.quote_id,
+            "status": "queued"
+        }, status_code=202)
+    except SendUnconfirmed as e:
+        return JSONResponse({
+            "success": True,
+            "position_id": confirm.quote_id,
+            "status": "unconfirmed",
+            "tx_hash": e.tx_hash
+        }, status_code=202)
+    except Exception:
+        raise HTTPException(502, "Position mint failed")
     
     return {
         "success": True,
@@ -1,202 +1,223 @@
-from fastapi import APIRouter, HTTPException
-from app.models.prediction import PredictionMarket, VoteRequest, VoteResponse
-from app.services.redis import redis_client, publish_vote_update
-from typing import List, Optional
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.models.prediction import PredictionMarket, VoteRequest, VoteResponse, VoteBatchRequest, VoteBatchResponse
+from app.models.money import percent_tenths, to_usdt
+from app.services.redis import publish_vote_update
+from app.services.database import acquire_connection, get_db
+from app.services.market_cache import LIST_KEY, market_cache, market_key, stats_key
+from app.services.export import MEDIA_TYPES, NDJSON, VOTES, export_slots, stream_export
+from app.services.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.services.pool_snapshots import RESOLUTIONS, bucket_start
+from app.services.votes import ANONYMOUS_WALLET, MarketNotActive, PendingVote, apply_vote, apply_vote_batch, next_vote_seq, publish_pool_updates
+from app.services.vote_queue import vote_queue
+from typing import Dict, List, Literal, Optional
+from datetime import datetime, timedelta, timezone
 import uuid
 import asyncpg
-import os
+import hashlib
 import json
+import os
 
 router = APIRouter()
 
-# Database connection
-async def get_db():
-    """Get database connection"""
-    database_url = os.getenv("DATABASE_URL")
-    if not database_url:
-        raise Exception("DATABASE_URL not configured")
-    return await asyncpg.connect(database_url)
-
-# Helper functions
-def usdt_to_bigint(amount: float) -> int:
-    """Convert USDT float to BigInt (6 decimals)"""
-    return int(amount * 1_000_000)
+# Vote counts come from the denormalized "totalBets" column, kept in step
+# with "Vote" by the place_vote statement (see 003_add_market_total_bets.sql)
+MARKET_COLUMNS = '''
+    "marketId", question, status, winner,
+    "yesPool", "noPool", "totalBets", "startDate", "endDate", version
+'''
 
-def bigint_to_usdt(amount: int) -> float:
-    """Convert BigInt to USDT float"""
-    return amount / 1_000_000
-
-async def get_market_from_db(conn: asyncpg.Connection, market_id: str) -> Optional[PredictionMarket]:
-    """Fetch market from database and convert to PredictionMarket model"""
-    row = await conn.fetchrow(
-        '''
-        SELECT 
-            "marketId", question, status, winner,
-            "yesPool", "noPool", "startDate", "endDate"
-        FROM "Market"
-        WHERE "marketId" = $1
-        ''',
-        market_id
-    )
-    
-    if not row:
-        return None
-    
-    # Calculate total bets count
-    total_bets = await conn.fetchval(
-        'SELECT COUNT(*) FROM "Vote" WHERE "marketId" = $1',
-        market_id
-    ) or 0
-    
+def row_to_market(row: asyncpg.Record) -> PredictionMarket:
+    """Convert a "Market" row to the PredictionMarket model"""
     return PredictionMarket(
         id=row['marketId'],
         question=row['question'],
         status=row['status'],
         winner=row['winner'],
-        yes_pool=bigint_to_usdt(row['yesPool']),
-        no_pool=bigint_to_usdt(row['noPool']),
-        total_bets=total_bets,
+        yes_pool=row['yesPool'],
+        no_pool=row['noPool'],
+        total_bets=row['totalBets'],
         start_date=row['startDate'],
         end_date=row['endDate'],
         category="Crypto",
         icon="🏆"
     )
 
+MARKET_BY_ID_SQL = f'SELECT {MARKET_COLUMNS} FROM "Market" WHERE "marketId" = $1'
+MARKETS_BY_ID_SQL = f'SELECT {MARKET_COLUMNS} FROM "Market" WHERE "marketId" = ANY($1::text[])'
+
+async def get_market_from_db(conn: asyncpg.Connection, market_id: str) -> Optional[PredictionMarket]:
+    """Fetch market from database and convert to PredictionMarket model"""
+    row = await conn.fetchrow(MARKET_BY_ID_SQL, market_id)
+    return row_to_market(row) if row else None
+
+# Browsers revalidate every time (cheap 304s); shared caches/CDNs may serve
+# the list for a few seconds and keep serving it while they revalidate
+MARKET_LIST_CACHE_CONTROL = os.getenv(
+    "MARKET_LIST_CACHE_CONTROL", "public, max-age=0, s-maxage=5, stale-while-revalidate=30"
+)
+MARKET_CACHE_CONTROL = "no-cache"
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def body_etag(body) -> str:
+    """Strong ETag from the JSON a response would carry"""
+    digest = hashlib.sha1(json.dumps(body, separators=(",", ":"), sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+# The read endpoints below go through the read-through market cache
+# (services/market_cache.py) and only take a connection on a miss; their
+# cached bodies are the JSON the response models would produce, stored
+# with their ETag so a matching If-None-Match is answered from the cache.
 @router.get("/markets", response_model=List[PredictionMarket])
-async def get_markets():
+async def get_markets(request: Request):
     """Get all prediction markets"""
-    conn = await get_db()
-    try:
-        rows = await conn.fetch(
-            '''
-            SELECT 
-                "marketId", question, status, winner,
-                "yesPool", "noPool", "startDate", "endDate"
-            FROM "Market"
-            ORDER BY "createdAt" DESC
-            '''
-        )
-        
-        markets = []
-        for row in rows:
-            # Get vote count for each market
-            total_bets = await conn.fetchval(
-                'SELECT COUNT(*) FROM "Vote" WHERE "marketId" = $1',
-                row['marketId']
-            ) or 0
-            
-            markets.append(PredictionMarket(
-                id=row['marketId'],
-                question=row['question'],
-                status=row['status'],
-                winner=row['winner'],
-                yes_pool=bigint_to_usdt(row['yesPool']),
-                no_pool=bigint_to_usdt(row['noPool']),
-                total_bets=total_bets,
-                start_date=row['startDate'],
-                end_date=row['endDate'],
-                category="Crypto",
-                icon="🏆"
-            ))
-        
-        return markets
-    finally:
-        await conn.close()
+    # Markets can be added outside the API (seed_data.py) without a version
+    # bump, so the list is tagged by its content rather than by versions
+    async def load():
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(
+                f'SELECT {MARKET_COLUMNS} FROM "Market" ORDER BY "createdAt" DESC'
+            )
+        body = [row_to_market(row).model_dump(mode="json") for row in rows]
+        return {"etag": body_etag(body), "body": body}
+
+    cached = await market_cache.get_or_load(LIST_KEY, load)
+    if etag_matches(request, cached["etag"]):
+        return not_modified(cached["etag"], MARKET_LIST_CACHE_CONTROL)
+    return JSONResponse(
+        cached["body"],
+        headers={"ETag": cached["etag"], "Cache-Control": MARKET_LIST_CACHE_CONTROL}
+    )
 
 @router.get("/markets/{market_id}", response_model=PredictionMarket)
-async def get_market(market_id: str):
+async def get_market(market_id: str, request: Request):
     """Get a specific prediction market by ID"""
-    conn = await get_db()
-    try:
-        market = await get_market_from_db(conn, market_id)
-        if not market:
-            raise HTTPException(status_code=404, detail="Market not found")
-        return market
-    finally:
-        await conn.close()
+    # Tagged with the row's version (bumped by a trigger on every UPDATE,
+    # see 011_market_version.sql) and cached with the body, so a matching
+    # If-None-Match is answered from the cache for as long as the body is
+    async def load():
+        async with acquire_connection() as conn:
+            row = await conn.fetchrow(MARKET_BY_ID_SQL, market_id)
+        if row is None:
+            return None
+        return {"etag": f'"{market_id}.{row["version"]}"', "body": row_to_market(row).model_dump(mode="json")}
+
+    cached = await market_cache.get_or_load(market_key(market_id), load)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Market not found")
+    if etag_matches(request, cached["etag"]):
+        return not_modified(cached["etag"], MARKET_CACHE_CONTROL)
+    return JSONResponse(cached["body"], headers={"ETag": cached["etag"], "Cache-Control": MARKET_CACHE_CONTROL})
+
+def validate_open_market(market: Optional[PredictionMarket]):
+    """Raise unless `market` exists and is still taking votes"""
+    # Validate market exists
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+
+    # Validate market is active
+    if market.status != "ACTIVE":
+        raise HTTPException(status_code=400, detail="Market is not active")
+
+    # Validate market hasn't ended
+    if datetime.utcnow() > market.end_date:
+        raise HTTPException(status_code=400, detail="Market has ended")
 
 @router.post("/vote", response_model=VoteResponse)
-async def place_vote(vote: VoteRequest):
+async def place_vote(vote: VoteRequest, conn: asyncpg.Connection = Depends(get_db)):
     """Place a YES/NO vote on a prediction market"""
-    conn = await get_db()
     try:
-        # Validate market exists
         market = await get_market_from_db(conn, vote.market_id)
-        if not market:
-            raise HTTPException(status_code=404, detail="Market not found")
+        validate_open_market(market)
 
-        # Validate market is active
-        if market.status != "ACTIVE":
-            raise HTTPException(status_code=400, detail="Market is not active")
+        pending = PendingVote(
+            vote_id=str(uuid.uuid4()),
+            market_id=vote.market_id,
+            wallet=vote.wallet or ANONYMOUS_WALLET,
+            choice=vote.choice,
+            amount=vote.amount
+        )
 
-        # Validate market hasn't ended
-        if datetime.utcnow() > market.end_date:
-            raise HTTPException(status_code=400, detail="Market has ended")
-
-        # Convert amount to BigInt
-        amount_bigint = usdt_to_bigint(vote.amount)
-
-        # Start transaction for atomic operations
-        async with conn.transaction():
-            # Upsert vote (insert or update if wallet already voted)
-            vote_id = str(uuid.uuid4())
-            
-            await conn.execute(
-                '''
-                INSERT INTO "Vote" ("voteId", "marketId", "walletAddress", choice, amount, "createdAt", "updatedAt")
-                VALUES ($1, $2, $3, $4, $5, NOW(), NOW())
-                ON CONFLICT ("marketId", "walletAddress") 
-                DO UPDATE SET
-                    choice = EXCLUDED.choice,
-                    amount = EXCLUDED.amount,
-                    "updatedAt" = NOW()
-                ''',
-                vote_id,
-                vote.market_id,
-                vote.wallet or "0x0000000000000000000000000000000000000000",
-                vote.choice,
-                amount_bigint
-            )
+        # Write-behind mode: the vote writer applies it and publishes the
+        # real pools; the response estimates them as if the wallet had no
+        # earlier vote. Falls through to a direct write if Redis is down.
+        # Queued votes take their sequence number now, direct writes when
+        # the upsert runs.
+        if vote_queue.enabled:
+            try:
+                pending = pending._replace(seq=await next_vote_seq(conn))
+                await vote_queue.enqueue(pending)
+                side = "yes_pool" if vote.choice == "YES" else "no_pool"
+                estimate = market.model_copy(update={side: getattr(market, side) + vote.amount})
+                return VoteResponse(
+                    success=True,
+                    status="queued",
+                    vote_id=pending.vote_id,
+                    market_id=vote.market_id,
+                    choice=vote.choice,
+                    amount=vote.amount,
+                    new_yes_pool=estimate.yes_pool,
+                    new_no_pool=estimate.no_pool,
+                    yes_percent=estimate.yes_percent,
+                    no_percent=estimate.no_percent
+                )
+            except Exception as e:
+                print(f"⚠️  Vote queue unavailable, writing directly: {e}")
 
-            # ✅ FIXED: Manually recalculate pools from ALL votes
-            pool_data = await conn.fetchrow(
-                '''
-                SELECT
-                    COALESCE(SUM(CASE WHEN choice = 'YES' THEN amount ELSE 0 END), 0) as yes_total,
-                    COALESCE(SUM(CASE WHEN choice = 'NO' THEN amount ELSE 0 END), 0) as no_total
-                FROM "Vote"
-                WHERE "marketId" = $1
-                ''',
-                vote.market_id
-            )
+        # Upsert the vote and move the pools by (new vote - replaced vote)
+        # in a single statement; the response is built from RETURNING
+        try:
+            pools = await apply_vote(conn, pending)
+        except MarketNotActive:
+            # Resolved after the check above
+            raise HTTPException(status_code=400, detail="Market is not active")
 
-            # Update Market table with recalculated pools
-            await conn.execute(
-                '''
-                UPDATE "Market"
-                SET 
-                    "yesPool" = $1,
-                    "noPool" = $2,
-                    "updatedAt" = NOW()
-                WHERE "marketId" = $3
-                ''',
-                pool_data['yes_total'],
-                pool_data['no_total'],
-                vote.market_id
+        vote_id = pools['voteId']
+        updated_market = market.model_copy(update={
+            "yes_pool": pools['yesPool'],
+            "no_pool": pools['noPool'],
+            "total_bets": pools['totalBets']
+        })
+
+        if not pools['applied']:
+            # A newer vote from this wallet is stored; nothing was written
+            return VoteResponse(
+                success=True,
+                status="superseded",
+                vote_id=vote_id,
+                market_id=vote.market_id,
+                choice=pools['choice'],
+                amount=pools['amount'],
+                new_yes_pool=updated_market.yes_pool,
+                new_no_pool=updated_market.no_pool,
+                yes_percent=updated_market.yes_percent,
+                no_percent=updated_market.no_percent
             )
 
-        # Fetch updated market data
-        updated_market = await get_market_from_db(conn, vote.market_id)
+        await market_cache.invalidate(vote.market_id)
 
         # ✅ Publish vote update to Redis for WebSocket
-        if redis_client:
-            await publish_vote_update(
-                market_id=vote.market_id,
-                choice=vote.choice,
-                amount=vote.amount,
-                wallet=vote.wallet or "anonymous"
-            )
+        await publish_vote_update(vote.market_id, {
+            "timestamp": int(datetime.utcnow().timestamp()),
+            "yes_pool": updated_market.yes_pool,
+            "no_pool": updated_market.no_pool,
+            "yes_percent": updated_market.yes_percent_tenths,
+            "no_percent": updated_market.no_percent_tenths,
+            "total_voters": updated_market.total_bets,
+            "choice": vote.choice,
+            "amount": vote.amount,
+            "wallet": vote.wallet or "anonymous"
+        })
 
         return VoteResponse(
             success=True,
@@ -214,17 +235,90 @@ async def place_vote(vote: VoteRequest):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to place vote: {str(e)}")
-    finally:
-        await conn.close()
+
+def vote_response(vote: PendingVote, stored: Dict, market: PredictionMarket) -> VoteResponse:
+    """Batch response entry; a superseded vote reports the newer one stored instead"""
+    applied = stored['applied']
+    return VoteResponse(
+        success=True,
+        status="applied" if applied else "superseded",
+        vote_id=stored['vote_id'],
+        market_id=vote.market_id,
+        choice=vote.choice if applied else stored['choice'],
+        amount=vote.amount if applied else stored['amount'],
+        new_yes_pool=market.yes_pool,
+        new_no_pool=market.no_pool,
+        yes_percent=market.yes_percent,
+        no_percent=market.no_percent
+    )
+
+@router.post("/votes:batch", response_model=VoteBatchResponse)
+async def place_votes(batch: VoteBatchRequest, conn: asyncpg.Connection = Depends(get_db)):
+    """
+    Place many votes at once; all or nothing
+
+    Each distinct market is checked once, every vote is written by a single
+    multi-row upsert, and each affected market gets one pool update (its
+    last vote in the batch). A wallet voting twice on a market keeps its
+    last vote, as with repeated calls to /vote.
+    """
+    try:
+        market_ids = sorted({vote.market_id for vote in batch.votes})
+        rows = await conn.fetch(MARKETS_BY_ID_SQL, market_ids)
+        markets = {row['marketId']: row_to_market(row) for row in rows}
+        for market_id in market_ids:
+            try:
+                validate_open_market(markets.get(market_id))
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"{e.detail}: {market_id}")
+
+        # Sequence numbers are taken as the upsert runs; coalesce_votes keeps
+        # a wallet's last vote in the batch
+        pending = [
+            PendingVote(
+                vote_id=str(uuid.uuid4()),
+                market_id=vote.market_id,
+                wallet=vote.wallet or ANONYMOUS_WALLET,
+                choice=vote.choice,
+                amount=vote.amount
+            )
+            for vote in batch.votes
+        ]
+        try:
+            pools = await apply_vote_batch(conn, pending)
+        except MarketNotActive as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        await market_cache.invalidate(*pools)
+        await publish_pool_updates(pools, pending)
+
+        updated = {
+            market_id: markets[market_id].model_copy(update={
+                "yes_pool": market_pools['yes_pool'],
+                "no_pool": market_pools['no_pool'],
+                "total_bets": market_pools['total_bets']
+            })
+            for market_id, market_pools in pools.items()
+        }
+        return VoteBatchResponse(
+            success=True,
+            count=len(pending),
+            votes=[vote_response(vote, pools[vote.market_id]['votes'][vote.wallet], updated[vote.market_id]) for vote in pending]
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to place votes: {str(e)}")
 
 @router.get("/markets/{market_id}/stats")
 async def get_market_stats(market_id: str):
     """Get real-time statistics for a market"""
-    conn = await get_db()
-    try:
-        market = await get_market_from_db(conn, market_id)
+    async def load():
+        async with acquire_connection() as conn:
+            market = await get_market_from_db(conn, market_id)
         if not market:
-            raise HTTPException(status_code=404, detail="Market not found")
+            return None
 
         # Calculate time remaining
         now = datetime.utcnow()
@@ -235,76 +329,228 @@ async def get_market_stats(market_id: str):
             "market_id": market.id,
             "question": market.question,
             "status": market.status,
-            "yes_pool": market.yes_pool,
-            "no_pool": market.no_pool,
-            "total_pool": market.total_pool,
+            "yes_pool": to_usdt(market.yes_pool),
+            "no_pool": to_usdt(market.no_pool),
+            "total_pool": to_usdt(market.total_pool),
             "yes_percent": market.yes_percent,
             "no_percent": market.no_percent,
             "total_bets": market.total_bets,
             "days_remaining": days_remaining,
             "ends_in": f"{days_remaining} days"
         }
-    finally:
-        await conn.close()
+
+    stats = await market_cache.get_or_load(stats_key(market_id), load)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return stats
+
+# Vote listings page by keyset on ("createdAt", "voteId") - see
+# services/pagination.py and 007_vote_history_indexes.sql. Each query asks
+# for one row more than the page to learn whether there is a next one.
+# `offset` is still accepted for clients written before cursors; it scans
+# and skips rows like it always did, and its pages carry a cursor too.
+VOTES_PAGE_SQL = '''
+SELECT "voteId", "walletAddress", choice, amount, "createdAt"
+FROM "Vote"
+WHERE "marketId" = $1 {after}
+ORDER BY "createdAt" DESC, "voteId" DESC
+LIMIT $2 {offset}
+'''
+KEYSET_AFTER = 'AND ("createdAt", "voteId") < ($3, $4)'
+OFFSET = 'OFFSET $3'
+
+MARKET_VOTES_SQL = VOTES_PAGE_SQL.format(after="", offset="")
+MARKET_VOTES_AFTER_SQL = VOTES_PAGE_SQL.format(after=KEYSET_AFTER, offset="")
+MARKET_VOTES_OFFSET_SQL = VOTES_PAGE_SQL.format(after="", offset=OFFSET)
+
+# The page is cut from "Vote" first, so "Market" is only joined for its rows
+USER_VOTES_PAGE_SQL = '''
+WITH page AS (
+    SELECT "voteId", "marketId", choice, amount, "createdAt", "updatedAt"
+    FROM "Vote"
+    WHERE "walletAddress" = $1 {after}
+    ORDER BY "createdAt" DESC, "voteId" DESC
+    LIMIT $2 {offset}
+)
+SELECT page.*, m.question
+FROM page
+JOIN "Market" m ON m."marketId" = page."marketId"
+ORDER BY page."createdAt" DESC, page."voteId" DESC
+'''
+
+USER_VOTES_SQL = USER_VOTES_PAGE_SQL.format(after="", offset="")
+USER_VOTES_AFTER_SQL = USER_VOTES_PAGE_SQL.format(after=KEYSET_AFTER, offset="")
+USER_VOTES_OFFSET_SQL = USER_VOTES_PAGE_SQL.format(after="", offset=OFFSET)
+
+async def fetch_vote_page(
+    conn: asyncpg.Connection,
+    first_sql: str,
+    after_sql: str,
+    offset_sql: str,
+    key: str,
+    limit: int,
+    cursor: Optional[str],
+    offset: Optional[int] = None,
+):
+    """One page of votes plus the cursor of the next page (None on the last)"""
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Pass either cursor or offset, not both")
+    if cursor:
+        try:
+            created_at, vote_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        rows = await conn.fetch(after_sql, key, limit + 1, created_at, vote_id)
+    elif offset:
+        rows = await conn.fetch(offset_sql, key, limit + 1, offset)
+    else:
+        rows = await conn.fetch(first_sql, key, limit + 1)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]['createdAt'], rows[-1]['voteId'])
 
 @router.get("/users/{wallet_address}/votes")
-async def get_user_votes(wallet_address: str):
-    """Get all votes for a specific wallet address"""
-    conn = await get_db()
-    try:
-        votes = await conn.fetch(
-            '''
-            SELECT v.*, m.question
-            FROM "Vote" v
-            JOIN "Market" m ON v."marketId" = m."marketId"
-            WHERE v."walletAddress" = $1
-            ORDER BY v."createdAt" DESC
-            ''',
-            wallet_address
-        )
-        
-        return [
+async def get_user_votes(
+    wallet_address: str,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: Optional[int] = Query(None, ge=0, deprecated=True),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get a wallet's votes, newest first (pass next_cursor back for the next page)"""
+    votes, next_cursor = await fetch_vote_page(
+        conn, USER_VOTES_SQL, USER_VOTES_AFTER_SQL, USER_VOTES_OFFSET_SQL, wallet_address, limit, cursor, offset
+    )
+
+    return {
+        "votes": [
             {
                 "vote_id": row['voteId'],
                 "market_id": row['marketId'],
                 "market_question": row['question'],
                 "choice": row['choice'],
-                "amount": bigint_to_usdt(row['amount']),
+                "amount": to_usdt(row['amount']),
                 "created_at": row['createdAt'],
                 "updated_at": row['updatedAt']
             }
             for row in votes
-        ]
-    finally:
-        await conn.close()
+        ],
+        "next_cursor": next_cursor
+    }
 
 @router.get("/markets/{market_id}/votes")
-async def get_market_votes(market_id: str, limit: int = 100, offset: int = 0):
-    """Get all votes for a market (paginated)"""
-    conn = await get_db()
-    try:
-        votes = await conn.fetch(
-            '''
-            SELECT "voteId", "walletAddress", choice, amount, "createdAt"
-            FROM "Vote"
-            WHERE "marketId" = $1
-            ORDER BY "createdAt" DESC
-            LIMIT $2 OFFSET $3
-            ''',
-            market_id,
-            limit,
-            offset
-        )
-        
-        return [
+async def get_market_votes(
+    market_id: str,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    offset: Optional[int] = Query(None, ge=0, deprecated=True),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get a market's votes, newest first (pass next_cursor back for the next page)"""
+    votes, next_cursor = await fetch_vote_page(
+        conn, MARKET_VOTES_SQL, MARKET_VOTES_AFTER_SQL, MARKET_VOTES_OFFSET_SQL, market_id, limit, cursor, offset
+    )
+
+    return {
+        "votes": [
             {
                 "vote_id": row['voteId'],
                 "wallet_address": row['walletAddress'],
                 "choice": row['choice'],
-                "amount": bigint_to_usdt(row['amount']),
+                "amount": to_usdt(row['amount']),
                 "created_at": row['createdAt']
             }
             for row in votes
+        ],
+        "next_cursor": next_cursor
+    }
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Query timestamps to the naive UTC the TIMESTAMP columns hold"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/markets/{market_id}/export")
+async def export_market(
+    market_id: str,
+    kind: Literal["votes", "bets"] = VOTES,
+    fmt: Literal["ndjson", "csv"] = Query(NDJSON, alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream all of a market's votes or bets (createdAt in [since, until)) as NDJSON or CSV"""
+    if export_slots.locked():
+        raise HTTPException(status_code=503, detail="Too many exports running, try again")
+    async with acquire_connection() as conn:
+        if not await conn.fetchval('SELECT 1 FROM "Market" WHERE "marketId" = $1', market_id):
+            raise HTTPException(status_code=404, detail="Market not found")
+
+    return StreamingResponse(
+        stream_export(market_id, kind, fmt, naive_utc(since), naive_utc(until)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{market_id}-{kind}.{fmt}"'}
+    )
+
+# Odds history comes from the buckets the pool snapshot writer maintains
+# (services/pool_snapshots.py, 008_pool_snapshot_buckets.sql)
+MAX_HISTORY_POINTS = 1000
+DEFAULT_HISTORY_POINTS = 288
+
+MARKET_HISTORY_SQL = '''
+SELECT "bucketStart", "yesOpen", "yesHigh", "yesLow", "yesClose", "yesPool", "noPool", "totalBets", samples
+FROM "PoolSnapshotBucket"
+WHERE "marketId" = $1 AND resolution = $2 AND "bucketStart" >= $3 AND "bucketStart" < $4
+ORDER BY "bucketStart"
+'''
+
+@router.get("/markets/{market_id}/history")
+async def get_market_history(
+    market_id: str,
+    resolution: Literal["1m", "5m", "1h", "1d"] = "5m",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """YES percentage OHLC and closing pools per bucket in [since, until); buckets without snapshots are omitted"""
+    seconds = RESOLUTIONS[resolution]
+    until = naive_utc(until) or datetime.utcnow()
+    since = naive_utc(since) or until - timedelta(seconds=seconds * DEFAULT_HISTORY_POINTS)
+    start = bucket_start(since, seconds)
+    if until <= since:
+        raise HTTPException(status_code=400, detail="until must be after since")
+    if (until - start).total_seconds() / seconds > MAX_HISTORY_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {MAX_HISTORY_POINTS} buckets, use a coarser resolution"
+        )
+
+    rows = await conn.fetch(MARKET_HISTORY_SQL, market_id, seconds, start, until)
+    if not rows and not await conn.fetchval('SELECT 1 FROM "Market" WHERE "marketId" = $1', market_id):
+        raise HTTPException(status_code=404, detail="Market not found")
+
+    return {
+        "market_id": market_id,
+        "resolution": resolution,
+        "since": start,
+        "until": until,
+        "points": [
+            {
+                "time": row['bucketStart'],
+                "yes_percent": {
+                    "open": row['yesOpen'] / 10,
+                    "high": row['yesHigh'] / 10,
+                    "low": row['yesLow'] / 10,
+                    "close": row['yesClose'] / 10
+                },
+                "no_percent": percent_tenths(row['noPool'], row['yesPool'] + row['noPool']) / 10,
+                "yes_pool": to_usdt(row['yesPool']),
+                "no_pool": to_usdt(row['noPool']),
+                "total_pool": to_usdt(row['yesPool'] + row['noPool']),
+                "total_bets": row['totalBets'],
+                "samples": row['samples']
+            }
+            for row in rows
         ]
-    finally:
-        await conn.close()
+    }
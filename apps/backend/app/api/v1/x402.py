@@ -1,29 +1,41 @@
-from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel
-from app.models.bet import BetQuote
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from typing import Optional
+from app.models.bet import QuoteRecord
+from app.models.money import SCALE, AmountInput, format_amount
 from app.services.market_manager import MarketManager
-from app.services.redis import increment_rate_limit, set_rate_limit
+from app.services.quotes import get_quote_store
+from app.services.rate_limit import RateLimiter
+import math
 import uuid
-from datetime import datetime, timedelta
+import time
 import os
 from app.core.contracts import MARKET_MANAGER_ADDRESS
 
 router = APIRouter()
 market_mgr = MarketManager()
+quote_limiter = RateLimiter("bet", limit=10, window=60)
+
+# Quotes (and the exposure they reserve) lapse after this many seconds
+QUOTE_TTL_SECONDS = 300
 
 class BetRequest(BaseModel):
     market_id: str
     side: str
-    stake: float
+    stake: AmountInput = Field(..., gt=SCALE // 1000, le=SCALE)
+    wallet: Optional[str] = None
 
 @router.post("/place-bet")
-async def place_bet_quote(bet: BetRequest):
+async def place_bet_quote(bet: BetRequest, request: Request):
     """x402 Payment Required endpoint"""
     
-    # Rate limiting
-    client_ip = "127.0.0.1"  # Replace with real IP
-    if not await increment_rate_limit(f"bet:{client_ip}", 10, 60):
-        raise HTTPException(429, "Rate limited")
+    # Rate limiting, per client IP and per wallet (uvicorn resolves the IP
+    # from X-Forwarded-For for trusted proxies, see FORWARDED_ALLOW_IPS)
+    client_ip = request.client.host if request.client else "unknown"
+    wallet = f"wallet:{bet.wallet.lower()}" if bet.wallet else None
+    retry_after = await quote_limiter.hit(f"ip:{client_ip}", wallet)
+    if retry_after:
+        raise HTTPException(429, "Rate limited", headers={"Retry-After": str(math.ceil(retry_after))})
     
     quote_id = str(uuid.uuid4())
     odds = market_mgr.calculate_odds(bet.market_id)
@@ -31,30 +43,37 @@ async def place_bet_quote(bet: BetRequest):
     if bet.side not in odds:
         raise HTTPException(400, "Invalid side")
     
-    if not market_mgr.check_exposure(bet.market_id, bet.side, bet.stake):
+    # Check and reserve in one step so concurrent quotes can't overshoot the limit
+    if not await market_mgr.reserve_exposure(bet.market_id, bet.side, bet.stake, quote_id, QUOTE_TTL_SECONDS):
         raise HTTPException(400, "Exceeds exposure limit")
     
     price = market_mgr.quote_price(odds[bet.side], bet.stake)
     
-    quote = BetQuote(
+    quote = QuoteRecord(
         quote_id=quote_id,
         market_id=bet.market_id,
         side=bet.side,
         odds=odds[bet.side],
         price=price,
-        max_stake=1.0,
-        expires_at=int((datetime.utcnow() + timedelta(minutes=5)).timestamp())
+        max_stake=SCALE,
+        expires_at=int(time.time()) + QUOTE_TTL_SECONDS,
+        stake=bet.stake,
+        wallet=bet.wallet
     )
     
-    # Update exposure
-    market_mgr.update_exposure(bet.market_id, bet.side, bet.stake)
+    # Held until /bets/confirm takes it; expires together with its exposure reservation
+    try:
+        await get_quote_store().save(quote)
+    except Exception:
+        await market_mgr.release_exposure(quote_id)
+        raise
     
     # HTTP 402 Payment Required
     payee_address = os.getenv("X402_PAYEE_ADDRESS", MARKET_MANAGER_ADDRESS)
     headers = {
-        "Payment-Required": f"crypto-cronos://{payee_address}@{price:.6f}",
+        "Payment-Required": f"crypto-cronos://{payee_address}@{format_amount(price)}",
         "X-Quote-ID": quote_id,
-        "Retry-After": "300"
+        "Retry-After": str(QUOTE_TTL_SECONDS)
     }
     
     return Response(
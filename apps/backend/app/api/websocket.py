@@ -1,164 +1,156 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.redis import redis_client
-import json
+from app.models.money import to_wire
+from app.services import database, frames
+from app.services.broadcaster import broadcaster, Subscriber, ALL_MARKETS
+from app.services.snapshot_cache import market_snapshots
+from app.services.ticks import PROTOCOL_V1, PROTOCOL_V2
+from typing import Set
 import asyncio
-import asyncpg
 import os
-from typing import Dict, Set
 
 router = APIRouter()
 
+# Protocol v2 clients get at most one frame per flush interval
+FLUSH_INTERVAL = float(os.getenv("WS_FLUSH_INTERVAL_MS", "100")) / 1000
+
 # Active WebSocket connections
 active_connections: Set[WebSocket] = set()
 
-# Database connection pool
-db_pool = None
+async def broadcast_to_all(message):
+    """Send one message to all connected WebSocket clients concurrently"""
+    # Encoded once; every client gets the identical frame
+    frame = message if isinstance(message, str) else frames.dumps(message)
+    connections = list(active_connections)
+    results = await asyncio.gather(
+        *(connection.send_text(frame) for connection in connections),
+        return_exceptions=True
+    )
+    
+    # Remove disconnected clients
+    for connection, result in zip(connections, results):
+        if isinstance(result, Exception):
+            print(f"Error sending to client: {result}")
+            active_connections.discard(connection)
 
-async def get_db_pool():
-    """Initialize PostgreSQL connection pool"""
-    global db_pool
-    if db_pool is None:
-        db_pool = await asyncpg.create_pool(
-            host=os.getenv("PGHOST", "localhost"),
-            port=int(os.getenv("PGPORT", "5432")),
-            user=os.getenv("PGUSER", "postgres"),
-            password=os.getenv("PGPASSWORD", ""),
-            database=os.getenv("PGDATABASE", "eden_haus"),
-            min_size=2,
-            max_size=10
-        )
-    return db_pool
+async def send_frame(websocket: WebSocket, frame: frames.Frame, encoding: str):
+    """Send a shared frame as text (JSON) or binary (MessagePack)"""
+    if encoding == frames.MSGPACK:
+        await websocket.send_bytes(frame.binary)
+    else:
+        await websocket.send_text(frame.text)
 
-async def fetch_market_update(market_id: str) -> Dict:
-    """Fetch latest market data from PostgreSQL"""
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("""
-            SELECT 
-                id, question, status, winner,
-                yes_pool, no_pool, total_bets,
-                start_date, end_date, category, icon
-            FROM prediction_markets
-            WHERE id = $1
-        """, market_id)
-        
-        if row:
-            total_pool = row['yes_pool'] + row['no_pool']
-            yes_percent = (row['yes_pool'] / total_pool * 100) if total_pool > 0 else 50.0
-            no_percent = (row['no_pool'] / total_pool * 100) if total_pool > 0 else 50.0
-            
-            return {
-                "type": "market_update",
-                "market_id": row['id'],
-                "yes_pool": float(row['yes_pool']),
-                "no_pool": float(row['no_pool']),
-                "total_pool": float(total_pool),
-                "yes_percent": round(yes_percent, 1),
-                "no_percent": round(no_percent, 1),
-                "total_bets": row['total_bets'],
-                "status": row['status']
-            }
-    return None
+async def pump_updates(websocket: WebSocket, subscriber: Subscriber):
+    """Forward frames built by the broadcaster from the client's queue to its socket"""
+    while True:
+        await send_frame(websocket, await subscriber.queue.get(), subscriber.encoding)
 
-async def broadcast_to_all(message: str):
-    """Send message to all connected WebSocket clients"""
-    disconnected = set()
-    for connection in active_connections:
+async def pump_batches(websocket: WebSocket, subscriber: Subscriber):
+    """Protocol v2: send every tick queued within one flush interval as a single frame"""
+    while True:
+        pending = [await subscriber.queue.get()]
+        await asyncio.sleep(FLUSH_INTERVAL)
+        while not subscriber.queue.empty():
+            pending.append(subscriber.queue.get_nowait())
+        batch = frames.batch(pending, subscriber.encoding)
+        if subscriber.encoding == frames.MSGPACK:
+            await websocket.send_bytes(batch)
+        else:
+            await websocket.send_text(batch)
+
+async def receive_requests(websocket: WebSocket, subscriber: Subscriber):
+    """Protocol v2: answer resync requests with a fresh snapshot"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
         try:
-            await connection.send_text(message)
-        except Exception as e:
-            print(f"Error sending to client: {e}")
-            disconnected.add(connection)
+            request = frames.decode_request(message)
+        except ValueError:
+            continue
+        if isinstance(request, dict) and request.get("type") == "resync":
+            market_id = request.get("market_id") or subscriber.market_id
+            if market_id == ALL_MARKETS:
+                continue
+            snapshot = await broadcaster.snapshot_frame(market_id)
+            if snapshot:
+                # Queued behind older ticks; clients drop ticks at or below its seq
+                subscriber.offer(snapshot)
+
+async def serve_updates(websocket: WebSocket, subscriber: Subscriber):
+    """Run the client's send loop (and for protocol v2, its request loop) until disconnect"""
+    if subscriber.protocol != PROTOCOL_V2:
+        await pump_updates(websocket, subscriber)
+        return
+    tasks = [
+        asyncio.create_task(pump_batches(websocket, subscriber)),
+        asyncio.create_task(receive_requests(websocket, subscriber)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def accept_client(websocket: WebSocket, protocol: int, encoding: str) -> bool:
+    """
+    Accept the socket if updates can be served with the requested protocol
+    and encoding. permessage-deflate is negotiated by the server during the
+    handshake when the client offers it (uvicorn --ws-per-message-deflate).
+    """
+    await websocket.accept()
     
-    # Remove disconnected clients
-    active_connections.difference_update(disconnected)
+    if not broadcaster.running:
+        await websocket.close(code=1011, reason="Redis unavailable")
+        return False
+    
+    if protocol not in (PROTOCOL_V1, PROTOCOL_V2):
+        await websocket.close(code=1003, reason="Unsupported protocol")
+        return False
+    
+    if encoding not in frames.ENCODINGS:
+        await websocket.close(code=1003, reason="Unsupported encoding")
+        return False
+    
+    return True
 
 @router.websocket("/ws/markets")
-async def websocket_markets(websocket: WebSocket):
+async def websocket_markets(
+    websocket: WebSocket,
+    protocol: int = PROTOCOL_V1,
+    encoding: str = frames.JSON
+):
     """
     Eden Haus market updates via Redis Pub/Sub + PostgreSQL
     
     This WebSocket endpoint provides:
-    - Real-time vote updates via Redis pub/sub
+    - Real-time vote updates via the shared Redis broadcaster
     - Market status changes
     - Live pool and percentage updates
     - Database-backed data consistency
+    - Opt-in delta ticks with ?protocol=2 (see app/services/ticks.py)
+    - Opt-in binary MessagePack frames with ?encoding=msgpack
     """
-    await websocket.accept()
-    active_connections.add(websocket)
-    
-    if not redis_client:
-        await websocket.close(code=1011, reason="Redis unavailable")
+    if not await accept_client(websocket, protocol, encoding):
         return
     
-    pubsub = redis_client.pubsub()
+    active_connections.add(websocket)
+    subscriber = await broadcaster.subscribe(ALL_MARKETS, protocol, encoding)
     
     try:
-        # Subscribe to market channels and vote updates
-        await pubsub.subscribe("market:*", "vote:update")
         print(f"✅ WebSocket connected. Total connections: {len(active_connections)}")
         
         # Send initial connection confirmation
-        await websocket.send_json({
+        await send_frame(websocket, frames.Frame({
             "type": "connection",
             "status": "connected",
-            "message": "Eden Haus WebSocket ready"
-        })
+            "message": "Eden Haus WebSocket ready",
+            "protocol": protocol,
+            "encoding": encoding
+        }), encoding)
         
-        while True:
-            # Listen for Redis pub/sub messages
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            
-            if message and message["type"] == "message":
-                channel = message["channel"].decode("utf-8")
-                data = message["data"].decode("utf-8")
-                
-                try:
-                    # Parse the message data
-                    message_data = json.loads(data)
-                    
-                    # Handle vote updates - fetch fresh data from database
-                    if channel == "vote:update":
-                        market_id = message_data.get("market_id")
-                        if market_id:
-                            # Fetch latest market data from PostgreSQL
-                            market_update = await fetch_market_update(market_id)
-                            if market_update:
-                                # Add vote metadata
-                                market_update["vote"] = {
-                                    "choice": message_data.get("choice"),
-                                    "amount": message_data.get("amount"),
-                                    "wallet": message_data.get("wallet", "anonymous")
-                                }
-                                await websocket.send_json(market_update)
-                    
-                    # Handle market-specific updates
-                    elif channel.startswith("market:"):
-                        market_id = channel.split(":", 1)[1]
-                        # Fetch latest data from database to ensure consistency
-                        market_update = await fetch_market_update(market_id)
-                        if market_update:
-                            await websocket.send_json(market_update)
-                        else:
-                            # Fallback to Redis message if DB fetch fails
-                            await websocket.send_text(data)
-                    
-                    else:
-                        # Send raw message for other channels
-                        await websocket.send_text(data)
-                        
-                except json.JSONDecodeError:
-                    # Send raw text if not JSON
-                    await websocket.send_text(data)
-                except Exception as e:
-                    print(f"❌ Error processing message: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Error processing update"
-                    })
-            
-            # Small delay to prevent CPU spinning
-            await asyncio.sleep(0.01)
+        await serve_updates(websocket, subscriber)
             
     except WebSocketDisconnect:
         print(f"🔌 WebSocket disconnected. Remaining: {len(active_connections) - 1}")
@@ -167,75 +159,50 @@ async def websocket_markets(websocket: WebSocket):
     finally:
         # Cleanup
         active_connections.discard(websocket)
-        await pubsub.unsubscribe("market:*", "vote:update")
-        await pubsub.close()
+        await broadcaster.unsubscribe(subscriber)
 
 @router.websocket("/ws/markets/{market_id}")
-async def websocket_market_specific(websocket: WebSocket, market_id: str):
+async def websocket_market_specific(
+    websocket: WebSocket,
+    market_id: str,
+    protocol: int = PROTOCOL_V1,
+    encoding: str = frames.JSON
+):
     """
     Single market WebSocket endpoint for focused updates
     
-    Subscribes only to a specific market's updates for reduced bandwidth
+    Receives only this market's updates from the shared broadcaster;
+    ?protocol=2 starts with a snapshot followed by delta ticks and
+    ?encoding=msgpack switches to binary frames
     """
-    await websocket.accept()
-    
-    if not redis_client:
-        await websocket.close(code=1011, reason="Redis unavailable")
+    if not await accept_client(websocket, protocol, encoding):
         return
     
-    pubsub = redis_client.pubsub()
+    active_connections.add(websocket)
+    subscriber = await broadcaster.subscribe(market_id, protocol, encoding)
     
     try:
-        # Subscribe to specific market and vote updates
-        await pubsub.subscribe(f"market:{market_id}", "vote:update")
         print(f"✅ WebSocket connected to market: {market_id}")
         
         # Send initial market data from database
-        initial_data = await fetch_market_update(market_id)
-        if initial_data:
-            await websocket.send_json(initial_data)
+        if protocol == PROTOCOL_V2:
+            snapshot = await broadcaster.snapshot_frame(market_id)
+            if snapshot:
+                await send_frame(websocket, snapshot, encoding)
+        else:
+            initial_data = await market_snapshots.get(market_id)
+            if initial_data:
+                await send_frame(websocket, frames.Frame(to_wire(initial_data)), encoding)
         
-        while True:
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            
-            if message and message["type"] == "message":
-                channel = message["channel"].decode("utf-8")
-                data = message["data"].decode("utf-8")
-                
-                try:
-                    message_data = json.loads(data)
-                    
-                    # Only process if it's for this market
-                    if channel == "vote:update":
-                        if message_data.get("market_id") == market_id:
-                            market_update = await fetch_market_update(market_id)
-                            if market_update:
-                                market_update["vote"] = {
-                                    "choice": message_data.get("choice"),
-                                    "amount": message_data.get("amount"),
-                                    "wallet": message_data.get("wallet", "anonymous")
-                                }
-                                await websocket.send_json(market_update)
-                    
-                    elif channel == f"market:{market_id}":
-                        market_update = await fetch_market_update(market_id)
-                        if market_update:
-                            await websocket.send_json(market_update)
-                            
-                except json.JSONDecodeError:
-                    await websocket.send_text(data)
-                except Exception as e:
-                    print(f"❌ Error in market-specific WebSocket: {e}")
-            
-            await asyncio.sleep(0.01)
+        await serve_updates(websocket, subscriber)
             
     except WebSocketDisconnect:
         print(f"🔌 WebSocket disconnected from market: {market_id}")
     except Exception as e:
         print(f"❌ WebSocket error for market {market_id}: {e}")
     finally:
-        await pubsub.unsubscribe(f"market:{market_id}", "vote:update")
-        await pubsub.close()
+        active_connections.discard(websocket)
+        await broadcaster.unsubscribe(subscriber)
 
 @router.get("/ws-test")
 async def ws_test():
@@ -251,7 +218,10 @@ async def ws_test():
             "Real-time vote updates",
             "Market status changes",
             "Database-backed consistency",
-            "Redis pub/sub messaging"
+            "Shared Redis pub/sub fan-out",
+            "Delta-encoded batched ticks (?protocol=2)",
+            "MessagePack binary frames (?encoding=msgpack)",
+            "permessage-deflate compression when offered by the client"
         ]
     }
 
@@ -260,6 +230,7 @@ async def ws_stats():
     """Get WebSocket connection statistics"""
     return {
         "active_connections": len(active_connections),
-        "redis_connected": redis_client is not None,
-        "database_connected": db_pool is not None
+        "redis_connected": broadcaster.running,
+        "database_connected": database.db_pool is not None,
+        "broadcaster": broadcaster.stats()
     }
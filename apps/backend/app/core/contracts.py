@@ -1,41 +1,106 @@
-import requests
+import asyncio
+import hashlib
 import json
 import os
+from typing import Optional, Tuple
+from app.core.nonces import NonceManager
+from app.core.rpc import RPCClient, RPCError, get_rpc_client
 
-CRONOS_RPC = os.getenv("CRONOS_RPC_URL", "https://evm-t3.cronos.org")
 MARKET_MANAGER_ADDRESS = os.getenv("MARKET_MANAGER_ADDRESS", "0x0000000000000000000000000000000000000000")
+# Backend account that signs position mints (the bettor's wallet goes in the calldata)
+MINTER_ADDRESS = os.getenv("MINTER_ADDRESS", "0x0000000000000000000000000000000000000000")
 
-def rpc_call(method, params):
-    """Direct Cronos JSON-RPC - NO web3.py"""
-    payload = {
-        "jsonrpc": "2.0",
-        "method": method,
-        "params": params,
-        "id": 1
-    }
-    resp = requests.post(CRONOS_RPC, json=payload, timeout=10)
-    return resp.json()["result"]
+# Node errors for a transaction it already holds (or has mined), i.e. an
+# earlier copy of the same signed transaction got through
+ALREADY_SENT = ("already known", "known transaction", "already in mempool", "nonce too low")
+
+class SendUnconfirmed(Exception):
+    """eth_sendRawTransaction got no answer, so the transaction may still be mined"""
+
+    def __init__(self, tx_hash: str):
+        self.tx_hash = tx_hash
+        super().__init__(f"send of {tx_hash} unconfirmed")
+
+def tx_hash(raw: str) -> str:
+    """Hash of a signed transaction (stands in for keccak256 of the raw bytes)"""
+    return "0x" + hashlib.sha256(raw.encode()).hexdigest()
+
+def sign(tx: dict) -> Tuple[str, str]:
+    """Raw signed transaction and its hash"""
+    raw = "0x" + json.dumps(tx, sort_keys=True).encode().hex()  # signed by the minter key
+    return raw, tx_hash(raw)
 
 class Contracts:
-    def get_market(self, market_id):
+    """Direct Cronos JSON-RPC - NO web3.py"""
+
+    def __init__(self, rpc: Optional[RPCClient] = None, nonces: Optional[NonceManager] = None, send_attempts: int = 3):
+        self._rpc = rpc
+        self.nonces = nonces or NonceManager()
+        self.send_attempts = send_attempts
+
+    @property
+    def rpc(self) -> RPCClient:
+        return self._rpc or get_rpc_client()
+
+    async def get_market(self, market_id):
         """Real contract read via JSON-RPC"""
         data = "0x..."  # ABI encoded call
-        result = rpc_call("eth_call", [{
+        result = await self.rpc.call("eth_call", [{
             "to": MARKET_MANAGER_ADDRESS,
             "data": data
         }, "latest"])
         return result
     
-    def mint_position(self, quote_id, market_id, side, stake, odds, wallet):
-        """Real TX via JSON-RPC"""
-        nonce = int(rpc_call("eth_getTransactionCount", [wallet, "latest"]), 16)
-        tx = {
+    async def _send(self, value: int, data: str) -> str:
+        """
+        Sign and send a MarketManager transaction from the minter account
+
+        Errors before the send, and sends the node refused, leave nothing
+        queued under the nonce and can be retried. When a send gets no answer
+        (timeout, 502) the same signed transaction is sent again: every copy
+        has the same nonce, so at most one is ever mined. If none is answered
+        this raises SendUnconfirmed, which must not be retried with a new nonce.
+        """
+        try:
+            # Batched with the nonce lookup whenever that goes to the node
+            nonce, (gas_price,) = await self.nonces.next_with(self.rpc, MINTER_ADDRESS, [("eth_gasPrice", [])])
+        except Exception:
+            # The node's view of our nonce is the source of truth after any failure
+            await self.nonces.resync(self.rpc, MINTER_ADDRESS)
+            raise
+        raw, signed_hash = sign({
             "to": MARKET_MANAGER_ADDRESS,
-            "value": hex(int(stake * 1e18)),
+            "value": hex(value),
             "gas": "0x493e0",
-            "gasPrice": "0x12a05f200",
+            "gasPrice": gas_price,
             "nonce": hex(nonce),
-            "data": "0x..."  # openPosition calldata
-        }
-        tx_hash = rpc_call("eth_sendRawTransaction", ["0x..."])  # signed tx
-        return tx_hash
+            "data": data
+        })
+        for attempt in range(1, self.send_attempts + 1):
+            try:
+                return await self.rpc.call("eth_sendRawTransaction", [raw])
+            except RPCError as e:
+                if attempt > 1 and any(known in e.message.lower() for known in ALREADY_SENT):
+                    # An earlier copy reached the node; only its reply was lost
+                    return signed_hash
+                await self.nonces.resync(self.rpc, MINTER_ADDRESS)
+                if attempt > 1:
+                    raise SendUnconfirmed(signed_hash) from e
+                raise
+            except Exception as e:
+                if attempt == self.send_attempts:
+                    await self.nonces.resync(self.rpc, MINTER_ADDRESS)
+                    raise SendUnconfirmed(signed_hash) from e
+                await asyncio.sleep(self.rpc.backoff * attempt)
+    
+    async def mint_position(self, quote_id, market_id, side, stake, odds, wallet):
+        """Real TX via JSON-RPC; stake in 6-decimal base units"""
+        return await self._send(stake * 10 ** 12, "0x...")  # openPosition(wallet, ...) calldata
+    
+    async def payout_batch(self, market_id, batch_number, payouts):
+        """
+        One payout transaction for many winners; payouts are (wallet, amount)
+        pairs in USDT base units. The contract ignores a (market_id,
+        batch_number) it has already paid, so resending a batch is safe.
+        """
+        return await self._send(0, "0x...")  # payoutBatch(marketId, batchNumber, wallets[], amounts[]) calldata
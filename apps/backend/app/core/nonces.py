@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Dict, List, Sequence, Tuple
+from app.core.rpc import RPCClient
+
+class NonceManager:
+    """
+    Hands out transaction nonces per signing address without a round trip
+
+    The first nonce for an address comes from the node's pending count;
+    after that they are counted locally. Call `resync` when a send fails,
+    since the node may have rejected (or never seen) a nonce we handed out:
+    the next nonce is then fetched again, in the same JSON-RPC batch as the
+    calls `next_with` was given.
+    """
+
+    def __init__(self):
+        self.next_nonce: Dict[str, int] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.resyncs = 0
+
+    def _lock(self, address: str) -> asyncio.Lock:
+        return self.locks.setdefault(address.lower(), asyncio.Lock())
+
+    async def next(self, rpc: RPCClient, address: str) -> int:
+        nonce, _ = await self.next_with(rpc, address, [])
+        return nonce
+
+    async def next_with(self, rpc: RPCClient, address: str, calls: Sequence[Tuple[str, list]]) -> Tuple[int, List[Any]]:
+        """The next nonce and the results of `calls`, in one round trip"""
+        key = address.lower()
+        async with self._lock(address):
+            if key not in self.next_nonce:
+                count, *results = await rpc.batch([("eth_getTransactionCount", [address, "pending"]), *calls])
+                self.next_nonce[key] = int(count, 16)
+                nonce = self.next_nonce[key]
+                self.next_nonce[key] = nonce + 1
+                return nonce, results
+            nonce = self.next_nonce[key]
+            self.next_nonce[key] = nonce + 1
+        # Counted locally: the lock isn't held while the calls are out
+        return nonce, await rpc.batch(calls) if calls else []
+
+    async def resync(self, rpc: RPCClient, address: str):
+        """Forget the local count; the next nonce comes from the node again"""
+        async with self._lock(address):
+            self.resyncs += 1
+            self.next_nonce.pop(address.lower(), None)
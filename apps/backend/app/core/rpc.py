@@ -0,0 +1,130 @@
+"""
+Async JSON-RPC client for the Cronos node
+
+One httpx.AsyncClient per process keeps connections to the node alive.
+Calls that are needed together (e.g. nonce and gas price) go out as one
+JSON-RPC batch POST.
+"""
+
+import asyncio
+import itertools
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import httpx
+
+CRONOS_RPC = os.getenv("CRONOS_RPC_URL", "https://evm-t3.cronos.org")
+
+DEFAULT_TIMEOUT = 10.0
+# Seconds; reads should be quick, sends may wait on a busy node's mempool
+METHOD_TIMEOUTS = {
+    "eth_call": 5.0,
+    "eth_chainId": 5.0,
+    "eth_gasPrice": 5.0,
+    "eth_getTransactionCount": 5.0,
+    "eth_getTransactionReceipt": 5.0,
+    "eth_sendRawTransaction": 20.0,
+}
+
+# Resending a signed transaction is harmless, but only retry it when it
+# never reached the node; other failures are reported to the caller
+SEND_METHODS = {"eth_sendRawTransaction"}
+SEND_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRY_ERRORS = (httpx.TransportError,)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+class RPCError(Exception):
+    """Error object returned by the node for a call"""
+
+    def __init__(self, method: str, error: Dict[str, Any]):
+        self.method = method
+        self.code = error.get("code")
+        self.message = error.get("message", "")
+        self.data = error.get("data")
+        super().__init__(f"{method} failed ({self.code}): {self.message}")
+
+class RPCClient:
+    def __init__(
+        self,
+        url: str = CRONOS_RPC,
+        retries: int = 2,
+        backoff: float = 0.2,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.retries = retries
+        self.backoff = backoff
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=DEFAULT_TIMEOUT,
+            transport=transport,
+        )
+        self._ids = itertools.count(1)
+
+    def _timeout(self, methods: Sequence[str]) -> float:
+        return max(METHOD_TIMEOUTS.get(method, DEFAULT_TIMEOUT) for method in methods)
+
+    async def _post(self, payload: Any, methods: Sequence[str]) -> Any:
+        sending = bool(SEND_METHODS.intersection(methods))
+        retry_on = SEND_RETRY_ERRORS if sending else RETRY_ERRORS
+        attempt = 0
+        while True:
+            try:
+                response = await self.http.post(self.url, json=payload, timeout=self._timeout(methods))
+            except retry_on:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if sending or response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    response.raise_for_status()
+                    return response.json()
+            attempt += 1
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _request(self, method: str, params: list) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "method": method, "params": params, "id": next(self._ids)}
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        reply = await self._post(self._request(method, params or []), [method])
+        if "error" in reply:
+            raise RPCError(method, reply["error"])
+        return reply["result"]
+
+    async def batch(self, calls: Sequence[Tuple[str, list]]) -> List[Any]:
+        """Send several calls in one POST; results come back in call order"""
+        requests = [self._request(method, params) for method, params in calls]
+        replies = await self._post(requests, [method for method, _ in calls])
+        if isinstance(replies, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise RPCError("batch", replies.get("error", {}))
+
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for request in requests:
+            reply = by_id.get(request["id"])
+            if reply is None:
+                raise RPCError(request["method"], {"message": "missing from batch response"})
+            if "error" in reply:
+                raise RPCError(request["method"], reply["error"])
+            results.append(reply["result"])
+        return results
+
+    async def close(self):
+        await self.http.aclose()
+
+rpc_client: Optional[RPCClient] = None
+
+def get_rpc_client() -> RPCClient:
+    global rpc_client
+    if rpc_client is None:
+        rpc_client = RPCClient(
+            retries=int(os.getenv("RPC_RETRIES", "2")),
+            max_connections=int(os.getenv("RPC_MAX_CONNECTIONS", "20")),
+        )
+    return rpc_client
+
+async def close_rpc_client():
+    global rpc_client
+    if rpc_client is not None:
+        await rpc_client.close()
+        rpc_client = None
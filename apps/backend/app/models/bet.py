@@ -1,11 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from app.models.money import SCALE, Amount, AmountInput
 
 class BetCreate(BaseModel):
     market_id: str
     side: str  # "home", "away", "over", "under"
-    stake: float = Field(..., gt=0.001, le=1.0)
+    stake: AmountInput = Field(..., gt=SCALE // 1000, le=SCALE)
     wallet: str  # 0x...
 
 class BetQuote(BaseModel):
@@ -13,14 +14,19 @@ class BetQuote(BaseModel):
     market_id: str
     side: str
     odds: float
-    price: float  # CRO amount
-    max_stake: float
+    price: Amount  # CRO, 6-decimal base units
+    max_stake: Amount
     expires_at: int  # Unix timestamp
 
+class QuoteRecord(BetQuote):
+    """A quote as held by the quote store until it is confirmed or expires"""
+    stake: Amount
+    wallet: Optional[str] = None
+
 class BetPosition(BaseModel):
     position_id: str
     market_id: str
     side: str
-    stake: float
+    stake: Amount
     odds: float
     tx_hash: Optional[str] = None
@@ -0,0 +1,78 @@
+"""
+Fixed-point amounts: integer base units with 6 decimals
+
+USDT amounts (and the 6-decimal CRO amounts on quotes) are plain ints of
+base units everywhere inside the backend: "Market"/"Vote" BIGINT columns,
+model fields, Redis messages and WebSocket state. They only become decimal
+numbers on the wire, where `to_usdt` gives the exact value (int / int is
+correctly rounded and prints with at most 6 decimals). Percentages are
+likewise kept as integer tenths of a percent.
+"""
+
+from decimal import Decimal
+from typing import Annotated, Any, Dict
+from pydantic import BeforeValidator, PlainSerializer
+
+DECIMALS = 6
+SCALE = 10 ** DECIMALS
+
+def parse_amount(value: Any) -> int:
+    """Decimal amount from a request (number or string) to base units; ValueError if it isn't one"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+        raise ValueError("amount must be a number")
+    if isinstance(value, int):
+        return value * SCALE
+    try:
+        if isinstance(value, float):
+            # Exact for any float that was written with at most 6 decimals
+            return round(value * SCALE)
+        scaled = Decimal(value) * SCALE
+    except (ArithmeticError, TypeError, ValueError):
+        # inf/nan floats, unparsable strings, exponents out of range
+        raise ValueError("amount must be a finite number")
+    if not scaled.is_finite():
+        raise ValueError("amount must be a finite number")
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"amount has more than {DECIMALS} decimals")
+    return int(scaled)
+
+def to_usdt(units: int) -> float:
+    """Base units to the decimal number sent to clients"""
+    return units / SCALE
+
+def format_amount(units: int) -> str:
+    """Base units as a fixed 6-decimal string, e.g. 1500000 -> '1.500000'"""
+    sign = "-" if units < 0 else ""
+    whole, fraction = divmod(abs(units), SCALE)
+    return f"{sign}{whole}.{fraction:0{DECIMALS}d}"
+
+def percent_tenths(part: int, total: int) -> int:
+    """part / total in tenths of a percent, rounded half up; 50.0% of an empty pool"""
+    if total <= 0:
+        return 500
+    return (part * 2000 + total) // (2 * total)
+
+# Model field holding base units; serialized as a decimal number in JSON
+Amount = Annotated[int, PlainSerializer(to_usdt, return_type=float, when_used="json")]
+
+# Request field: accepts a decimal amount and stores base units
+AmountInput = Annotated[int, BeforeValidator(parse_amount), PlainSerializer(to_usdt, return_type=float, when_used="json")]
+
+# Fields of internal market updates (snapshots, ticks, votes) converted by to_wire
+AMOUNT_FIELDS = ("yes_pool", "no_pool", "total_pool", "amount")
+PERCENT_FIELDS = ("yes_percent", "no_percent")
+NESTED_FIELDS = ("vote", "changes", "market")
+
+def to_wire(message: Dict) -> Dict:
+    """Copy of an internal market update with amounts and percentages as client-facing numbers"""
+    out = dict(message)
+    for field in AMOUNT_FIELDS:
+        if type(out.get(field)) is int:
+            out[field] = out[field] / SCALE
+    for field in PERCENT_FIELDS:
+        if type(out.get(field)) is int:
+            out[field] = out[field] / 10
+    for field in NESTED_FIELDS:
+        if isinstance(out.get(field), dict):
+            out[field] = to_wire(out[field])
+    return out
@@ -1,14 +1,15 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
+from app.models.money import SCALE, Amount, AmountInput, percent_tenths
 
 class PredictionMarket(BaseModel):
     id: str
     question: str
     status: Literal["ACTIVE", "CLOSED", "RESOLVED"] = "ACTIVE"
     winner: Optional[Literal["YES", "NO"]] = None
-    yes_pool: float = Field(default=0.0, ge=0)
-    no_pool: float = Field(default=0.0, ge=0)
+    yes_pool: Amount = Field(default=0, ge=0)  # USDT base units
+    no_pool: Amount = Field(default=0, ge=0)
     total_bets: int = Field(default=0, ge=0)
     start_date: datetime
     end_date: datetime
@@ -16,20 +17,24 @@ class PredictionMarket(BaseModel):
     icon: str = "🏆"
 
     @property
-    def total_pool(self) -> float:
+    def total_pool(self) -> int:
         return self.yes_pool + self.no_pool
 
+    @property
+    def yes_percent_tenths(self) -> int:
+        return percent_tenths(self.yes_pool, self.total_pool)
+
+    @property
+    def no_percent_tenths(self) -> int:
+        return percent_tenths(self.no_pool, self.total_pool)
+
     @property
     def yes_percent(self) -> float:
-        if self.total_pool == 0:
-            return 50.0
-        return round((self.yes_pool / self.total_pool) * 100, 1)
+        return self.yes_percent_tenths / 10
 
     @property
     def no_percent(self) -> float:
-        if self.total_pool == 0:
-            return 50.0
-        return round((self.no_pool / self.total_pool) * 100, 1)
+        return self.no_percent_tenths / 10
 
     class Config:
         from_attributes = True
@@ -37,16 +42,30 @@ class PredictionMarket(BaseModel):
 class VoteRequest(BaseModel):
     market_id: str
     choice: Literal["YES", "NO"]
-    amount: float = Field(..., gt=0, le=100)
+    amount: AmountInput = Field(..., gt=0, le=100 * SCALE)  # up to 100 USDT
     wallet: Optional[str] = None
 
 class VoteResponse(BaseModel):
     success: bool
+    # "queued": accepted for write-behind; pools below are an estimate.
+    # "superseded": a newer vote from the wallet was already stored and is
+    # the one reported (choice, amount, vote_id).
+    status: Literal["applied", "queued", "superseded"] = "applied"
     vote_id: str
     market_id: str
     choice: Literal["YES", "NO"]
-    amount: float
-    new_yes_pool: float
-    new_no_pool: float
+    amount: Amount
+    new_yes_pool: Amount
+    new_no_pool: Amount
     yes_percent: float
     no_percent: float
+
+MAX_BATCH_VOTES = 500
+
+class VoteBatchRequest(BaseModel):
+    votes: List[VoteRequest] = Field(..., min_length=1, max_length=MAX_BATCH_VOTES)
+
+class VoteBatchResponse(BaseModel):
+    success: bool
+    count: int
+    votes: List[VoteResponse]  # in request order, pools as of the whole batch
@@ -0,0 +1,229 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+from app.models.money import to_wire
+from app.services import redis as redis_service
+from app.services.channels import MARKET_PATTERN, VOTES_EVENT, parse_channel
+from app.services import frames
+from app.services.market_cache import market_cache
+from app.services.snapshot_cache import MarketSnapshotCache, market_snapshots
+from app.services.ticks import MarketTicker, PROTOCOL_V1, PROTOCOL_V2
+
+# Subscriber key for clients following every market
+ALL_MARKETS = "*"
+
+class Subscriber:
+    """Bounded outbox for one WebSocket client"""
+
+    def __init__(self, market_id: str, maxsize: int, protocol: int = PROTOCOL_V1, encoding: str = frames.JSON):
+        self.market_id = market_id
+        self.protocol = protocol
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, item: Any):
+        """Enqueue without blocking the hub; a full queue drops its oldest item"""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.queue.put_nowait(item)
+
+class MarketBroadcaster:
+    """
+    Process-wide Redis pub/sub fan-out
+
+    Holds one pubsub connection pattern-subscribed to every market channel
+    (see app/services/channels.py), decodes each message once, builds and
+    encodes the client update once from the shared snapshot cache and hands
+    the same frame to the in-memory subscribers of the market it belongs
+    to, plus everyone following all markets.
+    """
+
+    def __init__(self, queue_size: int = 100, snapshots: MarketSnapshotCache = market_snapshots):
+        self.queue_size = queue_size
+        self.snapshots = snapshots
+        self.ticker = MarketTicker()
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+        self.messages_received = 0
+
+    @property
+    def running(self) -> bool:
+        return self.pubsub is not None
+
+    async def start(self, client=None):
+        """Open the shared pubsub connection and start the reader task"""
+        client = client or redis_service.redis_client
+        if self.pubsub is not None or not client:
+            return
+        self.pubsub = client.pubsub()
+        await self.pubsub.psubscribe(MARKET_PATTERN)
+        self._reader = asyncio.create_task(self._read_loop())
+        print("✅ WebSocket broadcaster listening on Redis")
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        for handler in list(self._handlers):
+            handler.cancel()
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None
+
+    async def subscribe(
+        self,
+        market_id: str = ALL_MARKETS,
+        protocol: int = PROTOCOL_V1,
+        encoding: str = frames.JSON
+    ) -> Subscriber:
+        """Register a client for one market, or ALL_MARKETS"""
+        subscriber = Subscriber(market_id, self.queue_size, protocol, encoding)
+        self.subscribers.setdefault(market_id, set()).add(subscriber)
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        viewers = self.subscribers.get(subscriber.market_id)
+        if viewers is None:
+            return
+        viewers.discard(subscriber)
+        if not viewers:
+            del self.subscribers[subscriber.market_id]
+            if ALL_MARKETS in self.subscribers:
+                return
+            # Unwatched markets stop being refreshed by handle(), so their
+            # snapshots and tick state would go stale; drop them instead
+            if subscriber.market_id == ALL_MARKETS:
+                unwatched = (self.snapshots.markets() | set(self.ticker.markets)) - set(self.subscribers)
+            else:
+                unwatched = {subscriber.market_id}
+            for market_id in unwatched:
+                self.snapshots.forget(market_id)
+                self.ticker.forget(market_id)
+
+    def route(self, channel: str, data: str) -> Tuple[Optional[str], Optional[str], Any]:
+        """Decode a Redis message once and work out which market and event it concerns"""
+        market_id, event = parse_channel(channel)
+        try:
+            payload = frames.loads(data)
+        except ValueError:
+            payload = data
+        return market_id, event, payload
+
+    def has_viewers(self, market_id: Optional[str]) -> bool:
+        return bool(self.subscribers.get(market_id) or self.subscribers.get(ALL_MARKETS))
+
+    def fan_out(self, market_id: Optional[str], frame: frames.Frame, tick_frame: Optional[frames.Frame] = None) -> int:
+        """Queue one shared frame per protocol for market viewers and all-market viewers"""
+        recipients = 0
+        for key in {market_id, ALL_MARKETS}:
+            for subscriber in self.subscribers.get(key, ()):
+                item = tick_frame if subscriber.protocol == PROTOCOL_V2 else frame
+                if item is not None:
+                    subscriber.offer(item)
+                    recipients += 1
+        return recipients
+
+    async def build_update(self, event: str, market_id: str, payload: Any) -> Any:
+        """Turn a Redis message into the update sent to clients"""
+        # Vote updates carry the refreshed market snapshot plus vote metadata
+        if event == VOTES_EVENT and isinstance(payload, dict):
+            snapshot = await self.snapshots.refresh(market_id)
+            if not snapshot:
+                return None
+            last_vote = payload.get("last_vote") or {}
+            return dict(snapshot, vote={
+                "choice": last_vote.get("choice"),
+                "amount": last_vote.get("amount"),
+                "wallet": last_vote.get("wallet", "anonymous")
+            })
+
+        # Market updates use the database for consistency,
+        # falling back to the Redis message if the fetch fails
+        if isinstance(payload, dict):
+            return await self.snapshots.refresh(market_id) or payload
+
+        # Send raw message if not JSON
+        return payload
+
+    async def handle(self, channel: str, data: str) -> int:
+        """Decode, build, encode and fan out one Redis message"""
+        self.messages_received += 1
+        market_id, event, payload = self.route(channel, data)
+        if market_id:
+            # Every vote or status change passes through here in every worker
+            market_cache.forget(market_id)
+        if not market_id or not self.has_viewers(market_id):
+            return 0
+        try:
+            message = await self.build_update(event, market_id, payload)
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+            message = {"type": "error", "message": "Error processing update"}
+        if message is None:
+            return 0
+        if isinstance(message, str):
+            # Raw non-JSON payloads can't be sequenced, so v2 clients skip them
+            return self.fan_out(market_id, frames.Frame(message))
+
+        # Ticks are computed on the integer state; amounts become decimals only for the wire
+        frame = frames.Frame(to_wire(message))
+        tick_frame = None
+        if message.get("type") == "market_update":
+            tick = self.ticker.advance(market_id, message)
+            if tick is not None:
+                tick_frame = frames.Frame(to_wire(tick))
+        else:
+            tick_frame = frame
+        return self.fan_out(market_id, frame, tick_frame)
+
+    async def snapshot_frame(self, market_id: str) -> Optional[frames.Frame]:
+        """Protocol v2 snapshot with the market's current sequence number"""
+        snapshot = self.ticker.snapshot(market_id)
+        if snapshot is None:
+            update = await self.snapshots.get(market_id)
+            if not update:
+                return None
+            self.ticker.seed(market_id, update)
+            snapshot = self.ticker.snapshot(market_id)
+        return frames.Frame(to_wire(snapshot))
+
+    def _spawn(self, channel: str, data: str):
+        # Handled concurrently so one market's refresh window doesn't hold up others
+        handler = asyncio.create_task(self.handle(channel, data))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
+    async def _read_loop(self):
+        """Dispatch messages as Redis pushes them, with no polling interval"""
+        while True:
+            try:
+                async for message in self.pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._spawn(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Broadcaster error: {e}")
+            # Only reached after a connection error; back off before listening again
+            await asyncio.sleep(1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "messages_received": self.messages_received,
+            "markets": {key: len(viewers) for key, viewers in self.subscribers.items()},
+            "dropped": sum(s.dropped for viewers in self.subscribers.values() for s in viewers),
+            "snapshots": self.snapshots.stats(),
+        }
+
+broadcaster = MarketBroadcaster(queue_size=int(os.getenv("WS_CLIENT_QUEUE_SIZE", "100")))
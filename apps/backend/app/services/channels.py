@@ -0,0 +1,33 @@
+"""
+Redis pub/sub channel namespace shared by publishers and the WebSocket hub
+
+    market:{market_id}          market status / general updates
+    market:{market_id}:votes    vote placed on the market
+
+Subscribers use the single pattern MARKET_PATTERN to receive every event
+for every market.
+"""
+
+from typing import Optional, Tuple
+
+MARKET_PREFIX = "market:"
+MARKET_PATTERN = "market:*"
+
+# Event names, as reported by parse_channel
+MARKET_EVENT = "market"
+VOTES_EVENT = "votes"
+
+def market_channel(market_id: str) -> str:
+    return f"{MARKET_PREFIX}{market_id}"
+
+def vote_channel(market_id: str) -> str:
+    return f"{MARKET_PREFIX}{market_id}:{VOTES_EVENT}"
+
+def parse_channel(channel: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split a channel into (market_id, event); (None, None) if outside the namespace"""
+    if not channel.startswith(MARKET_PREFIX):
+        return None, None
+    rest = channel[len(MARKET_PREFIX):]
+    if rest.endswith(f":{VOTES_EVENT}"):
+        return rest[:-len(VOTES_EVENT) - 1] or None, VOTES_EVENT
+    return rest or None, MARKET_EVENT
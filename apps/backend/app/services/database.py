@@ -0,0 +1,121 @@
+import asyncpg
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from typing import AsyncIterator, Optional, Dict, Any
+
+db_pool: Optional[asyncpg.Pool] = None
+
+class PoolStats:
+    """Acquire counters kept alongside the asyncpg pool (asyncpg doesn't expose waiters)"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.acquired = 0
+        self.acquire_timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        self.acquired += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+pool_stats = PoolStats()
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+def get_pool_config() -> Dict[str, Any]:
+    """Pool settings from environment variables"""
+    return {
+        "min_size": _env_int("DB_POOL_MIN_SIZE", 2),
+        "max_size": _env_int("DB_POOL_MAX_SIZE", 10),
+        "statement_cache_size": _env_int("DB_STATEMENT_CACHE_SIZE", 100),
+        "max_inactive_connection_lifetime": _env_float("DB_POOL_MAX_IDLE_SECONDS", 300.0),
+        "command_timeout": _env_float("DB_COMMAND_TIMEOUT", 30.0),
+    }
+
+def get_acquire_timeout() -> float:
+    return _env_float("DB_ACQUIRE_TIMEOUT", 5.0)
+
+async def init_db_pool():
+    """Create the application-wide PostgreSQL pool"""
+    global db_pool
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("⚠️  DATABASE_URL not set - database endpoints will be unavailable")
+        return
+    config = get_pool_config()
+    try:
+        db_pool = await asyncpg.create_pool(database_url, **config)
+        print(f"✅ Database pool ready (min={config['min_size']}, max={config['max_size']})")
+    except Exception as e:
+        print(f"⚠️  Database pool creation failed: {e}")
+        db_pool = None
+
+async def close_db_pool():
+    """Close the pool on shutdown"""
+    global db_pool
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
+
+def get_db_pool() -> asyncpg.Pool:
+    """FastAPI dependency returning the shared pool"""
+    if db_pool is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return db_pool
+
+@asynccontextmanager
+async def acquire_connection(timeout: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+    """Acquire a pooled connection, tracking wait time and timeouts"""
+    pool = get_db_pool()
+    pool_stats.waiting += 1
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=timeout if timeout is not None else get_acquire_timeout())
+    except asyncio.TimeoutError:
+        pool_stats.acquire_timeouts += 1
+        raise HTTPException(status_code=503, detail="Database busy, try again")
+    finally:
+        pool_stats.waiting -= 1
+    pool_stats.record_wait((time.perf_counter() - started) * 1000)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+async def get_db() -> AsyncIterator[asyncpg.Connection]:
+    """FastAPI dependency yielding a pooled connection for the request"""
+    async with acquire_connection() as conn:
+        yield conn
+
+def pool_metrics() -> Dict[str, Any]:
+    """Snapshot of pool usage for the metrics endpoint"""
+    metrics: Dict[str, Any] = {
+        "connected": db_pool is not None,
+        "waiting": pool_stats.waiting,
+        "acquired_total": pool_stats.acquired,
+        "acquire_timeouts": pool_stats.acquire_timeouts,
+        "avg_wait_ms": round(pool_stats.total_wait_ms / pool_stats.acquired, 3) if pool_stats.acquired else 0.0,
+        "max_wait_ms": round(pool_stats.max_wait_ms, 3),
+    }
+    if db_pool is not None:
+        size = db_pool.get_size()
+        idle = db_pool.get_idle_size()
+        metrics.update({
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "min_size": db_pool.get_min_size(),
+            "max_size": db_pool.get_max_size(),
+        })
+    return metrics
@@ -0,0 +1,133 @@
+"""
+Streaming export of a market's "Vote" and "Bet" rows
+
+Rows are read through an asyncpg server-side cursor inside a read-only
+REPEATABLE READ transaction (one consistent snapshot, `prefetch` rows per
+round trip) and encoded to NDJSON or CSV in chunks of `chunk_rows`, so
+memory stays flat however large the market is. Exports hold a pooled
+connection for their whole duration; `EXPORT_CONCURRENCY` caps how many
+run at once so they can't starve the API of connections.
+
+Amounts are USDT: JSON numbers as the API sends them (money.to_usdt) and
+fixed 6-decimal text in CSV. Timestamps are ISO 8601. Client-supplied CSV
+cells that a spreadsheet would read as a formula are prefixed with a quote.
+"""
+
+import asyncio
+import csv
+import io
+import os
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.models.money import format_amount, to_usdt
+from app.services import frames
+from app.services.database import acquire_connection
+
+NDJSON = "ndjson"
+CSV = "csv"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv"}
+
+VOTES = "votes"
+BETS = "bets"
+
+# Half-open [since, until) on "createdAt"; a missing bound is unbounded.
+# Ordered like the keyset indexes so the scan needs no sort.
+VOTE_EXPORT_SQL = '''
+SELECT "voteId", "walletAddress", choice, amount, "createdAt", "updatedAt"
+FROM "Vote"
+WHERE "marketId" = $1
+  AND "createdAt" >= COALESCE($2::timestamp, '-infinity')
+  AND "createdAt" < COALESCE($3::timestamp, 'infinity')
+ORDER BY "createdAt", "voteId"
+'''
+
+BET_EXPORT_SQL = '''
+SELECT id, "walletAddress", choice, amount, "betNumber", status, "txHash", "createdAt"
+FROM "Bet"
+WHERE "marketId" = $1
+  AND "createdAt" >= COALESCE($2::timestamp, '-infinity')
+  AND "createdAt" < COALESCE($3::timestamp, 'infinity')
+ORDER BY "createdAt", id
+'''
+
+# (output column, row key) per export
+EXPORTS: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {
+    VOTES: (VOTE_EXPORT_SQL, [
+        ("vote_id", "voteId"), ("wallet_address", "walletAddress"), ("choice", "choice"),
+        ("amount", "amount"), ("created_at", "createdAt"), ("updated_at", "updatedAt"),
+    ]),
+    BETS: (BET_EXPORT_SQL, [
+        ("bet_id", "id"), ("wallet_address", "walletAddress"), ("choice", "choice"),
+        ("amount", "amount"), ("bet_number", "betNumber"), ("status", "status"),
+        ("tx_hash", "txHash"), ("created_at", "createdAt"),
+    ]),
+}
+
+export_slots = asyncio.Semaphore(int(os.getenv("EXPORT_CONCURRENCY", "2")))
+
+# Leading characters spreadsheets treat as the start of a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Row keys whose text comes from clients. Generated ids are base64 and may
+# start with "+", so they are written untouched.
+CLIENT_TEXT_KEYS = {"walletAddress"}
+
+def _csv_value(key: str, value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if key in CLIENT_TEXT_KEYS and isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return "" if value is None else value
+
+def encode_ndjson(rows: Sequence, columns: List[Tuple[str, str]]) -> bytes:
+    lines = []
+    for row in rows:
+        record = {}
+        for name, key in columns:
+            value = row[key]
+            if key == "amount":
+                value = to_usdt(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            record[name] = value
+        lines.append(frames.dumps(record))
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+def encode_csv(rows: Sequence, columns: List[Tuple[str, str]], header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow([name for name, _ in columns])
+    for row in rows:
+        writer.writerow([
+            format_amount(row[key]) if key == "amount" else _csv_value(key, row[key])
+            for _, key in columns
+        ])
+    return out.getvalue().encode()
+
+async def stream_export(
+    market_id: str,
+    kind: str = VOTES,
+    fmt: str = NDJSON,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_rows: int = 1000,
+    prefetch: int = 5000,
+    acquire: Callable = acquire_connection,
+) -> AsyncIterator[bytes]:
+    """Encoded chunks of a market's rows, oldest first"""
+    sql, columns = EXPORTS[kind]
+    async with export_slots:
+        async with acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                if fmt == CSV:
+                    yield encode_csv([], columns, header=True)
+                chunk = []
+                async for row in conn.cursor(sql, market_id, since, until, prefetch=prefetch):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_rows:
+                        yield encode_csv(chunk, columns) if fmt == CSV else encode_ndjson(chunk, columns)
+                        chunk = []
+                if chunk:
+                    yield encode_csv(chunk, columns) if fmt == CSV else encode_ndjson(chunk, columns)
@@ -0,0 +1,166 @@
+import time
+from typing import Dict, Optional, Tuple
+from app.services import redis as redis_service
+
+class InMemoryExposureStore:
+    """
+    Per-process exposure ledger, for tests and Redis-less development
+
+    Stakes, limits and totals are 6-decimal base units (ints). Reservations are held until committed (bet confirmed), released, or
+    their TTL passes, at which point their stake stops counting.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, int] = {}
+        self.reservations: Dict[str, Tuple[str, int, float]] = {}
+
+    def _purge_expired(self, now: float):
+        for reservation_id, (_, _, expires_at) in list(self.reservations.items()):
+            if expires_at <= now:
+                self._drop(reservation_id)
+
+    def _drop(self, reservation_id: str):
+        key, stake, _ = self.reservations.pop(reservation_id)
+        self.totals[key] = self.totals.get(key, 0) - stake
+
+    async def reserve(self, key: str, stake: int, limit: int, reservation_id: str, ttl: int) -> bool:
+        """Atomically check the limit and hold `stake` against it; stakes must be positive"""
+        now = time.time()
+        self._purge_expired(now)
+        if stake <= 0 or self.totals.get(key, 0) + stake > limit:
+            return False
+        self.totals[key] = self.totals.get(key, 0) + stake
+        self.reservations[reservation_id] = (key, stake, now + ttl)
+        return True
+
+    async def release(self, reservation_id: str):
+        if reservation_id in self.reservations:
+            self._drop(reservation_id)
+
+    async def commit(self, reservation_id: str) -> bool:
+        """Keep the stake as permanent exposure; False if the reservation already lapsed"""
+        self._purge_expired(time.time())
+        return self.reservations.pop(reservation_id, None) is not None
+
+    async def refund(self, key: str, stake: int):
+        """Hand back a committed stake whose bet never happened"""
+        self.totals[key] = self.totals.get(key, 0) - stake
+
+    async def exposure(self, key: str) -> int:
+        self._purge_expired(time.time())
+        return self.totals.get(key, 0)
+
+# Expired reservations are swept inside the scripts before the limit check
+# (or read), so exposure from abandoned quotes is returned without a separate
+# job. Reservation hashes carry no TTL: the sweep, release or commit is what
+# deletes them, so an expired stake can always be found and handed back. The
+# sweep touches reservation hashes not listed in KEYS, so this needs a single
+# Redis node (not Redis Cluster). KEYS[2] is the reservations ZSET, ARGV[3]
+# the current time in ms and ARGV[6] the reservation key prefix. Stakes are
+# integer base units, so totals move by INCRBY/DECRBY and stay exact.
+SWEEP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[3], 'LIMIT', 0, 100)
+for _, id in ipairs(expired) do
+    local held = redis.call('HMGET', ARGV[6] .. id, 'key', 'stake')
+    if held[1] then
+        redis.call('DECRBY', held[1], held[2])
+        redis.call('DEL', ARGV[6] .. id)
+    end
+    redis.call('ZREM', KEYS[2], id)
+end
+"""
+
+# A zero or negative stake would lower the shared total, so it is refused
+RESERVE_SCRIPT = SWEEP_SCRIPT + """
+local stake = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if not stake or stake <= 0 or current + stake > tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('HSET', KEYS[3], 'key', KEYS[1], 'stake', ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[5])
+return 1
+"""
+
+# Same argument layout as RESERVE_SCRIPT so the sweep reads the same ARGV slots
+EXPOSURE_SCRIPT = SWEEP_SCRIPT + """
+return redis.call('GET', KEYS[1])
+"""
+
+# Swept first, like RESERVE_SCRIPT, so a lapsed reservation is never kept;
+# KEYS[1] is the reservation hash
+COMMIT_SCRIPT = SWEEP_SCRIPT + """
+redis.call('DEL', KEYS[1])
+return redis.call('ZREM', KEYS[2], ARGV[5])
+"""
+
+RELEASE_SCRIPT = """
+local held = redis.call('HMGET', KEYS[1], 'key', 'stake')
+if held[1] then
+    redis.call('DECRBY', held[1], held[2])
+    redis.call('DEL', KEYS[1])
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+return held[1] and 1 or 0
+"""
+
+class RedisExposureStore:
+    """Exposure ledger shared by every worker, one round trip per operation"""
+
+    TOTAL_PREFIX = "exposure:"
+    RESERVATION_PREFIX = "exposure:reservation:"
+    RESERVATIONS_KEY = "exposure:reservations"
+
+    def __init__(self, client):
+        self.client = client
+        self._reserve = client.register_script(RESERVE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._exposure = client.register_script(EXPOSURE_SCRIPT)
+        self._commit = client.register_script(COMMIT_SCRIPT)
+
+    async def reserve(self, key: str, stake: int, limit: int, reservation_id: str, ttl: int) -> bool:
+        now_ms = int(time.time() * 1000)
+        reserved = await self._reserve(
+            keys=[self.TOTAL_PREFIX + key, self.RESERVATIONS_KEY, self.RESERVATION_PREFIX + reservation_id],
+            args=[stake, limit, now_ms, now_ms + ttl * 1000, reservation_id, self.RESERVATION_PREFIX]
+        )
+        return bool(reserved)
+
+    async def release(self, reservation_id: str):
+        await self._release(
+            keys=[self.RESERVATION_PREFIX + reservation_id, self.RESERVATIONS_KEY],
+            args=[reservation_id]
+        )
+
+    async def commit(self, reservation_id: str) -> bool:
+        now_ms = int(time.time() * 1000)
+        committed = await self._commit(
+            keys=[self.RESERVATION_PREFIX + reservation_id, self.RESERVATIONS_KEY],
+            args=[0, 0, now_ms, 0, reservation_id, self.RESERVATION_PREFIX]
+        )
+        return bool(committed)
+
+    async def refund(self, key: str, stake: int):
+        await self.client.decrby(self.TOTAL_PREFIX + key, stake)
+
+    async def exposure(self, key: str) -> int:
+        now_ms = int(time.time() * 1000)
+        value = await self._exposure(
+            keys=[self.TOTAL_PREFIX + key, self.RESERVATIONS_KEY],
+            args=[0, 0, now_ms, 0, "", self.RESERVATION_PREFIX]
+        )
+        return int(value) if value else 0
+
+local_exposure_store = InMemoryExposureStore()
+_redis_store: Optional[RedisExposureStore] = None
+
+def get_exposure_store():
+    """Redis-backed ledger when Redis is connected, otherwise the in-process one"""
+    global _redis_store
+    client = redis_service.redis_client
+    if client is None:
+        return local_exposure_store
+    if _redis_store is None or _redis_store.client is not client:
+        _redis_store = RedisExposureStore(client)
+    return _redis_store
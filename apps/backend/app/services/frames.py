@@ -0,0 +1,83 @@
+import json
+import struct
+from typing import Any, List, Optional
+import msgpack
+
+# orjson is an optional speedup; the stdlib encoder produces the same JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# WebSocket payload encodings a client can ask for with ?encoding=
+JSON = "json"
+MSGPACK = "msgpack"
+ENCODINGS = (JSON, MSGPACK)
+
+def loads(data: Any) -> Any:
+    """Decode JSON text or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(data: Any) -> str:
+    """Encode compact JSON text, ready to send as a WebSocket text frame"""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"))
+
+class Frame:
+    """
+    One outgoing message, encoded at most once per encoding
+
+    The broadcaster queues the same Frame for every recipient; whichever
+    encodings are requested are computed on first use and then reused.
+    """
+
+    __slots__ = ("data", "_text", "_binary")
+
+    def __init__(self, data: Any, text: Optional[str] = None):
+        self.data = data
+        self._text = text
+        self._binary: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.data if isinstance(self.data, str) else dumps(self.data)
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = msgpack.packb(self.data)
+        return self._binary
+
+    def encode(self, encoding: str):
+        return self.binary if encoding == MSGPACK else self.text
+
+def _msgpack_array_header(length: int) -> bytes:
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 0x10000:
+        return b"\xdc" + struct.pack(">H", length)
+    return b"\xdd" + struct.pack(">I", length)
+
+_MSGPACK_BATCH_PREFIX = b"\x82" + msgpack.packb("type") + msgpack.packb("batch") + msgpack.packb("ticks")
+
+def batch(frames: List[Frame], encoding: str):
+    """
+    {"type": "batch", "ticks": [...]} built from the frames' existing
+    encodings, so batching never re-serializes a tick
+    """
+    if len(frames) == 1:
+        return frames[0].encode(encoding)
+    if encoding == MSGPACK:
+        return _MSGPACK_BATCH_PREFIX + _msgpack_array_header(len(frames)) + b"".join(f.binary for f in frames)
+    return '{"type":"batch","ticks":[' + ",".join(f.text for f in frames) + "]}"
+
+def decode_request(message: dict) -> Any:
+    """Decode a client message received as either a text or binary frame"""
+    if message.get("bytes") is not None:
+        return msgpack.unpackb(message["bytes"])
+    return loads(message.get("text") or "")
@@ -0,0 +1,141 @@
+"""
+Read-through cache for the prediction market read endpoints
+
+Responses are cached as their JSON-ready bodies in two tiers: a per-process
+L1 dict (`l1_ttl`, about a second) in front of Redis (`ttl`, a few
+seconds; services/redis.py get_live_cache/set_live_cache). Concurrent
+misses on one key in a process share a single load, so an expiring hot key
+costs one Redis read and at most one Postgres query per worker.
+
+Writers call `invalidate` when votes commit or a market's status changes:
+it drops the market's keys (and the list) from L1 and Redis. Other workers
+drop their L1 copies when the broadcaster sees the vote or market message
+on pub/sub (`forget`); the TTLs bound anything missed.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from app.services import redis as redis_service
+
+LIST_KEY = "cache:markets"
+
+def market_key(market_id: str) -> str:
+    return f"cache:market:{market_id}"
+
+def stats_key(market_id: str) -> str:
+    return f"cache:market:{market_id}:stats"
+
+def affected_keys(market_ids) -> List[str]:
+    """Keys whose bodies include any of the markets"""
+    keys = [LIST_KEY]
+    for market_id in market_ids:
+        keys += [market_key(market_id), stats_key(market_id)]
+    return keys
+
+class MarketCache:
+    def __init__(self, ttl: int = 5, l1_ttl: float = 1.0, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.max_entries = max_entries
+        self.local: Dict[str, Tuple[float, Any]] = {}
+        # In-flight load per key; `forget` unregisters a key's load so
+        # whatever it returns isn't cached
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for `key`, loading it on a miss; None results aren't cached"""
+        entry = self.local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.l1_hits += 1
+            return entry[1]
+
+        task = self._loading.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._load(key, load))
+            self._loading[key] = task
+            task.add_done_callback(lambda done: self._loading.get(key) is done and self._loading.pop(key))
+        # A caller going away mustn't cancel the load others are waiting on
+        return await asyncio.shield(task)
+
+    def _current(self, key: str) -> bool:
+        """Whether the running load is still the one registered for `key` (not forgotten since it started)"""
+        return self._loading.get(key) is asyncio.current_task()
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        value = None
+        if redis_service.redis_client is not None:
+            try:
+                value = await redis_service.get_live_cache(key)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Market cache read failed: {e}")
+        if value is not None:
+            self.l2_hits += 1
+        else:
+            self.misses += 1
+            value = await load()
+            if value is None or not self._current(key):
+                return value
+            if redis_service.redis_client is not None:
+                try:
+                    await redis_service.set_live_cache(key, value, self.ttl)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️  Market cache write failed: {e}")
+
+        if self._current(key):
+            if len(self.local) >= self.max_entries:
+                self.local.pop(next(iter(self.local)))
+            self.local[key] = (time.monotonic() + self.l1_ttl, value)
+        return value
+
+    def forget(self, *market_ids: str):
+        """Drop this process's copies of the markets' entries and of the list"""
+        for key in affected_keys(market_ids):
+            self.local.pop(key, None)
+            # Later readers start a fresh load instead of joining one that may be stale
+            self._loading.pop(key, None)
+
+    async def invalidate(self, *market_ids: str):
+        """Drop the markets' entries everywhere; call after their votes or status change"""
+        self.invalidations += 1
+        self.forget(*market_ids)
+        client = redis_service.redis_client
+        if client is None:
+            return
+        try:
+            await client.delete(*affected_keys(market_ids))
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Market cache invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.l1_hits + self.l2_hits + self.coalesced
+        lookups = hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "l1_entries": len(self.local),
+            "ttl": self.ttl,
+            "l1_ttl": self.l1_ttl,
+        }
+
+market_cache = MarketCache(
+    ttl=int(os.getenv("MARKET_CACHE_TTL", "5")),
+    l1_ttl=float(os.getenv("MARKET_CACHE_L1_TTL", "1.0")),
+)
@@ -1,10 +1,18 @@
 import random
 from typing import Dict
+from app.models.money import SCALE
+from app.services.exposure import get_exposure_store
 
 class MarketManager:
-    def __init__(self):
-        self.exposure_limits = {"home": 10.0, "away": 10.0, "over": 10.0, "under": 10.0}
-        self.active_exposure = {}
+    def __init__(self, exposure_store=None):
+        # 6-decimal base units (10 CRO per side)
+        self.exposure_limits = {"home": 10 * SCALE, "away": 10 * SCALE, "over": 10 * SCALE, "under": 10 * SCALE}
+        # None: use Redis when connected, else the in-process ledger
+        self._exposure_store = exposure_store
+    
+    @property
+    def exposure_store(self):
+        return self._exposure_store or get_exposure_store()
     
     def calculate_odds(self, market_id: str) -> Dict[str, float]:
         """Dynamic odds with house edge"""
@@ -14,15 +22,28 @@ class MarketManager:
         base_odds["away"] += random.uniform(-0.05, 0.05)
         return base_odds
     
-    def check_exposure(self, market_id: str, side: str, stake: float) -> bool:
-        """Check risk limits"""
-        current_exposure = self.active_exposure.get(f"{market_id}:{side}", 0)
-        return (current_exposure + stake) <= self.exposure_limits.get(side, 10.0)
+    async def reserve_exposure(self, market_id: str, side: str, stake: int, reservation_id: str, ttl: int) -> bool:
+        """Check risk limits and hold the stake in one atomic step; expires after `ttl` seconds"""
+        return await self.exposure_store.reserve(
+            f"{market_id}:{side}",
+            stake,
+            self.exposure_limits.get(side, 10 * SCALE),
+            reservation_id,
+            ttl
+        )
+    
+    async def release_exposure(self, reservation_id: str):
+        await self.exposure_store.release(reservation_id)
+    
+    async def commit_exposure(self, reservation_id: str) -> bool:
+        """Make a reservation permanent once its bet is confirmed; False if it already lapsed"""
+        return await self.exposure_store.commit(reservation_id)
     
-    def quote_price(self, odds: float, stake: float) -> float:
-        """Apply 2% house edge"""
-        return stake * odds * 1.02
+    async def refund_exposure(self, market_id: str, side: str, stake: int):
+        """Give back the committed stake of a bet that was never minted"""
+        await self.exposure_store.refund(f"{market_id}:{side}", stake)
     
-    def update_exposure(self, market_id: str, side: str, stake: float):
-        key = f"{market_id}:{side}"
-        self.active_exposure[key] = self.active_exposure.get(key, 0) + stake
+    def quote_price(self, odds: float, stake: int) -> int:
+        """Apply 2% house edge; stake and price in 6-decimal base units"""
+        odds_bps = round(odds * 10_000)
+        return stake * odds_bps * 102 // 1_000_000
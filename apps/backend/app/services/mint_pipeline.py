@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+class MintPipeline:
+    """
+    Queue of confirmed bets minted by a fixed number of workers
+
+    `submit` returns a future resolving to the tx hash, so callers can wait
+    for the mint or move on. Each job is tried up to `attempts` times, but
+    only while `retryable(error)` holds: a mint whose transaction may already
+    be on its way must not be sent again. `on_settled(job, tx_hash, error)`
+    runs once per job with the outcome.
+    """
+
+    def __init__(
+        self,
+        mint: Callable[[Any], Awaitable[str]],
+        on_settled: Optional[Callable[[Any, Optional[str], Optional[BaseException]], Awaitable[None]]] = None,
+        concurrency: int = 4,
+        maxsize: int = 1000,
+        attempts: int = 3,
+        retryable: Callable[[BaseException], bool] = lambda error: True,
+    ):
+        self.mint = mint
+        self.on_settled = on_settled
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self.attempts = attempts
+        self.retryable = retryable
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self._loop = None
+        self.in_flight = 0
+        self.minted = 0
+        self.failed = 0
+        self.retries = 0
+        self.total_wait_ms = 0.0
+        self.total_submit_ms = 0.0
+        self.max_submit_ms = 0.0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self.queue = asyncio.Queue(self.maxsize)
+        self.workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self._loop = None
+
+    def submit(self, job: Any) -> asyncio.Future:
+        """Queue a mint; raises asyncio.QueueFull when the backlog is at capacity"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Failures are reported through on_settled, so a caller that stops
+        # waiting shouldn't trigger "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.queue.put_nowait((job, future, time.monotonic()))
+        return future
+
+    async def _mint(self, job: Any) -> str:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await self.mint(job)
+            except Exception as e:
+                if attempt == self.attempts or not self.retryable(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(0.1 * attempt)
+
+    async def _work(self):
+        while True:
+            job, future, queued_at = await self.queue.get()
+            started = time.monotonic()
+            self.total_wait_ms += (started - queued_at) * 1000
+            self.in_flight += 1
+            tx_hash, error = None, None
+            try:
+                tx_hash = await self._mint(job)
+                self.minted += 1
+            except Exception as e:
+                error = e
+                self.failed += 1
+            finally:
+                self.in_flight -= 1
+                submit_ms = (time.monotonic() - started) * 1000
+                self.total_submit_ms += submit_ms
+                self.max_submit_ms = max(self.max_submit_ms, submit_ms)
+                self.queue.task_done()
+
+            if not future.done():
+                if error is None:
+                    future.set_result(tx_hash)
+                else:
+                    future.set_exception(error)
+            if self.on_settled is not None:
+                try:
+                    await self.on_settled(job, tx_hash, error)
+                except Exception as e:
+                    print(f"❌ Mint settlement hook failed: {e}")
+
+    def stats(self) -> dict:
+        done = self.minted + self.failed
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_size": self.maxsize,
+            "workers": len(self.workers),
+            "in_flight": self.in_flight,
+            "minted": self.minted,
+            "failed": self.failed,
+            "retries": self.retries,
+            "avg_queue_wait_ms": round(self.total_wait_ms / done, 3) if done else 0.0,
+            "avg_submit_ms": round(self.total_submit_ms / done, 3) if done else 0.0,
+            "max_submit_ms": round(self.max_submit_ms, 3),
+        }
@@ -0,0 +1,27 @@
+"""
+Opaque keyset cursors for vote listings
+
+Pages are ordered by ("createdAt", "voteId") descending; a cursor encodes
+the last row of a page so the next one starts strictly after it, using the
+(…, "createdAt" DESC, "voteId" DESC) indexes from
+007_vote_history_indexes.sql instead of an OFFSET scan.
+"""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(created_at: datetime, vote_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{vote_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(createdAt, voteId) of the row a page ended on; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, vote_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), vote_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
@@ -0,0 +1,66 @@
+"""
+Parimutuel payout math over a column of winning amounts
+
+Amounts are USDT base units (6 decimals) and every result is an exact
+integer: a winner receives floor(amount * distributable / winning_pool),
+where distributable is the whole pool less the house fee. `parimutuel_payout`
+is the per-position reference; `payout_amounts` (what SettlementService
+uses) returns identical values for a whole column at once.
+
+NumPy is an optional speedup. amount * distributable overflows int64 for
+realistic pools, so the NumPy path estimates each payout in float64 and
+corrects it with an exact remainder computed in wrapping int64 arithmetic
+(the true remainder is small enough to survive the wrap). Inputs too large
+for that bound, or a missing NumPy, use Python integers over array('q').
+"""
+
+from array import array
+from typing import List, Sequence
+
+# NumPy is an optional speedup; results are the same without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BPS = 10_000
+_INT64_SAFE = 2 ** 62
+
+def house_fee(total_pool: int, edge_bps: int) -> int:
+    """House cut of the pool, rounded down"""
+    return total_pool * edge_bps // BPS
+
+def parimutuel_payout(amount: int, total_pool: int, winning_pool: int, edge_bps: int = 0) -> int:
+    """A winner's share of the pool after the house fee, in USDT base units (rounded down)"""
+    return amount * (total_pool - house_fee(total_pool, edge_bps)) // winning_pool
+
+def _numpy_payouts(amounts, distributable: int, winning_pool: int):
+    """floor(amounts * distributable / winning_pool) in int64, or None if it can't be done exactly"""
+    if not len(amounts):
+        return np.zeros(0, dtype=np.int64)
+    max_amount = int(amounts.max())
+    if max_amount >= 2 ** 53 or distributable >= _INT64_SAFE or winning_pool >= _INT64_SAFE:
+        return None
+    max_payout = max_amount * distributable // winning_pool
+    # float64 estimate is off by at most max_payout * 2**-51 + 2
+    error = (max_payout >> 51) + 2
+    if max_payout >= _INT64_SAFE or (error + 1) * winning_pool >= _INT64_SAFE:
+        return None
+
+    with np.errstate(over="ignore"):
+        estimate = np.floor(amounts.astype(np.float64) * (distributable / winning_pool)).astype(np.int64)
+        # Exact modulo 2**64, and the true value is within +-(error + 1) * winning_pool
+        remainder = amounts * np.int64(distributable) - estimate * np.int64(winning_pool)
+    return estimate + remainder // np.int64(winning_pool)
+
+def payout_amounts(amounts: Sequence[int], total_pool: int, winning_pool: int, edge_bps: int = 0) -> List[int]:
+    """parimutuel_payout for every amount, computed column-wise"""
+    if winning_pool <= 0:
+        return [0] * len(amounts)
+    distributable = total_pool - house_fee(total_pool, edge_bps)
+    if np is not None:
+        column = np.frombuffer(amounts, dtype=np.int64) if isinstance(amounts, array) else np.asarray(amounts, dtype=np.int64)
+        payouts = _numpy_payouts(column, distributable, winning_pool)
+        if payouts is not None:
+            return payouts.tolist()
+    return [amount * distributable // winning_pool for amount in amounts]
@@ -0,0 +1,206 @@
+"""
+Background "PoolSnapshot" writer feeding the odds-history buckets
+
+Every `check_interval` seconds one worker (whichever holds the transaction
+advisory lock) compares each unresolved market's pools with its latest
+snapshot. Markets whose YES percentage moved by at least `move_tenths`
+(tenths of a percent) get a snapshot straight away; every `interval`
+seconds any change at all is snapshotted. The time of that full run is kept
+in "PoolSnapshotRun" and claimed under the lock, so it happens once per
+interval across all workers and only counts once its snapshots commit.
+Unchanged markets are skipped, so a gap in the history means the pools
+didn't move.
+
+Each snapshot is rolled into "PoolSnapshotBucket" at every resolution in
+RESOLUTIONS within the same statement (008_pool_snapshot_buckets.sql), so
+the history endpoint only reads precomputed buckets.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from app.services.database import acquire_connection
+
+# Bucket widths served by /predictions/markets/{id}/history, in seconds
+RESOLUTIONS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+EPOCH = datetime(1970, 1, 1)
+
+# Only one worker writes per tick; the others find the lock taken and skip
+LOCK_SQL = "SELECT pg_try_advisory_xact_lock(hashtext('PoolSnapshot'))"
+
+# Claims the full run when the last one is at least $2 seconds older than $1;
+# no row back means it isn't due. Rolled back with the snapshots on failure.
+CLAIM_FULL_RUN_SQL = '''
+INSERT INTO "PoolSnapshotRun" AS r (name, "lastRunAt")
+VALUES ('full', $1)
+ON CONFLICT (name) DO UPDATE SET "lastRunAt" = EXCLUDED."lastRunAt"
+WHERE r."lastRunAt" <= EXCLUDED."lastRunAt" - $2::float8 * INTERVAL '1 second'
+RETURNING "lastRunAt"
+'''
+
+# $1 minimum YES move in tenths of a percent (0 = any change), $2 snapshot
+# time, $3 resolutions in seconds. Percentages round like money.percent_tenths.
+SNAPSHOT_SQL = '''
+WITH pools AS (
+    SELECT
+        m."marketId", m."yesPool", m."noPool", m."totalBets",
+        prev."yesPool" AS "lastYesPool", prev."noPool" AS "lastNoPool", prev."totalBets" AS "lastTotalBets",
+        CASE WHEN m."yesPool" + m."noPool" = 0 THEN 500
+             ELSE ((m."yesPool" * 2000 + m."yesPool" + m."noPool") / (2 * (m."yesPool" + m."noPool")))::INTEGER
+        END AS yes,
+        CASE WHEN prev."yesPool" + prev."noPool" = 0 THEN 500
+             ELSE ((prev."yesPool" * 2000 + prev."yesPool" + prev."noPool") / (2 * (prev."yesPool" + prev."noPool")))::INTEGER
+        END AS "lastYes"
+    FROM "Market" m
+    LEFT JOIN LATERAL (
+        SELECT ps."yesPool", ps."noPool", ps."totalBets"
+        FROM "PoolSnapshot" ps
+        WHERE ps."marketId" = m."marketId"
+        ORDER BY ps."createdAt" DESC
+        LIMIT 1
+    ) prev ON TRUE
+    WHERE m.status <> 'RESOLVED'
+),
+changed AS (
+    SELECT * FROM pools
+    WHERE "lastYesPool" IS NULL
+       OR (("yesPool", "noPool", "totalBets") IS DISTINCT FROM ("lastYesPool", "lastNoPool", "lastTotalBets")
+           AND ABS(yes - "lastYes") >= $1)
+),
+inserted AS (
+    INSERT INTO "PoolSnapshot" ("marketId", "yesPool", "noPool", "totalBets", "createdAt")
+    SELECT "marketId", "yesPool", "noPool", "totalBets", $2 FROM changed
+    RETURNING "marketId"
+)
+INSERT INTO "PoolSnapshotBucket" AS b (
+    "marketId", resolution, "bucketStart",
+    "yesOpen", "yesHigh", "yesLow", "yesClose",
+    "yesPool", "noPool", "totalBets"
+)
+SELECT
+    c."marketId",
+    r.resolution,
+    TIMESTAMP 'epoch' + FLOOR(EXTRACT(EPOCH FROM $2::timestamp) / r.resolution) * r.resolution * INTERVAL '1 second',
+    c.yes, c.yes, c.yes, c.yes,
+    c."yesPool", c."noPool", c."totalBets"
+FROM changed c
+JOIN inserted i ON i."marketId" = c."marketId"
+CROSS JOIN unnest($3::int[]) AS r(resolution)
+ON CONFLICT ("marketId", resolution, "bucketStart") DO UPDATE SET
+    "yesHigh" = GREATEST(b."yesHigh", EXCLUDED."yesClose"),
+    "yesLow" = LEAST(b."yesLow", EXCLUDED."yesClose"),
+    "yesClose" = EXCLUDED."yesClose",
+    "yesPool" = EXCLUDED."yesPool",
+    "noPool" = EXCLUDED."noPool",
+    "totalBets" = EXCLUDED."totalBets",
+    samples = b.samples + 1
+RETURNING "marketId"
+'''
+
+def bucket_start(at: datetime, resolution: int) -> datetime:
+    """Start of the bucket of width `resolution` seconds containing naive UTC `at`"""
+    seconds = int((at - EPOCH).total_seconds()) // resolution * resolution
+    return EPOCH + timedelta(seconds=seconds)
+
+class PoolSnapshotWriter:
+    def __init__(
+        self,
+        interval: float = 60.0,
+        check_interval: float = 5.0,
+        move_tenths: int = 10,
+        resolutions: Optional[List[int]] = None,
+        acquire: Callable = acquire_connection,
+    ):
+        self.interval = interval
+        self.check_interval = check_interval
+        self.move_tenths = move_tenths
+        self.resolutions = resolutions or sorted(RESOLUTIONS.values())
+        self.acquire = acquire
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.full_runs = 0
+        self.skipped_runs = 0
+        self.failed_runs = 0
+        self.snapshots = 0
+        self.last_run_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    async def start(self):
+        if not self.enabled or self.task is not None:
+            return
+        self.task = asyncio.create_task(self._run())
+        print(f"✅ Pool snapshot writer every {self.interval:g}s (moves of {self.move_tenths / 10:g}% every {self.check_interval:g}s)")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.write(self.move_tenths, full_every=self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed_runs += 1
+                print(f"❌ Pool snapshot run failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def write(
+        self,
+        min_move_tenths: int = 0,
+        now: Optional[datetime] = None,
+        full_every: Optional[float] = None,
+    ) -> Optional[int]:
+        """
+        Snapshot markets that moved by at least `min_move_tenths`, or that
+        changed at all when no full run committed in the last `full_every`
+        seconds. None if another worker holds the lock.
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        full = False
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                if not await conn.fetchval(LOCK_SQL):
+                    self.skipped_runs += 1
+                    return None
+                if full_every is not None:
+                    full = await conn.fetchval(CLAIM_FULL_RUN_SQL, now, full_every) is not None
+                rows = await conn.fetch(SNAPSHOT_SQL, 0 if full else min_move_tenths, now, self.resolutions)
+        written = len({row["marketId"] for row in rows})
+        self.runs += 1
+        if full:
+            self.full_runs += 1
+        self.snapshots += written
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return written
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.task is not None,
+            "interval": self.interval,
+            "check_interval": self.check_interval,
+            "move_percent": self.move_tenths / 10,
+            "runs": self.runs,
+            "full_runs": self.full_runs,
+            "skipped_runs": self.skipped_runs,
+            "failed_runs": self.failed_runs,
+            "snapshots": self.snapshots,
+            "last_run_ms": round(self.last_run_ms, 3),
+        }
+
+snapshot_writer = PoolSnapshotWriter(
+    interval=float(os.getenv("SNAPSHOT_INTERVAL", "60")),
+    check_interval=float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "5")),
+    move_tenths=int(os.getenv("SNAPSHOT_MOVE_TENTHS", "10")),
+)
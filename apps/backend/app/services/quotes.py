@@ -0,0 +1,79 @@
+import time
+from typing import Dict, Optional, Tuple
+from app.models.bet import QuoteRecord
+from app.services import redis as redis_service
+
+class InMemoryQuoteStore:
+    """Per-process quote store, for tests and Redis-less development"""
+
+    def __init__(self):
+        self.quotes: Dict[str, Tuple[QuoteRecord, float]] = {}
+
+    def _purge_expired(self, now: float):
+        for quote_id, (_, expires_at) in list(self.quotes.items()):
+            if expires_at <= now:
+                del self.quotes[quote_id]
+
+    async def save(self, quote: QuoteRecord):
+        now = time.time()
+        self._purge_expired(now)
+        self.quotes[quote.quote_id] = (quote, quote.expires_at)
+
+    async def get(self, quote_id: str) -> Optional[QuoteRecord]:
+        """Return a live quote without consuming it"""
+        held = self.quotes.get(quote_id)
+        if held is None or held[1] <= time.time():
+            return None
+        return held[0]
+
+    async def take(self, quote_id: str) -> Optional[QuoteRecord]:
+        """Remove and return a live quote, so each quote confirms at most once"""
+        held = self.quotes.pop(quote_id, None)
+        if held is None or held[1] <= time.time():
+            return None
+        return held[0]
+
+class RedisQuoteStore:
+    """
+    Quotes as Redis hashes expiring with the quote, shared by every worker
+
+    Saving and taking are a single MULTI/EXEC round trip; get is one HGETALL.
+    """
+
+    PREFIX = "quote:"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def save(self, quote: QuoteRecord):
+        key = self.PREFIX + quote.quote_id
+        fields = {name: str(value) for name, value in quote.model_dump().items() if value is not None}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            pipe.expireat(key, quote.expires_at)
+            await pipe.execute()
+
+    async def get(self, quote_id: str) -> Optional[QuoteRecord]:
+        fields = await self.client.hgetall(self.PREFIX + quote_id)
+        return QuoteRecord(**fields) if fields else None
+
+    async def take(self, quote_id: str) -> Optional[QuoteRecord]:
+        key = self.PREFIX + quote_id
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.delete(key)
+            fields, _ = await pipe.execute()
+        return QuoteRecord(**fields) if fields else None
+
+local_quote_store = InMemoryQuoteStore()
+_redis_store: Optional[RedisQuoteStore] = None
+
+def get_quote_store():
+    """Redis-backed store when Redis is connected, otherwise the in-process one"""
+    global _redis_store
+    client = redis_service.redis_client
+    if client is None:
+        return local_quote_store
+    if _redis_store is None or _redis_store.client is not client:
+        _redis_store = RedisQuoteStore(client)
+    return _redis_store
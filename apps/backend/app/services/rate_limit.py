@@ -0,0 +1,145 @@
+"""
+Request rate limiting
+
+Two tiers:
+
+1. A per-process token bucket, checked first, sheds obvious floods
+   without a Redis round trip. It is sized at a multiple of the real
+   limit so it only trips well beyond it.
+2. The shared limit, enforced in Redis by one Lua script call (fixed window
+   or GCRA sliding window). Without Redis, or if Redis errors, a local
+   bucket enforcing the real limit per process stands in.
+"""
+
+import time
+from typing import Dict, Optional, Sequence, Tuple
+from app.services import redis as redis_service
+
+FIXED_WINDOW = "fixed"
+SLIDING_WINDOW = "sliding"
+
+# INCR and expiry in one call, so a key can't be left without a TTL.
+# Every key is counted; the request passes only if all are under the limit.
+FIXED_WINDOW_SCRIPT = """
+local retry_after = 0
+for _, key in ipairs(KEYS) do
+    local count = redis.call('INCR', key)
+    if count == 1 then
+        redis.call('PEXPIRE', key, ARGV[2])
+    end
+    if count > tonumber(ARGV[1]) then
+        retry_after = math.max(retry_after, redis.call('PTTL', key), 1)
+    end
+end
+return retry_after
+"""
+
+# GCRA: each key stores its theoretical arrival time (TAT). A request is
+# admitted if it arrives no earlier than TAT - window, and then advances TAT
+# by window / limit. Keys are only updated if all of them admit the request.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[3])
+local window = tonumber(ARGV[2])
+local emission = window / tonumber(ARGV[1])
+local retry_after = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local tat = math.max(tonumber(redis.call('GET', key) or '0'), now)
+    tats[i] = tat + emission
+    retry_after = math.max(retry_after, tats[i] - window - now)
+end
+if retry_after > 0 then
+    return math.ceil(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil(tats[i] - now))
+end
+return 0
+"""
+
+SCRIPTS = {FIXED_WINDOW: FIXED_WINDOW_SCRIPT, SLIDING_WINDOW: SLIDING_WINDOW_SCRIPT}
+
+class TokenBucket:
+    """In-process token buckets, one per key, refilling at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Spend a token; returns 0 if one was available, else seconds until one is"""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self.buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / self.rate
+
+        # Re-inserted keys move to the end, so the first key is the least recently seen
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            del self.buckets[next(iter(self.buckets))]
+        return retry_after
+
+class RateLimiter:
+    """
+    `limit` requests per `window` seconds for each key
+
+    `hit` returns 0 when the request is admitted, otherwise the number of
+    seconds the caller should wait (for a Retry-After header).
+    """
+
+    def __init__(self, name: str, limit: int, window: int, algorithm: str = SLIDING_WINDOW, flood_factor: float = 3.0):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.script_source = SCRIPTS[algorithm]
+        self.flood = TokenBucket(limit * flood_factor / window, limit * flood_factor)
+        self.fallback = TokenBucket(limit / window, limit)
+        self._client = None
+        self._script = None
+        self.counters = {"allowed": 0, "limited": 0, "shed": 0, "fallback": 0}
+
+    def _redis_script(self):
+        client = redis_service.redis_client
+        if client is None:
+            return None
+        if self._client is not client:
+            self._client = client
+            self._script = client.register_script(self.script_source)
+        return self._script
+
+    async def _shared(self, keys: Sequence[str]) -> float:
+        script = self._redis_script()
+        if script is not None:
+            try:
+                retry_after_ms = await script(
+                    keys=[f"ratelimit:{self.name}:{key}" for key in keys],
+                    args=[self.limit, self.window * 1000, int(time.time() * 1000)]
+                )
+                return int(retry_after_ms) / 1000
+            except Exception as e:
+                print(f"⚠️  Rate limiter falling back to local limits: {e}")
+
+        self.counters["fallback"] += 1
+        return max(self.fallback.take(key) for key in keys)
+
+    async def hit(self, client_key: str, *extra_keys: str) -> float:
+        """
+        Count one request from `client_key` (the caller's IP) and any
+        `extra_keys` (e.g. a wallet); it is admitted only if every key is
+        under the limit. Only `client_key` goes through the flood tier.
+        """
+        retry_after = self.flood.take(client_key)
+        if retry_after:
+            self.counters["shed"] += 1
+            return retry_after
+
+        keys = [client_key, *(key for key in extra_keys if key)]
+        retry_after = await self._shared(keys)
+        self.counters["limited" if retry_after else "allowed"] += 1
+        return retry_after
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Offline check of "Market" pools against the full sum of "Vote" rows
+
+place_vote maintains "yesPool", "noPool" and "totalBets" incrementally, so
+this job recomputes them from scratch and reports (or, with --fix, repairs)
+any market that drifted.
+
+Usage: DATABASE_URL=... python3 -m app.services.reconciliation [--fix] [--market ID]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from typing import Dict, List, Optional
+
+import asyncpg
+
+from app.services import redis as redis_service
+from app.services.market_cache import market_cache
+
+DRIFT_SQL = '''
+SELECT
+    m."marketId",
+    m."yesPool", m."noPool", m."totalBets",
+    COALESCE(v.yes_total, 0) AS yes_total,
+    COALESCE(v.no_total, 0) AS no_total,
+    COALESCE(v.vote_count, 0) AS vote_count
+FROM "Market" m
+LEFT JOIN (
+    SELECT
+        "marketId",
+        SUM(amount) FILTER (WHERE choice = 'YES') AS yes_total,
+        SUM(amount) FILTER (WHERE choice = 'NO') AS no_total,
+        COUNT(*) AS vote_count
+    FROM "Vote"
+    WHERE ($1::text IS NULL OR "marketId" = $1)
+    GROUP BY "marketId"
+) v ON v."marketId" = m."marketId"
+WHERE ($1::text IS NULL OR m."marketId" = $1)
+  AND (
+    m."yesPool" <> COALESCE(v.yes_total, 0)
+    OR m."noPool" <> COALESCE(v.no_total, 0)
+    OR m."totalBets" <> COALESCE(v.vote_count, 0)
+  )
+'''
+
+# Locking the market row first makes concurrent place_vote statements wait
+# and then apply their deltas on top of the repaired totals. The lock is a
+# separate statement so the recount below takes its snapshot after it.
+LOCK_SQL = 'SELECT 1 FROM "Market" WHERE "marketId" = $1 FOR UPDATE'
+
+FIX_SQL = '''
+UPDATE "Market" m
+SET
+    "yesPool" = totals.yes_total,
+    "noPool" = totals.no_total,
+    "totalBets" = totals.vote_count
+FROM (
+    SELECT
+        COALESCE(SUM(amount) FILTER (WHERE choice = 'YES'), 0) AS yes_total,
+        COALESCE(SUM(amount) FILTER (WHERE choice = 'NO'), 0) AS no_total,
+        COUNT(*) AS vote_count
+    FROM "Vote"
+    WHERE "marketId" = $1
+) totals
+WHERE m."marketId" = $1
+'''
+
+async def find_pool_drift(conn: asyncpg.Connection, market_id: Optional[str] = None) -> List[Dict]:
+    """Markets whose stored pools/counts differ from the sum of their votes"""
+    rows = await conn.fetch(DRIFT_SQL, market_id)
+    return [
+        {
+            "market_id": row['marketId'],
+            "yes_pool": row['yesPool'],
+            "no_pool": row['noPool'],
+            "total_bets": row['totalBets'],
+            "expected_yes_pool": row['yes_total'],
+            "expected_no_pool": row['no_total'],
+            "expected_total_bets": row['vote_count'],
+        }
+        for row in rows
+    ]
+
+async def reconcile_pools(conn: asyncpg.Connection, fix: bool = False, market_id: Optional[str] = None) -> List[Dict]:
+    """Report drifted markets and optionally rewrite them from the vote sums"""
+    drift = await find_pool_drift(conn, market_id)
+    if fix:
+        for market in drift:
+            async with conn.transaction():
+                await conn.execute(LOCK_SQL, market["market_id"])
+                await conn.execute(FIX_SQL, market["market_id"])
+        if drift:
+            # Repaired pools change what the API serves for these markets
+            await market_cache.invalidate(*(market["market_id"] for market in drift))
+    return drift
+
+async def main():
+    parser = argparse.ArgumentParser(description="Verify market pools against vote sums")
+    parser.add_argument("--fix", action="store_true", help="Rewrite drifted pools from the vote sums")
+    parser.add_argument("--market", help="Only check this marketId")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    if args.fix:
+        # So API caches and ETags pick up repaired pools
+        await redis_service.init_redis()
+    conn = await asyncpg.connect(database_url)
+    try:
+        drift = await reconcile_pools(conn, fix=args.fix, market_id=args.market)
+    finally:
+        await conn.close()
+
+    if not drift:
+        print("✅ All market pools match their votes")
+        return
+    for market in drift:
+        print(
+            f"⚠️  {market['market_id']}: "
+            f"yes {market['yes_pool']} != {market['expected_yes_pool']}, "
+            f"no {market['no_pool']} != {market['expected_no_pool']}, "
+            f"bets {market['total_bets']} != {market['expected_total_bets']}"
+        )
+    print(f"{'🔧 Fixed' if args.fix else '❌ Found'} {len(drift)} drifted market(s)")
+    if not args.fix:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
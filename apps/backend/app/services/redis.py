@@ -2,6 +2,7 @@ import redis.asyncio as redis
 import json
 import os
 from typing import Optional, Dict, Any
+from app.services.channels import market_channel, vote_channel
 
 redis_client = None
 
@@ -18,33 +19,22 @@ async def init_redis():
         print("⚠️  Continuing without Redis - real-time updates will be disabled")
         redis_client = None
 
-async def get_rate_limit(key: str) -> Optional[int]:
-    if not redis_client: return None
-    value = await redis_client.get(key)
-    return int(value) if value else None
-
-async def increment_rate_limit(key: str, limit: int = 10, window: int = 60):
-    if not redis_client: return True
-    count = await redis_client.incr(key)
-    if count == 1:
-        await redis_client.expire(key, window)
-    return count <= limit
-
-async def set_rate_limit(key: str, value: int, expiry: int = 60):
-    if redis_client:
-        await redis_client.setex(key, expiry, value)
-
 async def publish_market_update(market_id: str, data: Dict[str, Any]):
     """Publish general market update"""
     if redis_client:
         try:
-            await redis_client.publish(f"market:{market_id}", json.dumps(data))
+            await redis_client.publish(market_channel(market_id), json.dumps(data))
             print(f"📢 Published market update for {market_id}")
         except Exception as e:
             print(f"❌ Failed to publish market update: {e}")
 
 async def publish_vote_update(market_id: str, vote_data: Dict[str, Any]):
-    """Publish vote update to WebSocket clients"""
+    """
+    Publish vote update to WebSocket clients
+
+    Pools and amounts are USDT base units and percentages tenths of a
+    percent; the broadcaster converts them for clients (money.to_wire).
+    """
     if redis_client:
         try:
             message = {
@@ -58,10 +48,11 @@ async def publish_vote_update(market_id: str, vote_data: Dict[str, Any]):
                 "total_voters": vote_data.get("total_voters"),
                 "last_vote": {
                     "choice": vote_data.get("choice"),
-                    "amount": vote_data.get("amount")
+                    "amount": vote_data.get("amount"),
+                    "wallet": vote_data.get("wallet", "anonymous")
                 }
             }
-            await redis_client.publish(f"market:{market_id}:votes", json.dumps(message))
+            await redis_client.publish(vote_channel(market_id), json.dumps(message))
             print(f"📢 Published vote update for market {market_id}")
         except Exception as e:
             print(f"❌ Failed to publish vote update: {e}")
@@ -1,12 +1,255 @@
-from typing import Dict, List
+#!/usr/bin/env python3
+"""
+Batched, resumable settlement of resolved prediction markets
+
+Resolving a market copies its winning votes into "SettlementWinner"
+(009_settlement_winners.sql) alongside the pools; the copy is streamed in
+keyset-ordered chunks and paid out `batch_size` winners per transaction, so
+votes changed after resolution can't alter who is paid. Every batch is journaled in
+"SettlementBatch" before it is sent and marked SENT afterwards (see
+005_settlement_checkpoints.sql). Running settlement again for the same
+market resends any batch left PENDING by a crash (the contract ignores a
+batch number it already paid) and carries on after the last journaled vote.
+
+Usage: DATABASE_URL=... python3 -m app.services.settlement MARKET_ID YES|NO
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.contracts import Contracts
+from app.services import redis as redis_service
+from app.services.market_cache import market_cache
+from app.services.redis import publish_market_update
+from app.services.payouts import payout_amounts
+
+# A session-level advisory lock keeps two settlement runs off the same market
+TRY_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('settlement:' || $1))"
+UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('settlement:' || $1))"
+
+LOCK_MARKET_SQL = 'SELECT 1 FROM "Market" WHERE "marketId" = $1 FOR UPDATE'
+
+# Resolves the market and fixes the pools and house edge payouts are
+# computed from, and the winning votes they are paid to (one snapshot, so
+# they agree). A resumed settlement keeps those recorded by the first run.
+START_SQL = '''
+WITH resolved AS (
+    UPDATE "Market"
+    SET status = 'RESOLVED', winner = $2
+    WHERE "marketId" = $1 AND (winner IS NULL OR winner = $2)
+    RETURNING "marketId"
+),
+pools AS (
+    SELECT
+        COALESCE(SUM(amount), 0) AS total_pool,
+        COALESCE(SUM(amount) FILTER (WHERE choice = $2), 0) AS winning_pool
+    FROM "Vote"
+    WHERE "marketId" = $1
+),
+settlement AS (
+    INSERT INTO "Settlement" ("marketId", winner, "totalPool", "winningPool", "houseEdgeBps")
+    SELECT resolved."marketId", $2, pools.total_pool, pools.winning_pool, $3
+    FROM resolved, pools
+    ON CONFLICT ("marketId") DO NOTHING
+    RETURNING "marketId"
+)
+INSERT INTO "SettlementWinner" ("marketId", "voteId", "walletAddress", amount)
+SELECT v."marketId", v.id, v."walletAddress", v.amount
+FROM "Vote" v
+JOIN settlement ON settlement."marketId" = v."marketId"
+WHERE v.choice = $2
+'''
+
+SETTLEMENT_SQL = '''
+SELECT "marketId", winner, "totalPool", "winningPool", "houseEdgeBps", status, "lastVoteId", "batchCount", "paidCount", "paidAmount"
+FROM "Settlement"
+WHERE "marketId" = $1
+'''
+
+PENDING_BATCHES_SQL = '''
+SELECT "batchNumber", "firstVoteId", "lastVoteId"
+FROM "SettlementBatch"
+WHERE "marketId" = $1 AND status = 'PENDING'
+ORDER BY "batchNumber"
+'''
+
+WINNERS_AFTER_SQL = '''
+SELECT "voteId" AS id, "walletAddress", amount
+FROM "SettlementWinner"
+WHERE "marketId" = $1 AND "voteId" > $2
+ORDER BY "voteId"
+LIMIT $3
+'''
+
+WINNERS_BETWEEN_SQL = '''
+SELECT "voteId" AS id, "walletAddress", amount
+FROM "SettlementWinner"
+WHERE "marketId" = $1 AND "voteId" BETWEEN $2 AND $3
+ORDER BY "voteId"
+'''
+
+# Journal the batch and move the resume point past it in one statement
+JOURNAL_SQL = '''
+WITH batch AS (
+    INSERT INTO "SettlementBatch" ("marketId", "batchNumber", "firstVoteId", "lastVoteId", "winnerCount", "totalAmount")
+    VALUES ($1, $2, $3, $4, $5, $6)
+)
+UPDATE "Settlement"
+SET "lastVoteId" = $4, "batchCount" = $2
+WHERE "marketId" = $1
+'''
+
+SENT_SQL = '''
+WITH batch AS (
+    UPDATE "SettlementBatch"
+    SET status = 'SENT', "txHash" = $3, "sentAt" = NOW()
+    WHERE "marketId" = $1 AND "batchNumber" = $2 AND status = 'PENDING'
+    RETURNING "winnerCount", "totalAmount"
+)
+UPDATE "Settlement" s
+SET
+    "paidCount" = s."paidCount" + batch."winnerCount",
+    "paidAmount" = s."paidAmount" + batch."totalAmount"
+FROM batch
+WHERE s."marketId" = $1
+'''
+
+COMPLETE_SQL = '''
+UPDATE "Settlement"
+SET status = 'COMPLETED', "completedAt" = NOW()
+WHERE "marketId" = $1
+'''
 
 class SettlementService:
-    async def settle_market(self, market_id: str, result: str, positions: List[Dict]):
-        """Process payouts for winning positions"""
-        print(f"🔄 Settling {market_id} -> Winner: {result}")
-        
-        winners = [p for p in positions if p["side"] == result]
-        total_payout = sum(p["stake"] * p["odds"] for p in winners)
-        
-        print(f"💰 Total payout: {total_payout} CRO")
-        # In production: batch transfer winnings
+    def __init__(
+        self,
+        contracts: Optional[Contracts] = None,
+        batch_size: int = 200,
+        chunk_size: int = 5000,
+        house_edge_bps: Optional[int] = None,
+    ):
+        self.contracts = contracts or Contracts()
+        self.batch_size = batch_size
+        self.house_edge_bps = int(os.getenv("SETTLEMENT_HOUSE_EDGE_BPS", "0")) if house_edge_bps is None else house_edge_bps
+        # Whole batches per fetch, so only the final batch can be short
+        self.chunk_size = max(batch_size, chunk_size - chunk_size % batch_size)
+
+    async def _start(self, conn: asyncpg.Connection, market_id: str, result: str) -> asyncpg.Record:
+        async with conn.transaction():
+            await conn.execute(LOCK_MARKET_SQL, market_id)
+            await conn.execute(START_SQL, market_id, result, self.house_edge_bps)
+        settlement = await conn.fetchrow(SETTLEMENT_SQL, market_id)
+        if settlement is None:
+            raise ValueError(f"Market {market_id} not found or already resolved to the other side")
+        if settlement['winner'] != result:
+            raise ValueError(f"Market {market_id} is already being settled as {settlement['winner']}")
+        return settlement
+
+    def _payouts(self, settlement: asyncpg.Record, winners: List[asyncpg.Record]) -> List[Tuple[str, int]]:
+        """(wallet, payout) per winning vote, computed over the amounts column at once"""
+        amounts = payout_amounts(
+            array("q", (row['amount'] for row in winners)),
+            settlement['totalPool'],
+            settlement['winningPool'],
+            settlement['houseEdgeBps']
+        )
+        return [(row['walletAddress'], amount) for row, amount in zip(winners, amounts)]
+
+    async def _send(self, conn: asyncpg.Connection, market_id: str, batch_number: int, payouts: List[Tuple[str, int]]):
+        tx_hash = await self.contracts.payout_batch(market_id, batch_number, payouts)
+        await conn.execute(SENT_SQL, market_id, batch_number, tx_hash)
+
+    def _summary(self, settlement: asyncpg.Record, resent: int, sent: int) -> Dict:
+        return {
+            "market_id": settlement['marketId'],
+            "winner": settlement['winner'],
+            "resent_batches": resent,
+            "batches": sent,
+            "total_batches": settlement['batchCount'],
+            "paid_count": settlement['paidCount'],
+            "paid_amount": settlement['paidAmount'],
+        }
+
+    async def settle_market(self, conn: asyncpg.Connection, market_id: str, result: str) -> Dict:
+        """Resolve `market_id` as `result` and pay its winners; safe to re-run after a crash"""
+        if not await conn.fetchval(TRY_LOCK_SQL, market_id):
+            raise RuntimeError(f"Market {market_id} is already being settled")
+        try:
+            print(f"🔄 Settling {market_id} -> Winner: {result}")
+            settlement = await self._start(conn, market_id, result)
+            # The market is RESOLVED now; drop cached reads and tell every worker
+            await market_cache.invalidate(market_id)
+            await publish_market_update(market_id, {"type": "status", "status": "RESOLVED", "winner": result})
+            if settlement['status'] == 'COMPLETED':
+                print(f"✅ {market_id} was already settled")
+                return self._summary(settlement, 0, 0)
+
+            # Batches journaled by an interrupted run; they may or may not have gone out
+            pending = await conn.fetch(PENDING_BATCHES_SQL, market_id)
+            for batch in pending:
+                winners = await conn.fetch(
+                    WINNERS_BETWEEN_SQL, market_id, batch['firstVoteId'], batch['lastVoteId']
+                )
+                await self._send(conn, market_id, batch['batchNumber'], self._payouts(settlement, winners))
+
+            batch_number = settlement['batchCount']
+            cursor = settlement['lastVoteId'] or ""
+            sent = 0
+            while True:
+                chunk = await conn.fetch(WINNERS_AFTER_SQL, market_id, cursor, self.chunk_size)
+                if not chunk:
+                    break
+                chunk_payouts = self._payouts(settlement, chunk)
+                for start in range(0, len(chunk), self.batch_size):
+                    winners = chunk[start:start + self.batch_size]
+                    payouts = chunk_payouts[start:start + self.batch_size]
+                    batch_number += 1
+                    await conn.execute(
+                        JOURNAL_SQL,
+                        market_id,
+                        batch_number,
+                        winners[0]['id'],
+                        winners[-1]['id'],
+                        len(payouts),
+                        sum(amount for _, amount in payouts)
+                    )
+                    await self._send(conn, market_id, batch_number, payouts)
+                    sent += 1
+                cursor = chunk[-1]['id']
+
+            await conn.execute(COMPLETE_SQL, market_id)
+            settlement = await conn.fetchrow(SETTLEMENT_SQL, market_id)
+            print(f"💰 Total payout: {settlement['paidAmount'] / 1_000_000} USDT to {settlement['paidCount']} winners")
+            return self._summary(settlement, len(pending), sent)
+        finally:
+            await conn.fetchval(UNLOCK_SQL, market_id)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Resolve a market and pay out its winners")
+    parser.add_argument("market_id")
+    parser.add_argument("result", choices=["YES", "NO"])
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("SETTLEMENT_BATCH_SIZE", "200")))
+    parser.add_argument("--house-edge-bps", type=int, help="House fee in basis points (default: SETTLEMENT_HOUSE_EDGE_BPS)")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    # Optional: without Redis, API caches catch up within MARKET_CACHE_TTL
+    await redis_service.init_redis()
+    conn = await asyncpg.connect(database_url)
+    try:
+        await SettlementService(batch_size=args.batch_size, house_edge_bps=args.house_edge_bps).settle_market(conn, args.market_id, args.result)
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set
+from app.models.money import percent_tenths
+from app.services.database import acquire_connection
+
+async def fetch_market_snapshot(market_id: str) -> Optional[Dict]:
+    """
+    Fetch latest market data from PostgreSQL
+
+    Pools are USDT base units and percentages tenths of a percent, as
+    money.to_wire expects.
+    """
+    async with acquire_connection() as conn:
+        row = await conn.fetchrow("""
+            SELECT "marketId", status, "yesPool", "noPool", "totalBets"
+            FROM "Market"
+            WHERE "marketId" = $1
+        """, market_id)
+
+        if row:
+            yes_pool = row['yesPool']
+            no_pool = row['noPool']
+            total_pool = yes_pool + no_pool
+
+            return {
+                "type": "market_update",
+                "market_id": row['marketId'],
+                "yes_pool": yes_pool,
+                "no_pool": no_pool,
+                "total_pool": total_pool,
+                "yes_percent": percent_tenths(yes_pool, total_pool),
+                "no_percent": percent_tenths(no_pool, total_pool),
+                "total_bets": row['totalBets'],
+                "status": row['status']
+            }
+    return None
+
+class MarketSnapshotCache:
+    """
+    Per-market snapshots shared by every WebSocket viewer
+
+    Concurrent refreshes of one market share a single in-flight fetch, and
+    fetches for a market start at most once per `min_interval` seconds, so a
+    burst of votes costs one query per window however many sockets watch.
+    Fetches are numbered: one that finishes after a later fetch of the same
+    market is stale and leaves the later result in place.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Optional[Dict]]], min_interval: float = 0.05):
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.snapshots: Dict[str, Dict] = {}
+        self._fetched_at: Dict[str, float] = {}
+        # Number of the fetch each cached snapshot came from
+        self._cached_fetch: Dict[str, int] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.fetches = 0
+        self.coalesced = 0
+        self.stale = 0
+
+    async def get(self, market_id: str) -> Optional[Dict]:
+        """Cached snapshot if there is one, otherwise fetch it"""
+        snapshot = self.snapshots.get(market_id)
+        if snapshot is not None:
+            return snapshot
+        return await self.refresh(market_id)
+
+    async def refresh(self, market_id: str) -> Optional[Dict]:
+        """Snapshot reflecting every change announced before this call"""
+        pending = self._pending.get(market_id)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            pending = asyncio.ensure_future(self._refresh(market_id))
+            self._pending[market_id] = pending
+        # Shielded so one viewer going away doesn't cancel everyone's fetch
+        return await asyncio.shield(pending)
+
+    async def _refresh(self, market_id: str) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        try:
+            delay = self._fetched_at.get(market_id, float("-inf")) + self.min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            # Changes announced after the fetch starts need a fetch of their own
+            self._pending.pop(market_id, None)
+        self._fetched_at[market_id] = loop.time()
+        self.fetches += 1
+        fetch_id = self.fetches
+        snapshot = await self.fetch(market_id)
+        if market_id not in self._fetched_at:
+            # Not cached if the market was forgotten while it was being fetched
+            return snapshot
+        if self._cached_fetch.get(market_id, 0) > fetch_id:
+            # A later fetch finished first; its result stands
+            self.stale += 1
+            return self.snapshots.get(market_id)
+        if snapshot is None:
+            # No such market (or no longer): keep nothing for it
+            self.forget(market_id)
+        else:
+            self.snapshots[market_id] = snapshot
+            self._cached_fetch[market_id] = fetch_id
+        return snapshot
+
+    def markets(self) -> Set[str]:
+        """Every market the cache holds anything for"""
+        return set(self.snapshots) | set(self._fetched_at)
+
+    def forget(self, market_id: str):
+        """Drop a market once nobody is watching it"""
+        self.snapshots.pop(market_id, None)
+        self._fetched_at.pop(market_id, None)
+        self._cached_fetch.pop(market_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached_markets": len(self.snapshots),
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "stale": self.stale,
+        }
+
+market_snapshots = MarketSnapshotCache(
+    fetch_market_snapshot,
+    min_interval=float(os.getenv("WS_SNAPSHOT_INTERVAL_MS", "50")) / 1000
+)
@@ -0,0 +1,62 @@
+"""
+Delta-encoded market tick protocol (WebSocket protocol version 2)
+
+Clients opt in with ?protocol=2. They receive:
+
+    {"type": "snapshot", "market_id": ..., "seq": n, "market": {...}}
+    {"type": "tick", "market_id": ..., "seq": n, "changes": {...}, "vote": {...}}
+    {"type": "batch", "ticks": [tick, tick, ...]}   (see frames.batch)
+
+`seq` increases by one per tick for each market. A client that sees a gap
+(or a tick for a market it has no snapshot of) sends
+{"type": "resync", "market_id": ...} and ignores ticks with seq <= the
+snapshot's seq.
+"""
+
+from typing import Dict, Optional, Tuple
+
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+
+# market_update fields carried by ticks; anything else is static or per-event
+TRACKED_FIELDS = ("yes_pool", "no_pool", "total_pool", "yes_percent", "no_percent", "total_bets", "status")
+
+class MarketTicker:
+    """Per-market sequence numbers and last published state"""
+
+    def __init__(self):
+        self.markets: Dict[str, Tuple[int, Dict]] = {}
+
+    def advance(self, market_id: str, update: Dict) -> Optional[Dict]:
+        """Tick describing what changed since the last one, or None if nothing did"""
+        seq, state = self.markets.get(market_id, (0, {}))
+        changes = {
+            field: update[field]
+            for field in TRACKED_FIELDS
+            if field in update and state.get(field) != update[field]
+        }
+        vote = update.get("vote")
+        if not changes and not vote:
+            return None
+
+        seq += 1
+        self.markets[market_id] = (seq, {**state, **changes})
+        tick = {"type": "tick", "market_id": market_id, "seq": seq, "changes": changes}
+        if vote:
+            tick["vote"] = vote
+        return tick
+
+    def seed(self, market_id: str, update: Dict):
+        """Start tracking a market from a freshly fetched snapshot"""
+        if market_id not in self.markets:
+            state = {field: update[field] for field in TRACKED_FIELDS if field in update}
+            self.markets[market_id] = (0, state)
+
+    def snapshot(self, market_id: str) -> Optional[Dict]:
+        if market_id not in self.markets:
+            return None
+        seq, state = self.markets[market_id]
+        return {"type": "snapshot", "market_id": market_id, "seq": seq, "market": state}
+
+    def forget(self, market_id: str):
+        self.markets.pop(market_id, None)
@@ -0,0 +1,243 @@
+"""
+Write-behind vote ingestion over a Redis Stream
+
+With VOTE_INGEST_MODE=queued, place_vote validates a vote, appends it to
+the "votes:ingest" stream and answers with a provisional pool estimate
+instead of holding a connection through the upsert. Every worker process
+runs one consumer in the "vote-writers" group: it reads up to `batch_size`
+entries, writes them with a single multi-row upsert (votes.apply_vote_batch),
+publishes the authoritative pools and only then acknowledges and deletes
+the entries.
+
+Entries stay pending until written, so a failed batch is retried and the
+entries of a dead worker are claimed by another after `claim_idle_ms`
+(checked every `claim_idle_ms`, however busy the stream is):
+votes are applied at least once. Each carries the sequence number it was
+accepted with (seq, from Postgres), and the upsert only replaces a wallet's
+vote with a newer one, so writing an
+entry again - even after a later vote from the same wallet - changes
+nothing. Entries Postgres rejects outright
+(e.g. the market was deleted or resolved meanwhile) are moved to
+"votes:dead".
+"""
+
+import asyncio
+import os
+import socket
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.services import redis as redis_service
+from app.services.database import acquire_connection
+from app.services.market_cache import market_cache
+from app.services.votes import MarketNotActive, PendingVote, apply_vote_batch, publish_pool_updates
+
+SYNC = "sync"
+QUEUED = "queued"
+
+STREAM = "votes:ingest"
+DEAD_STREAM = "votes:dead"
+GROUP = "vote-writers"
+
+# Errors that retrying the same entries won't fix; anything else (lost
+# connection, deadlock, pool exhausted) leaves the batch pending
+REJECTED_ERRORS = (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError, MarketNotActive)
+
+def parse_entry(fields: Dict[str, str]) -> PendingVote:
+    return PendingVote(
+        vote_id=fields["vote_id"],
+        market_id=fields["market_id"],
+        wallet=fields["wallet"],
+        choice=fields["choice"],
+        amount=int(fields["amount"]),
+        # Entries queued before votes carried a seq: their queue time
+        seq=int(fields["seq"]) if "seq" in fields else int(fields["queued_at"]) * 1000,
+    )
+
+class VoteQueue:
+    def __init__(
+        self,
+        mode: str = SYNC,
+        batch_size: int = 500,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 30_000,
+        retry_delay: float = 1.0,
+        acquire: Callable = acquire_connection,
+    ):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.retry_delay = retry_delay
+        self.acquire = acquire
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.task: Optional[asyncio.Task] = None
+        # XAUTOCLAIM resumes where the last call stopped, so a long backlog
+        # of abandoned entries is worked through a page at a time
+        self._claim_cursor = "0-0"
+        self.enqueued = 0
+        self.applied = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dead = 0
+        self.total_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Queued mode needs Redis; without it votes are written synchronously"""
+        return self.mode == QUEUED and redis_service.redis_client is not None
+
+    async def start(self):
+        if not self.enabled or self.task is not None:
+            return
+        try:
+            await redis_service.redis_client.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self.task = asyncio.create_task(self._consume())
+        print(f"✅ Vote writer {self.consumer} consuming {STREAM}")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def enqueue(self, vote: PendingVote) -> str:
+        """Append a validated vote to the stream; returns the entry id"""
+        entry_id = await redis_service.redis_client.xadd(STREAM, {
+            **vote._asdict(),
+            "queued_at": int(time.time() * 1000),
+        })
+        self.enqueued += 1
+        return entry_id
+
+    async def _read(self, backlog: bool) -> List[Tuple[str, Optional[Dict]]]:
+        # "0" re-reads this consumer's own pending entries, ">" waits for new ones
+        response = await redis_service.redis_client.xreadgroup(
+            GROUP, self.consumer, {STREAM: "0" if backlog else ">"},
+            count=self.batch_size, block=None if backlog else self.block_ms
+        )
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def _claim(self) -> List[Tuple[str, Optional[Dict]]]:
+        """Take over entries another consumer read but never acknowledged"""
+        response = await redis_service.redis_client.xautoclaim(
+            STREAM, GROUP, self.consumer, self.claim_idle_ms, start_id=self._claim_cursor, count=self.batch_size
+        )
+        self._claim_cursor = response[0]
+        return response[1]
+
+    async def _consume(self):
+        backlog = True
+        last_claim = time.monotonic()
+        while True:
+            failed = False
+            try:
+                # On a timer rather than when reads come back empty: under
+                # steady load they never do, and a dead worker's entries
+                # would stay pending for good. A scan that stopped mid-way
+                # carries on straight away.
+                if self._claim_cursor != "0-0" or time.monotonic() - last_claim > self.claim_idle_ms / 1000:
+                    last_claim = time.monotonic()
+                    claimed = await self._claim()
+                    if claimed and not await self.write(claimed):
+                        failed = True
+                entries = await self._read(backlog)
+                if entries and not await self.write(entries):
+                    failed = True
+                # Keep re-reading pending entries until a short page shows they're drained
+                backlog = failed or (backlog and len(entries) == self.batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Vote stream read failed: {e}")
+                failed = backlog = True
+            if failed:
+                await asyncio.sleep(self.retry_delay)
+
+    async def write(self, entries: List[Tuple[str, Optional[Dict]]]) -> bool:
+        """Apply a batch of stream entries; False leaves them pending for a retry"""
+        votes: List[Tuple[str, PendingVote]] = []
+        dead: List[Tuple[str, Optional[Dict]]] = []
+        lags = []
+        now_ms = time.time() * 1000
+        for entry_id, fields in entries:
+            try:
+                vote = parse_entry(fields)
+                queued_at = int(fields.get("queued_at", now_ms))
+            except (KeyError, TypeError, ValueError):
+                # Deleted while pending (fields come back empty) or malformed
+                dead.append((entry_id, fields))
+                continue
+            votes.append((entry_id, vote))
+            lags.append(now_ms - queued_at)
+
+        try:
+            async with self.acquire() as conn:
+                try:
+                    markets = await apply_vote_batch(conn, [vote for _, vote in votes])
+                except REJECTED_ERRORS:
+                    markets = await self._write_each(conn, votes, dead)
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"❌ Vote batch of {len(votes)} failed, will retry: {e}")
+            return False
+
+        rejected = {entry_id for entry_id, _ in dead}
+        applied = [vote for entry_id, vote in votes if entry_id not in rejected]
+        await market_cache.invalidate(*markets)
+        await publish_pool_updates(markets, applied)
+        await self._finish(entries, dead)
+        self.batches += 1
+        self.applied += len(applied)
+        if lags:
+            self.total_lag_ms += sum(lags)
+            self.max_lag_ms = max(self.max_lag_ms, max(lags))
+        return True
+
+    async def _write_each(self, conn, votes, dead) -> Dict[str, Dict]:
+        """Fallback for a rejected batch: write votes one at a time, setting aside the bad ones"""
+        markets: Dict[str, Dict] = {}
+        for entry_id, vote in votes:
+            try:
+                markets.update(await apply_vote_batch(conn, [vote]))
+            except REJECTED_ERRORS as e:
+                print(f"❌ Vote {vote.vote_id} rejected: {e}")
+                dead.append((entry_id, vote._asdict()))
+        return markets
+
+    async def _finish(self, entries, dead):
+        client = redis_service.redis_client
+        entry_ids = [entry_id for entry_id, _ in entries]
+        async with client.pipeline(transaction=True) as pipe:
+            for _, fields in dead:
+                if fields:
+                    pipe.xadd(DEAD_STREAM, fields)
+            pipe.xack(STREAM, GROUP, *entry_ids)
+            pipe.xdel(STREAM, *entry_ids)
+            await pipe.execute()
+        self.dead += sum(1 for _, fields in dead if fields)
+
+    def stats(self) -> dict:
+        return {
+            "mode": QUEUED if self.enabled else SYNC,
+            "consumer": self.consumer if self.task is not None else None,
+            "enqueued": self.enqueued,
+            "applied": self.applied,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "dead": self.dead,
+            "avg_batch_size": round(self.applied / self.batches, 1) if self.batches else 0.0,
+            "avg_lag_ms": round(self.total_lag_ms / self.applied, 3) if self.applied else 0.0,
+            "max_lag_ms": round(self.max_lag_ms, 3),
+        }
+
+vote_queue = VoteQueue(
+    mode=os.getenv("VOTE_INGEST_MODE", SYNC),
+    batch_size=int(os.getenv("VOTE_BATCH_SIZE", "500")),
+)
@@ -0,0 +1,276 @@
+"""
+Vote writes against "Vote" and the denormalized "Market" pools
+
+`apply_vote` places one vote; `apply_vote_batch` places many with a single
+multi-row upsert over unnest()ed arrays, moving each market's pools by the
+summed deltas between the new votes and the ones they replace. A vote
+never replaces one accepted after it (PendingVote.seq, from the vote_seq
+sequence); both report whether each vote was written. Both lock
+the "Market" rows first (LOCK_MARKETS_SQL), in a statement of their own,
+and raise MarketNotActive (writing nothing) if a market has stopped taking
+votes. Amounts are USDT base units.
+"""
+
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import asyncpg
+
+from app.models.money import percent_tenths
+from app.services.redis import publish_vote_update
+
+# Votes without a wallet share one row per market, as they always have
+ANONYMOUS_WALLET = "0x0000000000000000000000000000000000000000"
+
+class MarketNotActive(Exception):
+    """The market was resolved (or otherwise closed) before the vote was written"""
+
+    def __init__(self, market_id: str):
+        self.market_id = market_id
+        super().__init__(f"Market is not active: {market_id}")
+
+# Serializes writers per market. It has to be a separate statement before
+# the upsert: all CTEs of one statement share its snapshot, so a "prev" read
+# in the same statement as the lock wouldn't see a wallet's first vote
+# committed while we waited, and the ON CONFLICT update would then replace
+# it without subtracting it from the pools.
+LOCK_MARKETS_SQL = '''
+SELECT "marketId"
+FROM "Market"
+WHERE "marketId" = ANY($1::text[])
+ORDER BY "marketId"
+FOR UPDATE
+'''
+
+# "prev" reads the wallet's current vote before the upsert replaces it; all
+# CTEs share one snapshot, so the pool deltas are computed against the old
+# row whichever CTE runs first. It takes no row locks of its own (FOR UPDATE
+# skips rows the same statement's upsert has already changed); instead
+# apply_vote holds the market's row lock, which every vote writer takes.
+# A vote only replaces one accepted before it (lower seq; $6 NULL takes the
+# next one now): a stream entry written twice can't undo a newer vote, and
+# when the upsert leaves the row alone the pools don't move either and the
+# stored vote is returned with applied = false.
+# Only an ACTIVE market's pools move; no row back means the market closed
+# (settlement holds the same lock while resolving it) and the caller rolls
+# the upsert back. Pools are verified offline by services/reconciliation.py
+APPLY_VOTE_SQL = '''
+WITH prev AS (
+    SELECT "voteId", choice, amount
+    FROM "Vote"
+    WHERE "marketId" = $2 AND "walletAddress" = $3
+),
+upserted AS (
+    INSERT INTO "Vote" ("voteId", "marketId", "walletAddress", choice, amount, seq, "createdAt", "updatedAt")
+    VALUES ($1, $2, $3, $4, $5, COALESCE($6::bigint, nextval('vote_seq')), NOW(), NOW())
+    ON CONFLICT ("marketId", "walletAddress")
+    DO UPDATE SET
+        choice = EXCLUDED.choice,
+        amount = EXCLUDED.amount,
+        seq = EXCLUDED.seq,
+        "updatedAt" = NOW()
+    WHERE "Vote".seq < EXCLUDED.seq
+    RETURNING "voteId", choice, amount
+),
+moves AS (
+    SELECT choice, amount, 1 AS voters FROM upserted
+    UNION ALL
+    SELECT choice, -amount, -1 FROM prev WHERE EXISTS (SELECT 1 FROM upserted)
+)
+UPDATE "Market"
+SET
+    "yesPool" = "yesPool" + COALESCE((SELECT SUM(amount) FROM moves WHERE choice = 'YES'), 0),
+    "noPool" = "noPool" + COALESCE((SELECT SUM(amount) FROM moves WHERE choice = 'NO'), 0),
+    "totalBets" = "totalBets" + COALESCE((SELECT SUM(voters) FROM moves), 0),
+    "updatedAt" = NOW()
+WHERE "marketId" = $2 AND status = 'ACTIVE'
+RETURNING
+    COALESCE((SELECT "voteId" FROM upserted), (SELECT "voteId" FROM prev)) AS "voteId",
+    EXISTS (SELECT 1 FROM upserted) AS applied,
+    COALESCE((SELECT choice FROM upserted), (SELECT choice FROM prev)) AS choice,
+    COALESCE((SELECT amount FROM upserted), (SELECT amount FROM prev)) AS amount,
+    "yesPool", "noPool", "totalBets"
+'''
+
+# Same delta logic (market lock, seq and status guards) as APPLY_VOTE_SQL
+# over a whole batch: written votes add to their side, the votes they
+# replace subtract from theirs and only new wallets count towards
+# "totalBets". ON CONFLICT can't touch a row twice, so the batch must hold
+# one vote per (market, wallet) - see coalesce_votes. Returns one row per
+# market with the stored vote of each of its wallets and whether the
+# incoming one was written.
+APPLY_VOTES_SQL = '''
+WITH incoming AS (
+    SELECT "voteId", "marketId", "walletAddress", choice, amount,
+           COALESCE(seq, nextval('vote_seq')) AS seq
+    FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::bigint[], $6::bigint[])
+        AS v("voteId", "marketId", "walletAddress", choice, amount, seq)
+),
+prev AS (
+    SELECT v."voteId", v."marketId", v."walletAddress", v.choice, v.amount
+    FROM "Vote" v
+    JOIN incoming i ON i."marketId" = v."marketId" AND i."walletAddress" = v."walletAddress"
+),
+upserted AS (
+    INSERT INTO "Vote" ("voteId", "marketId", "walletAddress", choice, amount, seq, "createdAt", "updatedAt")
+    SELECT "voteId", "marketId", "walletAddress", choice, amount, seq, NOW(), NOW()
+    FROM incoming
+    ON CONFLICT ("marketId", "walletAddress")
+    DO UPDATE SET
+        choice = EXCLUDED.choice,
+        amount = EXCLUDED.amount,
+        seq = EXCLUDED.seq,
+        "updatedAt" = NOW()
+    WHERE "Vote".seq < EXCLUDED.seq
+    RETURNING "voteId", "marketId", "walletAddress", choice, amount
+),
+moves AS (
+    SELECT i."marketId", i.choice, i.amount, 1 AS voters
+    FROM incoming i
+    JOIN upserted u ON u."marketId" = i."marketId" AND u."walletAddress" = i."walletAddress"
+    UNION ALL
+    SELECT p."marketId", p.choice, -p.amount, -1
+    FROM prev p
+    JOIN upserted u ON u."marketId" = p."marketId" AND u."walletAddress" = p."walletAddress"
+),
+deltas AS (
+    SELECT
+        markets."marketId",
+        COALESCE(SUM(moves.amount) FILTER (WHERE moves.choice = 'YES'), 0) AS yes_delta,
+        COALESCE(SUM(moves.amount) FILTER (WHERE moves.choice = 'NO'), 0) AS no_delta,
+        COALESCE(SUM(moves.voters), 0) AS new_voters
+    FROM (SELECT DISTINCT "marketId" FROM incoming) markets
+    LEFT JOIN moves ON moves."marketId" = markets."marketId"
+    GROUP BY markets."marketId"
+),
+updated AS (
+    UPDATE "Market" m
+    SET
+        "yesPool" = m."yesPool" + d.yes_delta,
+        "noPool" = m."noPool" + d.no_delta,
+        "totalBets" = m."totalBets" + d.new_voters,
+        "updatedAt" = NOW()
+    FROM deltas d
+    WHERE m."marketId" = d."marketId" AND m.status = 'ACTIVE'
+    RETURNING m."marketId", m."yesPool", m."noPool", m."totalBets"
+)
+SELECT u."marketId", u."yesPool", u."noPool", u."totalBets",
+       ids.wallets, ids."voteIds", ids.applied, ids.choices, ids.amounts
+FROM updated u
+JOIN (
+    SELECT
+        i."marketId",
+        array_agg(i."walletAddress") AS wallets,
+        array_agg(COALESCE(up."voteId", p."voteId")) AS "voteIds",
+        array_agg(up."voteId" IS NOT NULL) AS applied,
+        array_agg(COALESCE(up.choice, p.choice)) AS choices,
+        array_agg(COALESCE(up.amount, p.amount)) AS amounts
+    FROM incoming i
+    LEFT JOIN upserted up ON up."marketId" = i."marketId" AND up."walletAddress" = i."walletAddress"
+    LEFT JOIN prev p ON p."marketId" = i."marketId" AND p."walletAddress" = i."walletAddress"
+    GROUP BY i."marketId"
+) ids ON ids."marketId" = u."marketId"
+'''
+
+NEXT_VOTE_SEQ_SQL = "SELECT nextval('vote_seq')"
+
+async def next_vote_seq(conn: asyncpg.Connection) -> int:
+    """Sequence number for a vote accepted now; later votes replace earlier ones"""
+    return await conn.fetchval(NEXT_VOTE_SEQ_SQL)
+
+class PendingVote(NamedTuple):
+    """A validated vote waiting to be written; field order matches APPLY_VOTES_SQL"""
+    vote_id: str
+    market_id: str
+    wallet: str
+    choice: str
+    amount: int
+    # next_vote_seq() when accepted; None takes the next one at write time
+    seq: Optional[int] = None
+
+def _newer(vote: PendingVote, than: PendingVote) -> bool:
+    return vote.seq is None or than.seq is None or vote.seq >= than.seq
+
+def coalesce_votes(votes: Iterable[PendingVote]) -> List[PendingVote]:
+    """
+    The newest vote per (market, wallet), as a run of single upserts would leave it
+
+    Sorted by (market, wallet) so concurrent batches lock "Vote" rows in the
+    same order.
+    """
+    latest: Dict[tuple, PendingVote] = {}
+    for vote in votes:
+        key = (vote.market_id, vote.wallet)
+        if key not in latest or _newer(vote, latest[key]):
+            latest[key] = vote
+    return [latest[key] for key in sorted(latest)]
+
+async def apply_vote(conn: asyncpg.Connection, vote: PendingVote) -> asyncpg.Record:
+    """
+    Write one vote; the stored vote, whether this one was written
+    ("applied") and the market's new pools
+    """
+    async with conn.transaction():
+        await conn.execute(LOCK_MARKETS_SQL, [vote.market_id])
+        row = await conn.fetchrow(APPLY_VOTE_SQL, *vote)
+        if row is None:
+            raise MarketNotActive(vote.market_id)
+    return row
+
+async def apply_vote_batch(conn: asyncpg.Connection, votes: Sequence[PendingVote]) -> Dict[str, Dict]:
+    """
+    Write `votes` in one upsert
+
+    Returns the new pools per affected market, with each wallet's stored
+    vote under "votes" (a replaced vote keeps its original id; "applied" is
+    False where a newer vote was already stored). Nothing is written if any
+    of the markets isn't active.
+    """
+    batch = coalesce_votes(votes)
+    if not batch:
+        return {}
+    market_ids = sorted({vote.market_id for vote in batch})
+    async with conn.transaction():
+        await conn.execute(LOCK_MARKETS_SQL, market_ids)
+        rows = await conn.fetch(APPLY_VOTES_SQL, *(list(column) for column in zip(*batch)))
+        closed = set(market_ids) - {row['marketId'] for row in rows}
+        if closed:
+            raise MarketNotActive(min(closed))
+    return {
+        row['marketId']: {
+            "yes_pool": row['yesPool'],
+            "no_pool": row['noPool'],
+            "total_bets": row['totalBets'],
+            "votes": {
+                wallet: {"vote_id": vote_id, "applied": applied, "choice": choice, "amount": amount}
+                for wallet, vote_id, applied, choice, amount
+                in zip(row['wallets'], row['voteIds'], row['applied'], row['choices'], row['amounts'])
+            },
+        }
+        for row in rows
+    }
+
+async def publish_pool_updates(markets: Dict[str, Dict], votes: Sequence[PendingVote]):
+    """One vote_update per market in `markets`, carrying its latest written vote from `votes`"""
+    last_vote = {
+        vote.market_id: vote
+        for vote in votes
+        if markets.get(vote.market_id, {}).get("votes", {}).get(vote.wallet, {}).get("applied", True)
+    }
+    timestamp = int(time.time())
+    for market_id, pools in markets.items():
+        vote = last_vote.get(market_id)
+        if vote is None:
+            continue
+        total = pools["yes_pool"] + pools["no_pool"]
+        await publish_vote_update(market_id, {
+            "timestamp": timestamp,
+            "yes_pool": pools["yes_pool"],
+            "no_pool": pools["no_pool"],
+            "yes_percent": percent_tenths(pools["yes_pool"], total),
+            "no_percent": percent_tenths(pools["no_pool"], total),
+            "total_voters": pools["total_bets"],
+            "choice": vote.choice,
+            "amount": vote.amount,
+            "wallet": "anonymous" if vote.wallet == ANONYMOUS_WALLET else vote.wallet
+        })
@@ -0,0 +1,78 @@
+"""
+Real-Postgres fixture for the tests that exercise SQL
+
+Set TEST_DATABASE_URL to a database the tests may write to (never the one
+in .env). Each test using `pg` gets a fresh schema with every migration in
+migrations/ applied and no rows, dropped again afterwards; without the
+variable those tests are skipped.
+"""
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import asyncpg
+import pytest
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / "migrations"
+
+class PgSchema:
+    def __init__(self, dsn: str, schema: str):
+        self.dsn = dsn
+        self.schema = schema
+
+    async def connect(self) -> asyncpg.Connection:
+        # public stays on the path for extension functions (gen_random_bytes)
+        return await asyncpg.connect(self.dsn, server_settings={"search_path": f'"{self.schema}", public'})
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Drop-in for database.acquire_connection"""
+        conn = await self.connect()
+        try:
+            yield conn
+        finally:
+            await conn.close()
+
+    async def insert_market(self, conn: asyncpg.Connection, market_id: str, status: str = "ACTIVE"):
+        await conn.execute(
+            '''
+            INSERT INTO "Market" ("marketId", question, status, "endDate", "contractAddress", "gnosisSafeAddress")
+            VALUES ($1, 'Test market?', $2, NOW() + INTERVAL '1 day', '0x0', '0x0')
+            ''',
+            market_id,
+            status
+        )
+
+async def _create(pg: PgSchema):
+    conn = await asyncpg.connect(pg.dsn)
+    try:
+        await conn.execute(f'CREATE SCHEMA "{pg.schema}"')
+    finally:
+        await conn.close()
+    async with pg.acquire() as conn:
+        for migration in sorted(MIGRATIONS.glob("0*.sql")):
+            await conn.execute(migration.read_text(encoding="utf-8"))
+        # Start from empty tables, without the markets the migrations seed
+        await conn.execute('TRUNCATE "Market" CASCADE')
+
+async def _drop(pg: PgSchema):
+    conn = await asyncpg.connect(pg.dsn)
+    try:
+        await conn.execute(f'DROP SCHEMA IF EXISTS "{pg.schema}" CASCADE')
+    finally:
+        await conn.close()
+
+@pytest.fixture
+def pg():
+    dsn = os.getenv("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL not set")
+    schema = PgSchema(dsn, f"test_{uuid.uuid4().hex[:12]}")
+    asyncio.run(_create(schema))
+    try:
+        yield schema
+    finally:
+        asyncio.run(_drop(schema))
@@ -0,0 +1,154 @@
+import asyncio
+import json
+from app.services.broadcaster import MarketBroadcaster, ALL_MARKETS
+from app.services.snapshot_cache import MarketSnapshotCache
+from app.services.channels import market_channel, vote_channel, parse_channel
+from app.services.frames import Frame
+
+def make_snapshots(fetches: list, interval: float = 0.05) -> MarketSnapshotCache:
+    async def fetch(market_id: str):
+        fetches.append(market_id)
+        await asyncio.sleep(0.01)
+        return {"type": "market_update", "market_id": market_id, "total_bets": len(fetches)}
+    return MarketSnapshotCache(fetch, min_interval=interval)
+
+def test_handle_routes_by_market():
+    """A vote reaches its market's viewers and all-market viewers only"""
+    async def scenario():
+        hub = MarketBroadcaster(queue_size=10, snapshots=make_snapshots([]))
+        everyone = await hub.subscribe(ALL_MARKETS)
+        btc = await hub.subscribe("btc")
+        eth = await hub.subscribe("eth")
+
+        vote = json.dumps({"market_id": "btc", "last_vote": {"choice": "YES"}})
+        recipients = await hub.handle(vote_channel("btc"), vote)
+
+        assert recipients == 2
+        assert everyone.queue.qsize() == 1
+        assert eth.queue.empty()
+        update = json.loads(btc.queue.get_nowait().text)
+        assert (update["market_id"], update["vote"]["choice"]) == ("btc", "YES")
+
+        await hub.unsubscribe(eth)
+        assert "eth" not in hub.subscribers
+
+    asyncio.run(scenario())
+
+def test_slow_subscriber_drops_oldest():
+    """A full client queue sheds old items instead of blocking the hub"""
+    async def scenario():
+        hub = MarketBroadcaster(queue_size=2, snapshots=make_snapshots([]))
+        slow = await hub.subscribe("btc")
+        for i in range(5):
+            hub.fan_out("btc", Frame({"seq": i}))
+
+        assert slow.dropped == 3
+        assert [slow.queue.get_nowait().data["seq"] for _ in range(2)] == [3, 4]
+
+    asyncio.run(scenario())
+
+def test_vote_burst_coalesces_snapshot_fetches():
+    """Many viewers and a burst of votes share a bounded number of DB reads"""
+    async def scenario():
+        fetches = []
+        hub = MarketBroadcaster(queue_size=100, snapshots=make_snapshots(fetches))
+        viewers = [await hub.subscribe("btc") for _ in range(50)]
+
+        vote = json.dumps({"market_id": "btc", "last_vote": {"choice": "NO"}})
+        await asyncio.gather(*(hub.handle(vote_channel("btc"), vote) for _ in range(20)))
+
+        assert len(fetches) <= 2
+        assert all(viewer.queue.qsize() == 20 for viewer in viewers)
+        # Every viewer received the very same encoded frame object
+        first = [viewer.queue.get_nowait() for viewer in viewers]
+        assert all(frame is first[0] for frame in first)
+
+    asyncio.run(scenario())
+
+def test_channel_namespace_round_trips():
+    """Publishers' channel names parse back to the market and event"""
+    assert parse_channel(market_channel("eden-haus")) == ("eden-haus", "market")
+    assert parse_channel(vote_channel("eden-haus")) == ("eden-haus", "votes")
+    assert parse_channel("vote:update") == (None, None)
+
+def test_markets_are_forgotten_once_nobody_watches_them():
+    """Snapshots cached for all-market viewers don't outlive them"""
+    async def scenario():
+        fetches = []
+        hub = MarketBroadcaster(queue_size=10, snapshots=make_snapshots(fetches, interval=0))
+        everyone = await hub.subscribe(ALL_MARKETS)
+        btc = await hub.subscribe("btc")
+        for market_id in ("btc", "eth"):
+            await hub.handle(vote_channel(market_id), json.dumps({"market_id": market_id}))
+        assert set(hub.snapshots.snapshots) == set(hub.ticker.markets) == {"btc", "eth"}
+
+        await hub.unsubscribe(everyone)
+        assert set(hub.snapshots.snapshots) == set(hub.ticker.markets) == {"btc"}
+
+        # A later eth viewer gets a fresh snapshot, not the one from before
+        await hub.subscribe("eth")
+        await hub.snapshot_frame("eth")
+        assert fetches == ["btc", "eth", "eth"]
+
+        await hub.unsubscribe(btc)
+        assert "btc" not in hub.snapshots.snapshots and "btc" not in hub.ticker.markets
+
+    asyncio.run(scenario())
+
+def test_fetch_in_flight_when_forgotten_is_not_cached():
+    async def scenario():
+        snapshots = make_snapshots([], interval=0)
+        refresh = asyncio.ensure_future(snapshots.refresh("btc"))
+        await asyncio.sleep(0.005)  # fetch under way
+        snapshots.forget("btc")
+        assert await refresh is not None
+        assert "btc" not in snapshots.snapshots
+
+    asyncio.run(scenario())
+
+def test_markets_that_dont_exist_leave_nothing_behind():
+    """Channels such as a mint's market:{quote_id} fetch nothing and keep nothing"""
+    async def scenario():
+        fetches = []
+
+        async def fetch(market_id):
+            fetches.append(market_id)
+            return None
+
+        hub = MarketBroadcaster(queue_size=10, snapshots=MarketSnapshotCache(fetch, min_interval=0))
+        everyone = await hub.subscribe(ALL_MARKETS)
+        for quote_id in ("q1", "q2"):
+            await hub.handle(market_channel(quote_id), json.dumps({"status": "confirmed"}))
+        assert fetches == ["q1", "q2"]
+        assert hub.snapshots.markets() == set()
+
+        await hub.unsubscribe(everyone)
+        assert hub.snapshots.markets() == set() and hub.ticker.markets == {}
+
+    asyncio.run(scenario())
+
+def test_a_slow_fetch_never_replaces_a_later_one():
+    async def scenario():
+        delays = [0.05, 0.0]
+        calls = []
+
+        async def fetch(market_id):
+            calls.append(market_id)
+            total_bets = len(calls)
+            await asyncio.sleep(delays[total_bets - 1])
+            return {"type": "market_update", "market_id": market_id, "total_bets": total_bets}
+
+        hub = MarketBroadcaster(queue_size=10, snapshots=MarketSnapshotCache(fetch, min_interval=0))
+        viewer = await hub.subscribe("btc")
+        slow = asyncio.ensure_future(hub.handle(market_channel("btc"), json.dumps({})))
+        await asyncio.sleep(0.01)  # first fetch under way
+        await hub.handle(market_channel("btc"), json.dumps({}))
+        await slow
+
+        assert hub.snapshots.snapshots["btc"]["total_bets"] == 2
+        assert hub.ticker.markets["btc"][1]["total_bets"] == 2
+        assert hub.snapshots.stats()["stale"] == 1
+        sent = [viewer.queue.get_nowait().data["total_bets"] for _ in range(viewer.queue.qsize())]
+        assert sent == [2, 2]
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from main import app
+from app.services import database
+
+client = TestClient(app)
+
+class FakePool:
+    """Minimal stand-in for asyncpg.Pool"""
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self.in_use = 0
+
+    async def acquire(self, timeout=None):
+        if self.in_use >= self.size:
+            raise asyncio.TimeoutError()
+        self.in_use += 1
+        return object()
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+    def get_size(self): return self.size
+    def get_idle_size(self): return self.size - self.in_use
+    def get_min_size(self): return 1
+    def get_max_size(self): return self.size
+
+def test_predictions_unavailable_without_pool():
+    """Endpoints answer 503 instead of crashing when no pool exists"""
+    response = client.get("/api/v1/predictions/markets")
+    assert response.status_code == 503
+
+def test_pool_metrics_track_usage(monkeypatch):
+    """In-use/idle counts and timeouts are reported"""
+    pool = FakePool(size=1)
+    monkeypatch.setattr(database, "db_pool", pool)
+    monkeypatch.setattr(database, "pool_stats", database.PoolStats())
+
+    async def scenario():
+        async with database.acquire_connection():
+            metrics = database.pool_metrics()
+            assert metrics["in_use"] == 1
+            assert metrics["idle"] == 0
+            with pytest.raises(HTTPException) as error:
+                async with database.acquire_connection():
+                    pass
+            assert error.value.status_code == 503
+
+    asyncio.run(scenario())
+    metrics = client.get("/metrics/db").json()
+    assert metrics["connected"] is True
+    assert metrics["in_use"] == 0
+    assert metrics["acquired_total"] == 1
+    assert metrics["acquire_timeouts"] == 1
@@ -0,0 +1,96 @@
+import asyncio
+import csv
+import io
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from app.api.v1.predictions import naive_utc
+from app.services import export
+from app.services.export import BETS, CSV, NDJSON, VOTES, stream_export
+
+class FakeCursorDB:
+    """Serves rows through conn.cursor() the way asyncpg does, recording how it was opened"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.opened = []
+        self.transactions = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self, **options):
+        self.transactions.append(options)
+        yield
+
+    async def cursor(self, sql, market_id, since, until, prefetch):
+        self.opened.append((sql, market_id, since, until, prefetch))
+        for row in self.rows:
+            if (since is None or row["createdAt"] >= since) and (until is None or row["createdAt"] < until):
+                yield row
+
+def votes(count):
+    start = datetime(2026, 3, 1)
+    return [
+        {"voteId": f"v{i}", "walletAddress": f"0x{i}", "choice": "NO" if i % 2 else "YES",
+         "amount": 1_500_000 + i, "createdAt": start + timedelta(minutes=i), "updatedAt": start}
+        for i in range(count)
+    ]
+
+async def collect(db, **kwargs):
+    return [chunk async for chunk in stream_export("m1", acquire=db.acquire, chunk_rows=4, **kwargs)]
+
+def test_ndjson_export_streams_in_chunks_inside_one_snapshot():
+    db = FakeCursorDB(votes(10))
+    chunks = asyncio.run(collect(db, kind=VOTES, fmt=NDJSON, prefetch=7))
+
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [record["vote_id"] for record in records] == [f"v{i}" for i in range(10)]
+    assert records[1] == {
+        "vote_id": "v1", "wallet_address": "0x1", "choice": "NO", "amount": 1.500001,
+        "created_at": "2026-03-01T00:01:00", "updated_at": "2026-03-01T00:00:00",
+    }
+    assert db.opened[0][0] is export.VOTE_EXPORT_SQL and db.opened[0][4] == 7
+    assert db.transactions == [{"isolation": "repeatable_read", "readonly": True}]
+
+def test_csv_export_has_a_header_exact_amounts_and_honours_the_time_range():
+    db = FakeCursorDB(votes(10))
+    since, until = datetime(2026, 3, 1, 0, 2), datetime(2026, 3, 1, 0, 5)
+    chunks = asyncio.run(collect(db, kind=VOTES, fmt=CSV, since=since, until=until))
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["vote_id", "wallet_address", "choice", "amount", "created_at", "updated_at"]
+    assert [row[0] for row in rows[1:]] == ["v2", "v3", "v4"]
+    assert rows[1][3] == "1.500002"
+    assert db.opened[0][2:4] == (since, until)
+
+def test_csv_export_defuses_cells_a_spreadsheet_would_run_as_formulas():
+    rows = votes(5)
+    for row, wallet in zip(rows, ["=HYPERLINK(\"http://x\")", "+1", "-1+2", "@SUM(A1)", "\t=1"]):
+        row["walletAddress"] = wallet
+    chunks = asyncio.run(collect(FakeCursorDB(rows), kind=VOTES, fmt=CSV))
+
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert [row[1] for row in parsed[1:]] == ["'=HYPERLINK(\"http://x\")", "'+1", "'-1+2", "'@SUM(A1)", "'\t=1"]
+    # Amounts, ordinary text and generated ids are written as they are
+    assert parsed[1][2:4] == ["YES", "1.500000"]
+
+    bet = {"id": "+k3/Zw==", "walletAddress": "0xa", "choice": "YES", "amount": 2_000_000, "betNumber": 1,
+           "status": "CONFIRMED", "txHash": None, "createdAt": datetime(2026, 3, 1)}
+    chunks = asyncio.run(collect(FakeCursorDB([bet]), kind=BETS, fmt=CSV))
+    assert b"".join(chunks).decode().splitlines()[1].startswith("+k3/Zw==,0xa,")
+
+def test_bet_export_and_timezone_handling():
+    bet = {"id": "b1", "walletAddress": "0xa", "choice": "YES", "amount": 2_000_000, "betNumber": 1,
+           "status": "CONFIRMED", "txHash": None, "createdAt": datetime(2026, 3, 1)}
+    db = FakeCursorDB([bet])
+    chunks = asyncio.run(collect(db, kind=BETS, fmt=CSV))
+    assert b"".join(chunks).decode().splitlines()[1] == "b1,0xa,YES,2.000000,1,CONFIRMED,,2026-03-01T00:00:00"
+    assert db.opened[0][0] is export.BET_EXPORT_SQL
+
+    paris = timezone(timedelta(hours=1))
+    assert naive_utc(datetime(2026, 3, 1, 1, tzinfo=paris)) == datetime(2026, 3, 1)
+    assert naive_utc(None) is None
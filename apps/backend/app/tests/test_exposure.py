@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from app.models.money import SCALE
+from app.services.exposure import InMemoryExposureStore, RedisExposureStore
+from app.services.market_manager import MarketManager
+
+def test_concurrent_reservations_respect_limit():
+    """Racing quotes can never push exposure past the cap"""
+    async def scenario():
+        manager = MarketManager(exposure_store=InMemoryExposureStore())
+        results = await asyncio.gather(*(
+            manager.reserve_exposure("match-1", "home", SCALE, f"quote-{i}", ttl=300)
+            for i in range(25)
+        ))
+        assert sum(results) == 10
+        assert await manager.exposure_store.exposure("match-1:home") == 10 * SCALE
+
+    asyncio.run(scenario())
+
+def test_released_and_expired_reservations_free_capacity():
+    async def scenario():
+        store = InMemoryExposureStore()
+        assert await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "a", ttl=300)
+        assert not await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "b", ttl=300)
+
+        await store.release("a")
+        assert await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "b", ttl=0)
+        # "b" expired immediately, so its stake no longer counts
+        assert await store.reserve("m:home", 10 * SCALE, 10 * SCALE, "c", ttl=300)
+
+        await store.commit("c")
+        await store.release("c")
+        assert await store.exposure("m:home") == 10 * SCALE
+
+    asyncio.run(scenario())
+
+def test_non_positive_stakes_are_never_reserved():
+    async def scenario():
+        for store in (InMemoryExposureStore(), redis_store()):
+            assert await store.reserve("m:home", 10 * SCALE, 10 * SCALE, "full", ttl=300)
+            assert not await store.reserve("m:home", -5 * SCALE, 10 * SCALE, "negative", ttl=300)
+            assert not await store.reserve("m:home", 0, 10 * SCALE, "zero", ttl=300)
+            assert await store.exposure("m:home") == 10 * SCALE
+
+    asyncio.run(scenario())
+
+def redis_store():
+    """RedisExposureStore on fakeredis, which runs the Lua scripts (needs fakeredis[lua])"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisExposureStore(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+def test_redis_reservations_respect_limit_under_contention():
+    async def scenario():
+        store = redis_store()
+        results = await asyncio.gather(*(store.reserve("m:home", SCALE, 10 * SCALE, f"q{i}", ttl=300) for i in range(25)))
+        assert sum(results) == 10
+        assert await store.exposure("m:home") == 10 * SCALE
+
+    asyncio.run(scenario())
+
+def test_redis_expired_stake_is_returned_however_late_the_sweep(monkeypatch):
+    """Nothing reserves for long after a quote lapses; its stake still comes back"""
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    async def scenario():
+        store = redis_store()
+        assert await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "a", ttl=300)
+        assert not await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "b", ttl=300)
+
+        now[0] += 400
+        assert await store.exposure("m:home") == 0
+        assert await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "b", ttl=300)
+        assert await store.client.exists(store.RESERVATION_PREFIX + "a") == 0
+
+        now[0] += 86400
+        assert await store.reserve("m:home", 10 * SCALE, 10 * SCALE, "c", ttl=300)
+
+    asyncio.run(scenario())
+
+def test_redis_release_commit_and_refund(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    async def scenario():
+        store = redis_store()
+        assert await store.reserve("m:home", 6 * SCALE, 10 * SCALE, "a", ttl=300)
+        await store.release("a")
+        await store.release("a")  # a second release hands nothing back
+        assert await store.exposure("m:home") == 0
+
+        assert await store.reserve("m:home", 4 * SCALE, 10 * SCALE, "b", ttl=300)
+        assert await store.commit("b")
+        # Committed stakes are permanent, even past the reservation's expiry
+        now[0] += 400
+        await store.release("b")
+        assert await store.exposure("m:home") == 4 * SCALE
+        assert await store.client.zcard(store.RESERVATIONS_KEY) == 0
+
+        # A lapsed reservation can't be committed: its stake was handed back
+        assert await store.reserve("m:home", 2 * SCALE, 10 * SCALE, "c", ttl=300)
+        now[0] += 400
+        assert not await store.commit("c")
+        assert await store.exposure("m:home") == 4 * SCALE
+
+        await store.refund("m:home", 4 * SCALE)
+        assert await store.exposure("m:home") == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,206 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+import pytest
+from fastapi import HTTPException, Request
+from app.api.v1 import predictions
+from app.services import redis as redis_service
+from app.services.market_cache import LIST_KEY, MarketCache, market_key
+
+class FakeCacheRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+class SlowSource:
+    """Counts loads; each one waits so concurrent misses overlap"""
+
+    def __init__(self):
+        self.loads = 0
+        self.pools = 1_000_000
+
+    async def load(self):
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return {"yes_pool": self.pools}
+
+def test_concurrent_misses_share_one_load_then_hit_l1():
+    async def scenario():
+        cache = MarketCache(l1_ttl=60)
+        source = SlowSource()
+        results = await asyncio.gather(*(cache.get_or_load(market_key("m1"), source.load) for _ in range(50)))
+        assert source.loads == 1
+        assert all(result == {"yes_pool": 1_000_000} for result in results)
+        await cache.get_or_load(market_key("m1"), source.load)
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["l1_hits"]) == (1, 49, 1)
+
+    asyncio.run(scenario())
+
+def test_invalidation_drops_entries_and_in_flight_loads():
+    async def scenario():
+        cache = MarketCache(l1_ttl=60)
+        source = SlowSource()
+        await cache.get_or_load(market_key("m1"), source.load)
+        await cache.get_or_load(LIST_KEY, source.load)
+
+        # A load that read the old pools finishes after the vote commits
+        stale = asyncio.create_task(cache.get_or_load(market_key("m2"), source.load))
+        await asyncio.sleep(0)
+        source.pools = 2_000_000
+        await cache.invalidate("m1", "m2")
+        await stale
+
+        assert await cache.get_or_load(market_key("m1"), source.load) == {"yes_pool": 2_000_000}
+        assert await cache.get_or_load(market_key("m2"), source.load) == {"yes_pool": 2_000_000}
+        assert await cache.get_or_load(LIST_KEY, source.load) == {"yes_pool": 2_000_000}
+        assert source.loads == 6
+
+    asyncio.run(scenario())
+
+def test_invalidating_one_market_keeps_other_loads_in_flight():
+    async def scenario():
+        cache = MarketCache(l1_ttl=60)
+        source = SlowSource()
+        loading = asyncio.create_task(cache.get_or_load(market_key("m2"), source.load))
+        await asyncio.sleep(0)
+        await cache.invalidate("m1")
+        await loading
+
+        assert await cache.get_or_load(market_key("m2"), source.load) == {"yes_pool": 1_000_000}
+        assert source.loads == 1 and cache.stats()["l1_hits"] == 1
+
+    asyncio.run(scenario())
+
+def test_redis_tier_serves_other_workers_until_invalidated():
+    async def scenario():
+        redis = FakeCacheRedis()
+        previous, redis_service.redis_client = redis_service.redis_client, redis
+        try:
+            source = SlowSource()
+            first, second = MarketCache(), MarketCache()
+            await first.get_or_load(market_key("m1"), source.load)
+            assert json.loads(redis.values[market_key("m1")]) == {"yes_pool": 1_000_000}
+
+            assert await second.get_or_load(market_key("m1"), source.load) == {"yes_pool": 1_000_000}
+            assert source.loads == 1 and second.stats()["l2_hits"] == 1
+
+            source.pools = 3_000_000
+            await first.invalidate("m1")
+            second.forget("m1")  # what the broadcaster does on the vote message
+            assert await second.get_or_load(market_key("m1"), source.load) == {"yes_pool": 3_000_000}
+        finally:
+            redis_service.redis_client = previous
+
+    asyncio.run(scenario())
+
+class FakeMarketDB:
+    def __init__(self):
+        self.reads = 0
+        self.yes_pool = 1_000_000
+        self.version = 1
+
+    def update(self, yes_pool):
+        """What any UPDATE does, the version trigger included"""
+        self.yes_pool = yes_pool
+        self.version += 1
+
+    def row(self, market_id):
+        return {
+            "marketId": market_id, "question": "?", "status": "ACTIVE", "winner": None,
+            "yesPool": self.yes_pool, "noPool": 0, "totalBets": 1,
+            "startDate": datetime(2026, 1, 1), "endDate": datetime(2027, 1, 1), "version": self.version,
+        }
+
+    async def fetchrow(self, sql, market_id):
+        self.reads += 1
+        return self.row(market_id) if market_id == "m1" else None
+
+    async def fetch(self, sql):
+        self.reads += 1
+        return [self.row("m1")]
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+def get(path, etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": path, "headers": headers})
+
+def test_market_etags_follow_the_row_version_and_answer_304_from_the_cache(monkeypatch):
+    async def scenario():
+        db = FakeMarketDB()
+        monkeypatch.setattr(predictions, "acquire_connection", db.acquire)
+        monkeypatch.setattr(predictions, "market_cache", MarketCache(l1_ttl=60))
+
+        first = await predictions.get_market("m1", get("/markets/m1"))
+        etag = first.headers["etag"]
+        assert first.status_code == 200 and json.loads(first.body)["yes_pool"] == 1.0
+        assert first.headers["cache-control"] == "no-cache"
+
+        again = await predictions.get_market("m1", get("/markets/m1", etag))
+        assert again.status_code == 304 and again.headers["etag"] == etag
+        assert db.reads == 1
+
+        # A vote commits: version bumped, cached body dropped
+        db.update(yes_pool=2_000_000)
+        await predictions.market_cache.invalidate("m1")
+        changed = await predictions.get_market("m1", get("/markets/m1", etag))
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert json.loads(changed.body)["yes_pool"] == 2.0
+
+        # Updated outside the API, with nobody invalidating: the tag moves
+        # as soon as the cached body expires
+        db.update(yes_pool=3_000_000)
+        predictions.market_cache.local.clear()
+        outside = await predictions.get_market("m1", get("/markets/m1", changed.headers["etag"]))
+        assert outside.status_code == 200 and json.loads(outside.body)["yes_pool"] == 3.0
+
+        with pytest.raises(HTTPException):
+            await predictions.get_market("nope", get("/markets/nope"))
+
+    asyncio.run(scenario())
+
+def test_market_list_is_tagged_by_content_with_cdn_hints(monkeypatch):
+    async def scenario():
+        db = FakeMarketDB()
+        monkeypatch.setattr(predictions, "acquire_connection", db.acquire)
+        monkeypatch.setattr(predictions, "market_cache", MarketCache(l1_ttl=60))
+
+        first = await predictions.get_markets(get("/markets"))
+        assert "s-maxage" in first.headers["cache-control"]
+        etag = first.headers["etag"]
+        assert (await predictions.get_markets(get("/markets", f'W/{etag}, "other"'))).status_code == 304
+        assert db.reads == 1
+
+        # Same content after a reload keeps the same tag
+        predictions.market_cache.local.clear()
+        assert (await predictions.get_markets(get("/markets", etag))).status_code == 304
+        db.yes_pool = 5_000_000
+        predictions.market_cache.local.clear()
+        assert (await predictions.get_markets(get("/markets", etag))).status_code == 200
+
+    asyncio.run(scenario())
+
+def test_any_market_update_bumps_the_version_the_etag_is_built_from(pg):
+    """The frontend writes "Market" directly; the trigger versions its updates too"""
+    async def scenario():
+        async with pg.acquire() as conn:
+            await pg.insert_market(conn, "m1")
+            before = await conn.fetchrow(predictions.MARKET_BY_ID_SQL, "m1")
+            await conn.execute('UPDATE "Market" SET status = \'RESOLVED\', winner = \'YES\' WHERE "marketId" = $1', "m1")
+            after = await conn.fetchrow(predictions.MARKET_BY_ID_SQL, "m1")
+        assert before["version"] == 1 and after["version"] == 2
+
+    asyncio.run(scenario())
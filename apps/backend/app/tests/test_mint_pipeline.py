@@ -0,0 +1,131 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.core.contracts import Contracts, SendUnconfirmed, tx_hash
+from app.core.rpc import RPCClient
+from app.services.mint_pipeline import MintPipeline
+
+class StandInNode:
+    """Cronos node stand-in that holds one transaction per nonce, like a mempool"""
+
+    def __init__(self):
+        self.txs = {}
+        self.nonce_fetches = 0
+        self.posts = 0
+        self.reject_next = False
+        self.lose_replies = 0
+
+    def pending_count(self) -> int:
+        count = 0
+        while count in self.txs:
+            count += 1
+        return count
+
+    def error(self, call, message):
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": message}})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.posts += 1
+        call = json.loads(request.content)
+        if isinstance(call, list):
+            return httpx.Response(200, json=[self.read(one) for one in call])
+        if call["method"] != "eth_sendRawTransaction":
+            return httpx.Response(200, json=self.read(call))
+        raw = call["params"][0]
+        nonce = int(json.loads(bytes.fromhex(raw[2:]))["nonce"], 16)
+        reply = self.send(call, nonce, tx_hash(raw))
+        if self.lose_replies:
+            self.lose_replies -= 1
+            raise httpx.ReadTimeout("reply lost", request=request)
+        return reply
+
+    def read(self, call) -> dict:
+        if call["method"] == "eth_getTransactionCount":
+            self.nonce_fetches += 1
+            result = hex(self.pending_count())
+        else:
+            assert call["method"] == "eth_gasPrice"
+            result = "0x12a05f200"
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    def send(self, call, nonce: int, result: str) -> httpx.Response:
+        if self.reject_next:
+            self.reject_next = False
+            return self.error(call, "txpool is full")
+        if self.txs.get(nonce) == result:
+            return self.error(call, "already known")
+        if nonce in self.txs or nonce > self.pending_count():
+            return self.error(call, f"invalid nonce {nonce}; expected {self.pending_count()}")
+        self.txs[nonce] = result
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": call["id"], "result": result})
+
+def standin_contracts(node: StandInNode):
+    rpc = RPCClient(url="http://node", backoff=0, transport=httpx.MockTransport(node.handle))
+    return rpc, Contracts(rpc)
+
+def test_pipeline_mints_with_local_nonces_and_resyncs_after_errors():
+    async def scenario():
+        node = StandInNode()
+        rpc, contracts = standin_contracts(node)
+        settled = []
+        flaky = {5}
+
+        async def mint(index: int) -> str:
+            if index in flaky:
+                flaky.discard(index)
+                node.reject_next = True
+            return await contracts.mint_position(f"q{index}", "m", "home", 100_000, 1, "0xabc")
+
+        async def on_settled(index, tx_hash, error):
+            settled.append((index, tx_hash, error))
+
+        pipeline = MintPipeline(mint, on_settled=on_settled, concurrency=3, attempts=2)
+        futures = [pipeline.submit(index) for index in range(10)]
+        tx_hashes = await asyncio.gather(*futures)
+        await pipeline.stop()
+        await rpc.close()
+
+        assert sorted(node.txs) == list(range(10))
+        assert sorted(tx_hashes) == sorted(node.txs.values())
+        assert len(settled) == 10 and all(error is None for _, _, error in settled)
+        # Fetched once up front and once to resync after the rejected send,
+        # each time in one POST with the gas price
+        assert node.nonce_fetches == 2
+        assert contracts.nonces.resyncs == 1
+        assert node.posts == 11 * 2
+        stats = pipeline.stats()
+        assert (stats["minted"], stats["retries"], stats["queue_depth"]) == (10, 1, 0)
+
+    asyncio.run(scenario())
+
+def test_lost_send_reply_never_mints_twice():
+    """A send whose reply is lost is resent as the same transaction, never under a new nonce"""
+    async def scenario():
+        node = StandInNode()
+        rpc, contracts = standin_contracts(node)
+        pipeline = MintPipeline(
+            lambda index: contracts.mint_position(f"q{index}", "m", "home", 100_000, 1, "0xabc"),
+            attempts=3,
+            retryable=lambda error: not isinstance(error, SendUnconfirmed),
+        )
+
+        # The node takes the transaction but the reply never arrives
+        node.lose_replies = 1
+        assert await pipeline.submit(0) == node.txs[0]
+
+        # Nothing answers at all: give up without sending it under another nonce
+        node.lose_replies = contracts.send_attempts
+        with pytest.raises(SendUnconfirmed) as error:
+            await pipeline.submit(1)
+        assert error.value.tx_hash == node.txs[1]
+
+        # The next mint continues from the node's nonce
+        assert await pipeline.submit(2) == node.txs[2]
+        await pipeline.stop()
+        await rpc.close()
+
+        assert sorted(node.txs) == [0, 1, 2]
+        assert pipeline.stats()["retries"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+import json
+import pytest
+from pydantic import ValidationError
+from app.models.money import format_amount, parse_amount, percent_tenths, to_wire
+from app.models.prediction import VoteRequest
+from app.services.frames import Frame
+
+def test_amounts_parse_exactly_into_base_units():
+    """int(0.29 * 1_000_000) used to give 289999"""
+    assert VoteRequest(market_id="m", choice="YES", amount=0.29).amount == 290_000
+    assert parse_amount("99.999999") == 99_999_999
+    assert parse_amount(3) == 3_000_000
+    assert format_amount(1_500_000) == "1.500000"
+    assert percent_tenths(1, 3) == 333 and percent_tenths(0, 0) == 500
+
+@pytest.mark.parametrize("value", ["abc", "", "NaN", "Infinity", "1e999999999", float("inf"), float("nan"), None, [1], True, "0.0000001"])
+def test_invalid_amounts_are_value_errors(value):
+    """Rejected as validation errors (422), not exceptions escaping as 500s"""
+    with pytest.raises(ValueError):
+        parse_amount(value)
+    with pytest.raises(ValidationError):
+        VoteRequest(market_id="m", choice="YES", amount=value)
+
+def test_wire_format_keeps_decimal_amounts():
+    update = {
+        "type": "market_update",
+        "yes_pool": 525_000_000,
+        "no_pool": 725_000_001,
+        "total_pool": 1_250_000_001,
+        "yes_percent": percent_tenths(525_000_000, 1_250_000_001),
+        "total_bets": 3,
+        "vote": {"choice": "NO", "amount": 290_000},
+    }
+    sent = json.loads(Frame(to_wire(update)).text)
+    assert sent["yes_pool"] == 525.0
+    assert sent["no_pool"] == 725.000001
+    assert sent["yes_percent"] == 42.0
+    assert sent["total_bets"] == 3
+    assert sent["vote"]["amount"] == 0.29
+    assert update["yes_pool"] == 525_000_000
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.api.v1 import predictions
+from app.services.pagination import decode_cursor, encode_cursor
+
+class FakeVoteHistory:
+    """Evaluates the keyset page queries over in-memory "Vote" rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def fetch(self, sql, key, limit, *after):
+        self.queries.append(sql)
+        user_queries = (predictions.USER_VOTES_SQL, predictions.USER_VOTES_AFTER_SQL, predictions.USER_VOTES_OFFSET_SQL)
+        column = "walletAddress" if sql in user_queries else "marketId"
+        offset = 0
+        if sql in (predictions.MARKET_VOTES_OFFSET_SQL, predictions.USER_VOTES_OFFSET_SQL):
+            [offset], after = after, ()
+        assert bool(after) == (sql in (predictions.MARKET_VOTES_AFTER_SQL, predictions.USER_VOTES_AFTER_SQL))
+        rows = sorted(
+            (row for row in self.rows if row[column] == key and (not after or (row["createdAt"], row["voteId"]) < after)),
+            key=lambda row: (row["createdAt"], row["voteId"]),
+            reverse=True
+        )
+        return [dict(row, question="Q?") for row in rows[offset:offset + limit]]
+
+def make_votes(count):
+    start = datetime(2026, 3, 1, 12, 0, 0, 123456)
+    # Pairs of votes share a timestamp, so voteId has to break ties
+    return [
+        {
+            "voteId": f"v{i:03d}", "marketId": "m1", "walletAddress": f"0x{i % 3}",
+            "choice": "YES", "amount": 1_000_000, "createdAt": start + timedelta(seconds=i // 2),
+            "updatedAt": start,
+        }
+        for i in range(count)
+    ]
+
+def test_cursor_round_trips_and_rejects_garbage():
+    created_at = datetime(2026, 3, 1, 12, 0, 0, 5)
+    assert decode_cursor(encode_cursor(created_at, "abc|=/+")) == (created_at, "abc|=/+")
+    for bad in ("", "not base64!", encode_cursor(created_at, "x")[:-3]):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_market_votes_pages_cover_every_vote_once():
+    async def scenario():
+        db = FakeVoteHistory(make_votes(25))
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = await predictions.get_market_votes("m1", limit=10, cursor=cursor, offset=None, conn=db)
+            seen += [vote["vote_id"] for vote in page["votes"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert pages == 3
+        assert seen == sorted((f"v{i:03d}" for i in range(25)), reverse=True)
+
+    asyncio.run(scenario())
+
+def test_user_votes_are_bounded_and_reject_bad_cursors():
+    async def scenario():
+        db = FakeVoteHistory(make_votes(30))
+        page = await predictions.get_user_votes("0x1", limit=4, cursor=None, offset=None, conn=db)
+        assert len(page["votes"]) == 4 and page["next_cursor"]
+        assert page["votes"][0]["market_question"] == "Q?"
+        rest = await predictions.get_user_votes("0x1", limit=100, cursor=page["next_cursor"], offset=None, conn=db)
+        assert len(rest["votes"]) == 6 and rest["next_cursor"] is None
+
+        with pytest.raises(HTTPException) as error:
+            await predictions.get_user_votes("0x1", limit=4, cursor="%%%", offset=None, conn=db)
+        assert error.value.status_code == 400
+
+    asyncio.run(scenario())
+
+def test_offset_still_pages_for_older_clients():
+    async def scenario():
+        db = FakeVoteHistory(make_votes(25))
+        page = await predictions.get_market_votes("m1", limit=10, cursor=None, offset=10, conn=db)
+        assert [vote["vote_id"] for vote in page["votes"]] == [f"v{i:03d}" for i in range(14, 4, -1)]
+        assert db.queries[-1] is predictions.MARKET_VOTES_OFFSET_SQL
+        # Its cursor continues where the offset page ended
+        rest = await predictions.get_market_votes("m1", limit=10, cursor=page["next_cursor"], offset=None, conn=db)
+        assert [vote["vote_id"] for vote in rest["votes"]] == [f"v{i:03d}" for i in range(4, -1, -1)]
+
+        mine = await predictions.get_user_votes("0x1", limit=4, cursor=None, offset=4, conn=db)
+        assert len(mine["votes"]) == 4 and db.queries[-1] is predictions.USER_VOTES_OFFSET_SQL
+
+        with pytest.raises(HTTPException) as error:
+            await predictions.get_market_votes("m1", limit=10, cursor=page["next_cursor"], offset=10, conn=db)
+        assert error.value.status_code == 400
+
+    asyncio.run(scenario())
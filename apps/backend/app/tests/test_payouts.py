@@ -0,0 +1,54 @@
+import random
+from array import array
+import pytest
+from app.services import payouts
+from app.services.payouts import house_fee, parimutuel_payout, payout_amounts
+
+def reference_settlement(positions, winner, edge_bps):
+    """Straightforward list-of-dicts settlement the columnar code must reproduce"""
+    total_pool = sum(p["amount"] for p in positions)
+    winners = [(i, p) for i, p in enumerate(positions) if p["choice"] == winner]
+    winning_pool = sum(p["amount"] for _, p in winners)
+    return (
+        [i for i, _ in winners],
+        [parimutuel_payout(p["amount"], total_pool, winning_pool, edge_bps) for _, p in winners],
+    )
+
+def random_positions(rng, count, max_amount):
+    return [
+        {"walletAddress": f"0x{i:040x}", "choice": rng.choice(["YES", "NO"]), "amount": rng.randint(1, max_amount)}
+        for i in range(count)
+    ]
+
+@pytest.fixture(params=["numpy", "array"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(payouts, "np", None)
+    return request.param
+
+def test_column_payouts_match_reference_bit_for_bit(backend):
+    rng = random.Random(17)
+    # Up to 10M USDT stakes: amount * pool is far beyond int64
+    for count, max_amount in [(1, 10), (500, 5_000_000), (20_000, 10_000_000_000_000)]:
+        positions = random_positions(rng, count, max_amount)
+        total_pool = sum(p["amount"] for p in positions)
+        for winner in ("YES", "NO"):
+            # The winning amounts column, as SettlementService._payouts builds it
+            winning = array("q", (p["amount"] for p in positions if p["choice"] == winner))
+            for edge_bps in (0, 200, 9_999):
+                _, expected = reference_settlement(positions, winner, edge_bps)
+                paid = payout_amounts(winning, total_pool, sum(winning), edge_bps)
+                assert paid == expected
+                assert sum(paid) <= total_pool - house_fee(total_pool, edge_bps)
+
+def test_payouts_outside_the_int64_bound_stay_exact(backend):
+    """Inputs too large for the fast path fall back to Python integers"""
+    amounts = [2 ** 62, 3, 2 ** 40 + 1]
+    total_pool = 2 ** 70
+    winning_pool = 2 ** 62 + 2 ** 40 + 4
+    assert payout_amounts(amounts, total_pool, winning_pool, 150) == [
+        parimutuel_payout(amount, total_pool, winning_pool, 150) for amount in amounts
+    ]
+    assert payout_amounts([5, 7], 12, 0) == [0, 0]
@@ -0,0 +1,215 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.api.v1 import predictions
+from app.models.money import percent_tenths
+from app.services import pool_snapshots
+from app.services.pool_snapshots import PoolSnapshotWriter, bucket_start
+
+class FakeSnapshotDB:
+    """Evaluates SNAPSHOT_SQL and MARKET_HISTORY_SQL over in-memory rows"""
+
+    def __init__(self, markets):
+        self.markets = markets
+        self.snapshots = []
+        self.buckets = {}
+        self.lock_free = True
+        self.last_full_run = None
+        self.fail_next = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        # Only the full run claim needs rolling back in these tests
+        last_full_run = self.last_full_run
+        try:
+            yield
+        except Exception:
+            self.last_full_run = last_full_run
+            raise
+
+    async def fetchval(self, sql, *args):
+        if sql is pool_snapshots.LOCK_SQL:
+            return self.lock_free
+        if sql is pool_snapshots.CLAIM_FULL_RUN_SQL:
+            now, every = args
+            if self.last_full_run is not None and self.last_full_run > now - timedelta(seconds=every):
+                return None
+            self.last_full_run = now
+            return now
+        return 1 if args[0] in self.markets else None
+
+    async def fetch(self, sql, *args):
+        if sql is predictions.MARKET_HISTORY_SQL:
+            market_id, resolution, since, until = args
+            return [
+                {"bucketStart": start, **bucket}
+                for (m, r, start), bucket in sorted(self.buckets.items())
+                if m == market_id and r == resolution and since <= start < until
+            ]
+        assert sql is pool_snapshots.SNAPSHOT_SQL
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("connection lost")
+        return self.snapshot(*args)
+
+    def snapshot(self, min_move, now, resolutions):
+        rows = []
+        for market_id, market in self.markets.items():
+            if market["status"] == "RESOLVED":
+                continue
+            pools = (market["yesPool"], market["noPool"], market["totalBets"])
+            yes = percent_tenths(market["yesPool"], market["yesPool"] + market["noPool"])
+            last = next((s for s in reversed(self.snapshots) if s[0] == market_id), None)
+            if last is not None:
+                last_yes = percent_tenths(last[1], last[1] + last[2])
+                if pools == last[1:4] or abs(yes - last_yes) < min_move:
+                    continue
+            self.snapshots.append((market_id, *pools, now))
+            for resolution in resolutions:
+                key = (market_id, resolution, bucket_start(now, resolution))
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = {"yesOpen": yes, "yesHigh": yes, "yesLow": yes, "samples": 0}
+                bucket["yesHigh"] = max(bucket["yesHigh"], yes)
+                bucket["yesLow"] = min(bucket["yesLow"], yes)
+                bucket.update(yesClose=yes, yesPool=pools[0], noPool=pools[1], totalBets=pools[2])
+                bucket["samples"] += 1
+                rows.append({"marketId": market_id})
+        return rows
+
+def market(yes, no, bets, status="ACTIVE"):
+    return {"yesPool": yes, "noPool": no, "totalBets": bets, "status": status}
+
+def test_writer_skips_unchanged_markets_and_waits_for_significant_moves():
+    async def scenario():
+        db = FakeSnapshotDB({
+            "m1": market(1_000_000, 1_000_000, 2),
+            "m2": market(0, 0, 0),
+            "done": market(5_000_000, 0, 1, status="RESOLVED"),
+        })
+        writer = PoolSnapshotWriter(move_tenths=10, resolutions=[60, 300], acquire=db.acquire)
+        t0 = datetime(2026, 3, 1, 12, 0, 10)
+
+        assert await writer.write(0, now=t0) == 2
+        assert await writer.write(0, now=t0 + timedelta(seconds=5)) == 0
+
+        # 50.0% -> 50.2%: too small for a move check, picked up by the scheduled run
+        db.markets["m1"].update(yesPool=1_010_000, totalBets=3)
+        assert await writer.write(10, now=t0 + timedelta(seconds=10)) == 0
+        assert await writer.write(0, now=t0 + timedelta(seconds=15)) == 1
+
+        # 50.2% -> 60.0% is written by the move check
+        db.markets["m1"].update(yesPool=1_500_000, totalBets=4)
+        assert await writer.write(10, now=t0 + timedelta(seconds=20)) == 1
+
+        db.lock_free = False
+        assert await writer.write(0, now=t0 + timedelta(seconds=25)) is None
+        assert writer.stats()["skipped_runs"] == 1 and writer.stats()["snapshots"] == 4
+
+        bucket = db.buckets[("m1", 60, datetime(2026, 3, 1, 12, 0))]
+        assert (bucket["yesOpen"], bucket["yesHigh"], bucket["yesLow"], bucket["yesClose"]) == (500, 600, 500, 600)
+        assert bucket["samples"] == 3 and bucket["yesPool"] == 1_500_000
+
+    asyncio.run(scenario())
+
+def test_full_runs_happen_once_per_interval_across_workers():
+    async def scenario():
+        db = FakeSnapshotDB({"m1": market(1_000_000, 1_000_000, 2)})
+        first, second = (PoolSnapshotWriter(move_tenths=10, resolutions=[60], acquire=db.acquire) for _ in range(2))
+        t0 = datetime(2026, 3, 1, 12, 0, 10)
+
+        assert await first.write(10, now=t0, full_every=60) == 1
+
+        # A small change waits for the next full run, whichever worker gets it
+        db.markets["m1"].update(yesPool=1_010_000, totalBets=3)
+        assert await second.write(10, now=t0 + timedelta(seconds=5), full_every=60) == 0
+        assert await first.write(10, now=t0 + timedelta(seconds=30), full_every=60) == 0
+
+        # A full run that fails doesn't count: the next check retries it
+        db.fail_next = True
+        with pytest.raises(ConnectionError):
+            await second.write(10, now=t0 + timedelta(seconds=60), full_every=60)
+        assert await first.write(10, now=t0 + timedelta(seconds=65), full_every=60) == 1
+        assert await second.write(10, now=t0 + timedelta(seconds=70), full_every=60) == 0
+
+        assert (first.stats()["full_runs"], second.stats()["full_runs"]) == (2, 0)
+
+    asyncio.run(scenario())
+
+def test_bucket_start_aligns_to_the_resolution():
+    at = datetime(2026, 3, 1, 12, 34, 56, 789)
+    assert bucket_start(at, 60) == datetime(2026, 3, 1, 12, 34)
+    assert bucket_start(at, 300) == datetime(2026, 3, 1, 12, 30)
+    assert bucket_start(at, 86400) == datetime(2026, 3, 1)
+
+def test_history_serves_buckets_in_range():
+    async def scenario():
+        db = FakeSnapshotDB({"m1": market(1_000_000, 3_000_000, 4), "empty": market(0, 0, 0)})
+        writer = PoolSnapshotWriter(resolutions=[60, 300], acquire=db.acquire)
+        t0 = datetime(2026, 3, 1, 12, 0)
+        await writer.write(0, now=t0)
+        db.markets["m1"].update(yesPool=3_000_000)
+        await writer.write(0, now=t0 + timedelta(minutes=2))
+
+        history = await predictions.get_market_history(
+            "m1", resolution="1m", since=t0 + timedelta(seconds=30), until=t0 + timedelta(minutes=10), conn=db
+        )
+        assert history["since"] == t0
+        assert [point["time"] for point in history["points"]] == [t0, t0 + timedelta(minutes=2)]
+        assert history["points"][0]["yes_percent"] == {"open": 25.0, "high": 25.0, "low": 25.0, "close": 25.0}
+        assert history["points"][1]["no_percent"] == 50.0 and history["points"][1]["total_pool"] == 6.0
+
+        five = await predictions.get_market_history("m1", resolution="5m", since=t0, until=t0 + timedelta(hours=1), conn=db)
+        assert five["points"][0]["yes_percent"] == {"open": 25.0, "high": 50.0, "low": 25.0, "close": 50.0}
+
+        with pytest.raises(HTTPException) as error:
+            await predictions.get_market_history("m1", resolution="1m", since=t0, until=t0 + timedelta(days=1), conn=db)
+        assert error.value.status_code == 400
+        with pytest.raises(HTTPException) as error:
+            await predictions.get_market_history("nope", resolution="1h", since=None, until=None, conn=db)
+        assert error.value.status_code == 404
+
+    asyncio.run(scenario())
+
+def test_snapshot_statement_writes_buckets_against_postgres(pg):
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "m1")
+            await pg.insert_market(conn, "done", status="RESOLVED")
+            await conn.execute('UPDATE "Market" SET "yesPool" = 1000000, "noPool" = 3000000, "totalBets" = 2 WHERE "marketId" = \'m1\'')
+            writer = PoolSnapshotWriter(resolutions=[60, 300], acquire=pg.acquire)
+            t0 = datetime(2026, 3, 1, 12, 0, 10)
+
+            assert await writer.write(0, now=t0) == 1
+            assert await writer.write(0, now=t0 + timedelta(seconds=5)) == 0
+            await conn.execute('UPDATE "Market" SET "yesPool" = 3000000, "totalBets" = 3 WHERE "marketId" = \'m1\'')
+            assert await writer.write(300, now=t0 + timedelta(seconds=10)) == 0
+            assert await writer.write(10, now=t0 + timedelta(seconds=20)) == 1
+
+            assert await conn.fetchval('SELECT COUNT(*) FROM "PoolSnapshot"') == 2
+            history = await predictions.get_market_history(
+                "m1", resolution="1m", since=t0 - timedelta(minutes=1), until=t0 + timedelta(minutes=1), conn=conn
+            )
+            [point] = history["points"]
+            assert point["time"] == datetime(2026, 3, 1, 12, 0)
+            assert point["yes_percent"] == {"open": 25.0, "high": 50.0, "low": 25.0, "close": 50.0}
+            assert (point["total_pool"], point["total_bets"], point["samples"]) == (6.0, 3, 2)
+
+            # Full runs are claimed through "PoolSnapshotRun"
+            await conn.execute('UPDATE "Market" SET "yesPool" = 3010000, "totalBets" = 4 WHERE "marketId" = \'m1\'')
+            assert await writer.write(10, now=t0 + timedelta(seconds=25), full_every=60) == 1
+            await conn.execute('UPDATE "Market" SET "yesPool" = 3020000, "totalBets" = 5 WHERE "marketId" = \'m1\'')
+            assert await writer.write(10, now=t0 + timedelta(seconds=30), full_every=60) == 0
+            assert await conn.fetchval('SELECT "lastRunAt" FROM "PoolSnapshotRun"') == t0 + timedelta(seconds=25)
+            assert writer.stats()["full_runs"] == 1
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
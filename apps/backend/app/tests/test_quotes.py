@@ -0,0 +1,119 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from main import app
+from app.api.v1 import bets
+from app.models.bet import QuoteRecord
+from app.services.exposure import local_exposure_store
+from app.services.quotes import InMemoryQuoteStore
+
+client = TestClient(app)
+
+class RecordingContracts:
+    def __init__(self):
+        self.minted = []
+
+    async def mint_position(self, quote_id, market_id, side, stake, odds, wallet):
+        self.minted.append((quote_id, market_id, side, stake, odds, wallet))
+        return "0xabc"
+
+def test_confirm_mints_the_stored_quote_once(monkeypatch):
+    """Confirm uses the quoted market, side and stake, and a quote can't be reused"""
+    contracts = RecordingContracts()
+    monkeypatch.setattr(bets, "contracts", contracts)
+
+    quote = client.post("/api/v1/x402/place-bet", json={
+        "market_id": "quote-market",
+        "side": "away",
+        "stake": 0.5,
+        "wallet": "0x8ba1f109551bD432803012645Ac136ddd64DBA72"
+    })
+    quote_id = quote.headers["X-Quote-ID"]
+
+    confirmed = client.post("/api/v1/bets/confirm", json={"quote_id": quote_id})
+    assert confirmed.status_code == 200
+    assert contracts.minted == [(
+        quote_id, "quote-market", "away", 500_000,
+        int(round(quote.json()["odds"] * 10**18)),
+        "0x8ba1f109551bD432803012645Ac136ddd64DBA72"
+    )]
+    assert quote_id not in local_exposure_store.reservations
+
+    assert client.post("/api/v1/bets/confirm", json={"quote_id": quote_id}).status_code == 410
+    assert len(contracts.minted) == 1
+
+def test_unpaid_confirm_leaves_the_quote_for_a_retry(monkeypatch):
+    """A confirm that arrives before the payment neither burns the quote nor its exposure"""
+    contracts = RecordingContracts()
+    monkeypatch.setattr(bets, "contracts", contracts)
+    paid = False
+
+    async def verify(quote_id):
+        return {"quote_id": quote_id, "paid": paid}
+
+    monkeypatch.setattr(bets, "verify_x402_payment", verify)
+
+    quote_id = client.post("/api/v1/x402/place-bet", json={
+        "market_id": "retry-market", "side": "home", "stake": 0.25
+    }).headers["X-Quote-ID"]
+
+    assert client.post("/api/v1/bets/confirm", json={"quote_id": quote_id}).status_code == 400
+    assert quote_id in local_exposure_store.reservations
+    assert contracts.minted == []
+
+    paid = True
+    assert client.post("/api/v1/bets/confirm", json={"quote_id": quote_id}).status_code == 200
+    assert [minted[0] for minted in contracts.minted] == [quote_id]
+
+def test_confirm_keeps_the_stake_while_the_mint_is_queued(monkeypatch):
+    """The reservation is committed when confirm takes the quote, not when the mint lands"""
+    class SlowContracts(RecordingContracts):
+        async def mint_position(self, *args):
+            await asyncio.sleep(0.05)
+            return await super().mint_position(*args)
+
+    monkeypatch.setattr(bets, "contracts", SlowContracts())
+    monkeypatch.setattr(bets, "MINT_WAIT_SECONDS", 0)
+    quote_id = client.post("/api/v1/x402/place-bet", json={
+        "market_id": "slow-market", "side": "home", "stake": 0.5
+    }).headers["X-Quote-ID"]
+
+    assert client.post("/api/v1/bets/confirm", json={"quote_id": quote_id}).json()["status"] == "queued"
+    assert quote_id not in local_exposure_store.reservations
+    # Long past the quote's TTL the sweep has nothing to hand back
+    later = time.time() + 3600
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert asyncio.run(local_exposure_store.exposure("slow-market:home")) == 500_000
+
+def test_failed_mint_refunds_the_committed_stake(monkeypatch):
+    async def publish(channel, data):
+        published.append((channel, data))
+
+    published = []
+    monkeypatch.setattr(bets, "publish_market_update", publish)
+    quote = QuoteRecord(quote_id="q-fail", market_id="refund-market", side="away", odds=1.9,
+                        price=969_000, max_stake=1_000_000, stake=500_000, expires_at=2**31)
+
+    async def scenario():
+        assert await local_exposure_store.reserve("refund-market:away", 500_000, 10_000_000, "q-fail", ttl=300)
+        assert await bets.market_mgr.commit_exposure("q-fail")
+        await bets.settle_mint(quote, None, RuntimeError("reverted"))
+        assert await local_exposure_store.exposure("refund-market:away") == 0
+
+    asyncio.run(scenario())
+    assert published == [("q-fail", {"status": "failed"})]
+
+def test_expired_quotes_are_gone():
+    async def scenario():
+        store = InMemoryQuoteStore()
+        record = dict(market_id="m", side="home", odds=1.9, price=969_000, max_stake=1_000_000, stake=500_000)
+        await store.save(QuoteRecord(quote_id="live", expires_at=2**31, **record))
+        await store.save(QuoteRecord(quote_id="stale", expires_at=0, **record))
+
+        assert await store.take("stale") is None
+        assert await store.get("stale") is None
+        assert (await store.get("live")).stake == 500_000
+        assert (await store.take("live")).stake == 500_000
+        assert await store.take("live") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+import asyncio
+from fastapi.testclient import TestClient
+from main import app
+from app.api.v1 import x402
+from app.services.rate_limit import RateLimiter, TokenBucket
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.take("ip", now=0) == 0
+    assert bucket.take("ip", now=0) == 0
+    assert bucket.take("ip", now=0) == 0.5
+    assert bucket.take("ip", now=0.5) == 0
+    assert bucket.take("other", now=0.5) == 0
+
+def test_limits_apply_per_ip_and_per_wallet():
+    """Without Redis the per-process fallback enforces the limit"""
+    async def scenario():
+        limiter = RateLimiter("test", limit=3, window=60)
+        assert [await limiter.hit("ip:a", "wallet:x") for _ in range(3)] == [0, 0, 0]
+        assert await limiter.hit("ip:a") > 0
+        # A fresh IP is still capped by the exhausted wallet
+        assert await limiter.hit("ip:b", "wallet:x") > 0
+        assert await limiter.hit("ip:b", "wallet:y") == 0
+        assert limiter.counters["limited"] == 2
+
+    asyncio.run(scenario())
+
+def test_quote_endpoint_returns_retry_after(monkeypatch):
+    monkeypatch.setattr(x402, "quote_limiter", RateLimiter("bet", limit=1, window=60))
+    client = TestClient(app)
+    body = {"market_id": "limited-market", "side": "home", "stake": 0.01}
+
+    assert client.post("/api/v1/x402/place-bet", json=body).status_code == 402
+    limited = client.post("/api/v1/x402/place-bet", json=body)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 0
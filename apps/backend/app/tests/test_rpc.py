@@ -0,0 +1,71 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.core.rpc import RPCClient, RPCError
+
+class MockNode:
+    """Answers JSON-RPC over httpx.MockTransport, optionally failing the first POSTs"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.posts = []
+
+    def answer(self, call: dict) -> dict:
+        results = {
+            "eth_getTransactionCount": "0x7",
+            "eth_gasPrice": "0x12a05f200",
+            "eth_sendRawTransaction": "0xfeed",
+        }
+        if call["method"] not in results:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": call["id"], "result": results[call["method"]]}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.posts.append((payload, request.extensions["timeout"]["read"]))
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(503)
+        if isinstance(payload, list):
+            # Nodes may answer batch members in any order
+            return httpx.Response(200, json=[self.answer(call) for call in reversed(payload)])
+        return httpx.Response(200, json=self.answer(payload))
+
+def client_for(node: MockNode) -> RPCClient:
+    return RPCClient(url="http://node", backoff=0, transport=httpx.MockTransport(node.handle))
+
+def test_batch_is_one_post_with_results_in_call_order():
+    async def scenario():
+        node = MockNode()
+        rpc = client_for(node)
+        nonce, gas_price = await rpc.batch([
+            ("eth_getTransactionCount", ["0xabc", "pending"]),
+            ("eth_gasPrice", []),
+        ])
+        assert await rpc.call("eth_sendRawTransaction", ["0x..."]) == "0xfeed"
+        await rpc.close()
+
+        assert (nonce, gas_price) == ("0x7", "0x12a05f200")
+        assert [len(payload) if isinstance(payload, list) else 1 for payload, _ in node.posts] == [2, 1]
+        assert [timeout for _, timeout in node.posts] == [5.0, 20.0]
+
+    asyncio.run(scenario())
+
+def test_retries_reads_but_not_sends():
+    async def scenario():
+        node = MockNode(failures=2)
+        rpc = client_for(node)
+        assert await rpc.call("eth_gasPrice") == "0x12a05f200"
+        assert len(node.posts) == 3
+
+        node.failures = 1
+        with pytest.raises(httpx.HTTPStatusError):
+            await rpc.call("eth_sendRawTransaction", ["0x..."])
+
+        with pytest.raises(RPCError) as error:
+            await rpc.batch([("eth_gasPrice", []), ("eth_unknown", [])])
+        assert error.value.code == -32601
+        await rpc.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,179 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from app.services import settlement as s
+from app.services.payouts import parimutuel_payout
+from app.services.settlement import SettlementService
+
+class FakeSettlementDB:
+    """Just enough of asyncpg.Connection to run SettlementService over in-memory rows"""
+
+    def __init__(self, votes):
+        self.votes = sorted(votes, key=lambda vote: vote["id"])
+        self.winners = []
+        self.settlement = None
+        self.batches = {}
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    def _winners(self, low, high=None):
+        return [vote for vote in self.winners if (vote["id"] > low if high is None else low <= vote["id"] <= high)]
+
+    async def fetchval(self, sql, *args):
+        return True
+
+    async def fetchrow(self, sql, *args):
+        return dict(self.settlement) if sql is s.SETTLEMENT_SQL and self.settlement else None
+
+    async def fetch(self, sql, market_id, *args):
+        if sql is s.PENDING_BATCHES_SQL:
+            return [batch for _, batch in sorted(self.batches.items()) if batch["status"] == "PENDING"]
+        if sql is s.WINNERS_AFTER_SQL:
+            cursor, limit = args
+            return self._winners(cursor)[:limit]
+        if sql is s.WINNERS_BETWEEN_SQL:
+            return self._winners(*args)
+        raise AssertionError(sql)
+
+    async def execute(self, sql, market_id, *args):
+        if sql is s.START_SQL and self.settlement is None:
+            winner, edge_bps = args
+            self.settlement = {
+                "marketId": market_id, "winner": winner, "status": "IN_PROGRESS", "houseEdgeBps": edge_bps,
+                "totalPool": sum(vote["amount"] for vote in self.votes),
+                "winningPool": sum(vote["amount"] for vote in self.votes if vote["choice"] == winner),
+                "lastVoteId": None, "batchCount": 0, "paidCount": 0, "paidAmount": 0,
+            }
+            self.winners = [dict(vote) for vote in self.votes if vote["choice"] == winner]
+        elif sql is s.JOURNAL_SQL:
+            number, first, last, count, total = args
+            self.batches[number] = {
+                "batchNumber": number, "firstVoteId": first, "lastVoteId": last,
+                "winnerCount": count, "totalAmount": total, "status": "PENDING",
+            }
+            self.settlement.update(lastVoteId=last, batchCount=number)
+        elif sql is s.SENT_SQL:
+            number, _ = args
+            batch = self.batches[number]
+            if batch["status"] == "PENDING":
+                batch["status"] = "SENT"
+                self.settlement["paidCount"] += batch["winnerCount"]
+                self.settlement["paidAmount"] += batch["totalAmount"]
+        elif sql is s.COMPLETE_SQL:
+            self.settlement["status"] = "COMPLETED"
+
+class FlakyChain:
+    """Pays each batch number once, like the contract; can crash after N sends"""
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.paid = {}
+        self.sends = 0
+
+    async def payout_batch(self, market_id, batch_number, payouts):
+        self.sends += 1
+        self.paid.setdefault(batch_number, payouts)
+        if self.crash_after is not None and self.sends == self.crash_after:
+            raise ConnectionError("node went away after broadcasting")
+        return f"0x{batch_number:x}"
+
+def test_crash_mid_settlement_resumes_without_double_paying():
+    votes = [
+        {"id": f"v{i:04d}", "walletAddress": f"0x{i}", "choice": "YES" if i % 3 else "NO", "amount": 1_000_000 + i}
+        for i in range(1000)
+    ]
+    db = FakeSettlementDB(votes)
+    chain = FlakyChain(crash_after=3)
+    service = SettlementService(chain, batch_size=50, chunk_size=120, house_edge_bps=200)
+
+    async def scenario():
+        try:
+            await service.settle_market(db, "m", "YES")
+        except ConnectionError:
+            pass
+        assert db.batches[3]["status"] == "PENDING"
+
+        chain.crash_after = None
+        return await service.settle_market(db, "m", "YES")
+
+    summary = asyncio.run(scenario())
+    winners = [vote for vote in votes if vote["choice"] == "YES"]
+    paid = [payout for batch in chain.paid.values() for payout in batch]
+
+    assert summary["resent_batches"] == 1
+    assert len(paid) == len({wallet for wallet, _ in paid}) == len(winners)
+    assert max(len(batch) for batch in chain.paid.values()) == 50
+    total_pool = sum(vote["amount"] for vote in votes)
+    winning_pool = sum(vote["amount"] for vote in winners)
+    assert sorted(paid) == sorted(
+        (vote["walletAddress"], parimutuel_payout(vote["amount"], total_pool, winning_pool, 200)) for vote in winners
+    )
+    assert summary["paid_amount"] == sum(amount for _, amount in paid) <= total_pool
+
+async def insert_votes(conn, market_id, count):
+    await conn.execute(
+        '''
+        INSERT INTO "Vote" ("marketId", "walletAddress", choice, amount)
+        SELECT $1, '0x' || i, CASE WHEN i % 3 = 0 THEN 'NO' ELSE 'YES' END, 1000000 + i
+        FROM generate_series(1, $2) AS i
+        ''',
+        market_id,
+        count
+    )
+    await conn.execute(
+        '''
+        UPDATE "Market" m
+        SET "yesPool" = v.yes, "noPool" = v.no, "totalBets" = v.bets
+        FROM (
+            SELECT SUM(amount) FILTER (WHERE choice = 'YES') AS yes, SUM(amount) FILTER (WHERE choice = 'NO') AS no, COUNT(*) AS bets
+            FROM "Vote" WHERE "marketId" = $1
+        ) v
+        WHERE m."marketId" = $1
+        ''',
+        market_id
+    )
+
+def test_settlement_statements_resume_against_postgres(pg):
+    chain = FlakyChain(crash_after=2)
+    service = SettlementService(chain, batch_size=40, chunk_size=100)
+
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "m")
+            await insert_votes(conn, "m", 300)
+            try:
+                await service.settle_market(conn, "m", "YES")
+            except ConnectionError:
+                pass
+            assert await conn.fetchval('SELECT status FROM "SettlementBatch" WHERE "batchNumber" = 2') == "PENDING"
+            winners = await conn.fetch('SELECT "walletAddress", amount FROM "Vote" WHERE choice = \'YES\'')
+
+            # Votes written straight to "Vote" after resolution aren't paid
+            await conn.execute('UPDATE "Vote" SET choice = \'YES\' WHERE "walletAddress" = \'0x3\'')
+            await conn.execute('INSERT INTO "Vote" ("marketId", "walletAddress", choice, amount) VALUES (\'m\', \'0xlate\', \'YES\', 1)')
+
+            chain.crash_after = None
+            summary = await service.settle_market(conn, "m", "YES")
+            assert summary["resent_batches"] == 1
+
+            paid = [payout for batch in chain.paid.values() for payout in batch]
+            assert sorted(wallet for wallet, _ in paid) == sorted(row['walletAddress'] for row in winners)
+            settlement = await conn.fetchrow(s.SETTLEMENT_SQL, "m")
+            assert settlement['status'] == "COMPLETED"
+            assert settlement['paidAmount'] == sum(amount for _, amount in paid) <= settlement['totalPool']
+            assert await conn.fetchval('SELECT status FROM "Market" WHERE "marketId" = \'m\'') == "RESOLVED"
+
+            # Resolved as YES, so it can't be settled as NO
+            with pytest.raises(ValueError):
+                await service.settle_market(conn, "m", "NO")
+
+            # Winners are read from "SettlementWinner", so "Vote" no longer carries a choice index
+            indexes = await conn.fetch('SELECT indexname FROM pg_indexes WHERE tablename = \'Vote\' AND schemaname = current_schema()')
+            assert "idx_vote_market_choice_id" not in {row['indexname'] for row in indexes}
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from app.services.broadcaster import MarketBroadcaster
+from app.services.channels import vote_channel
+from app.services.snapshot_cache import MarketSnapshotCache
+from app.services.ticks import MarketTicker, PROTOCOL_V2
+from app.services.frames import Frame, JSON, MSGPACK, batch
+import msgpack
+
+def market_update(yes_pool: float, no_pool: float, total_bets: int) -> dict:
+    return {
+        "type": "market_update",
+        "market_id": "btc",
+        "yes_pool": yes_pool,
+        "no_pool": no_pool,
+        "total_bets": total_bets,
+        "status": "ACTIVE",
+    }
+
+def test_ticks_carry_only_changed_fields():
+    """Sequenced deltas omit fields that didn't move"""
+    ticker = MarketTicker()
+    first = ticker.advance("btc", market_update(10.0, 5.0, 2))
+    second = ticker.advance("btc", market_update(12.0, 5.0, 3))
+
+    assert first["seq"] == 1
+    assert second["seq"] == 2
+    assert second["changes"] == {"yes_pool": 12.0, "total_bets": 3}
+    assert ticker.advance("btc", market_update(12.0, 5.0, 3)) is None
+    assert ticker.snapshot("btc")["market"]["yes_pool"] == 12.0
+
+def test_batches_reuse_encoded_ticks():
+    """Batches decode to the same ticks in both JSON and MessagePack"""
+    ticks = [Frame({"type": "tick", "seq": seq}) for seq in range(1, 21)]
+    expected = {"type": "batch", "ticks": [tick.data for tick in ticks]}
+
+    assert json.loads(batch(ticks, JSON)) == expected
+    assert msgpack.unpackb(batch(ticks, MSGPACK)) == expected
+    assert batch(ticks[:1], JSON) == ticks[0].text
+
+def test_v2_subscribers_get_ticks_and_resync_snapshot():
+    """Protocol v2 viewers receive deltas and can resync to the current seq"""
+    async def scenario():
+        pools = iter([(10.0, 5.0, 1), (10.0, 7.0, 2)])
+
+        async def fetch(market_id: str):
+            return market_update(*next(pools))
+
+        hub = MarketBroadcaster(snapshots=MarketSnapshotCache(fetch, min_interval=0))
+        classic = await hub.subscribe("btc")
+        delta = await hub.subscribe("btc", PROTOCOL_V2)
+
+        vote = json.dumps({"last_vote": {"choice": "NO", "amount": 2.0}})
+        await hub.handle(vote_channel("btc"), vote)
+        await hub.handle(vote_channel("btc"), vote)
+
+        assert json.loads(classic.queue.get_nowait().text)["type"] == "market_update"
+        ticks = [msgpack.unpackb(delta.queue.get_nowait().binary) for _ in range(2)]
+        assert [tick["seq"] for tick in ticks] == [1, 2]
+        assert ticks[1]["changes"] == {"no_pool": 7.0, "total_bets": 2}
+
+        snapshot = json.loads((await hub.snapshot_frame("btc")).text)
+        assert snapshot["seq"] == 2
+        assert snapshot["market"]["no_pool"] == 7.0
+
+    asyncio.run(scenario())
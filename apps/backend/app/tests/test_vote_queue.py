@@ -0,0 +1,433 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncpg
+import pytest
+from fastapi import HTTPException
+from app.api.v1 import predictions
+from app.models.prediction import VoteBatchRequest, VoteRequest
+from app.services import redis as redis_service
+from app.services import votes
+from app.services.reconciliation import find_pool_drift
+from app.services.vote_queue import DEAD_STREAM, QUEUED, STREAM, VoteQueue
+from app.services.votes import PendingVote, coalesce_votes
+
+class FakeVoteDB:
+    """Applies APPLY_VOTES_SQL to in-memory "Vote"/"Market" rows"""
+
+    def __init__(self, market_ids, status="ACTIVE"):
+        self.markets = {market_id: {"yesPool": 0, "noPool": 0, "totalBets": 0} for market_id in market_ids}
+        self.status = status
+        self.votes = {}
+        self.statements = 0
+        self.down = False
+        self.seq = 1000
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self.down:
+            raise ConnectionError("connection refused")
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, sql, market_ids):
+        assert sql is votes.LOCK_MARKETS_SQL and market_ids == sorted(set(market_ids))
+
+    async def fetchval(self, sql):
+        assert sql is votes.NEXT_VOTE_SEQ_SQL
+        self.seq += 1
+        return self.seq
+
+    async def fetch(self, sql, *args):
+        if sql is predictions.MARKETS_BY_ID_SQL:
+            return [self.market_row(market_id) for market_id in args[0] if market_id in self.markets]
+        assert sql is votes.APPLY_VOTES_SQL
+        return self.apply(*args)
+
+    def market_row(self, market_id):
+        return {
+            "marketId": market_id, "question": "?", "status": self.status, "winner": None,
+            **self.markets[market_id],
+            "startDate": datetime.utcnow() - timedelta(days=1), "endDate": datetime.utcnow() + timedelta(days=1),
+        }
+
+    def apply(self, vote_ids, market_ids, wallets, choices, amounts, seqs):
+        assert len(set(zip(market_ids, wallets))) == len(wallets), "ON CONFLICT can't touch a row twice"
+        self.statements += 1
+        if set(market_ids) - set(self.markets):
+            raise asyncpg.ForeignKeyViolationError("Vote_marketId_fkey")
+        stored = {}
+        for vote_id, market_id, wallet, choice, amount, seq in zip(vote_ids, market_ids, wallets, choices, amounts, seqs):
+            if seq is None:
+                self.seq += 1
+                seq = self.seq
+            market = self.markets[market_id]
+            prev = self.votes.get((market_id, wallet))
+            if prev and prev["seq"] >= seq:
+                # Older than the stored vote: left alone
+                stored.setdefault(market_id, []).append((wallet, prev, False))
+                continue
+            if prev:
+                market["yesPool" if prev["choice"] == "YES" else "noPool"] -= prev["amount"]
+            else:
+                market["totalBets"] += 1
+            market["yesPool" if choice == "YES" else "noPool"] += amount
+            stored_id = prev["voteId"] if prev else vote_id
+            self.votes[(market_id, wallet)] = row = {"voteId": stored_id, "choice": choice, "amount": amount, "seq": seq}
+            stored.setdefault(market_id, []).append((wallet, row, True))
+        return [
+            {"marketId": market_id, **self.markets[market_id],
+             "wallets": [wallet for wallet, _, _ in rows], "voteIds": [row["voteId"] for _, row, _ in rows],
+             "applied": [applied for _, _, applied in rows], "choices": [row["choice"] for _, row, _ in rows],
+             "amounts": [row["amount"] for _, row, _ in rows]}
+            for market_id, rows in stored.items()
+        ]
+
+class FakeStreamClient:
+    def __init__(self):
+        self.acked = []
+        self.deleted = []
+        self.dead = []
+        self.published = []
+        self.invalidated = []
+
+    async def publish(self, channel, data):
+        self.published.append(json.loads(data))
+
+    async def delete(self, *keys):
+        self.invalidated.extend(keys)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction=True):
+        client = self
+
+        class Pipeline:
+            def xadd(self, stream, fields):
+                assert stream == DEAD_STREAM
+                client.dead.append(fields)
+
+            def xack(self, stream, group, *ids):
+                client.acked.extend(ids)
+
+            def xdel(self, stream, *ids):
+                assert stream == STREAM
+                client.deleted.extend(ids)
+
+            async def execute(self):
+                pass
+
+        yield Pipeline()
+
+def entry(number, market_id, wallet, choice, amount):
+    return f"{number}-0", {
+        "vote_id": f"v{number}", "market_id": market_id, "wallet": wallet,
+        "choice": choice, "amount": str(amount), "seq": str(number), "queued_at": "0",
+    }
+
+def run_with_stream(scenario):
+    client = FakeStreamClient()
+    previous, redis_service.redis_client = redis_service.redis_client, client
+    try:
+        asyncio.run(scenario(client))
+    finally:
+        redis_service.redis_client = previous
+
+def test_coalesce_keeps_each_wallets_last_vote_in_lock_order():
+    batch = coalesce_votes([
+        PendingVote("v1", "m2", "0xb", "YES", 1),
+        PendingVote("v2", "m1", "0xa", "YES", 2),
+        PendingVote("v3", "m2", "0xb", "NO", 3),
+    ])
+    assert batch == [PendingVote("v2", "m1", "0xa", "YES", 2), PendingVote("v3", "m2", "0xb", "NO", 3)]
+
+def test_batch_is_one_statement_with_one_update_per_market():
+    async def scenario(client):
+        db = FakeVoteDB(["m1", "m2"])
+        queue = VoteQueue(mode=QUEUED, acquire=db.acquire)
+        entries = [
+            entry(1, "m1", "0xa", "YES", 5_000_000),
+            entry(2, "m1", "0xb", "NO", 1_000_000),
+            entry(3, "m2", "0xa", "NO", 2_000_000),
+            entry(4, "m1", "0xa", "NO", 3_000_000),  # replaces entry 1
+        ]
+        assert await queue.write(entries)
+
+        assert db.statements == 1
+        assert db.markets["m1"] == {"yesPool": 0, "noPool": 4_000_000, "totalBets": 2}
+        assert db.markets["m2"] == {"yesPool": 0, "noPool": 2_000_000, "totalBets": 1}
+        updates = {message["market_id"]: message for message in client.published}
+        assert len(client.published) == 2
+        assert updates["m1"]["no_pool"] == 4_000_000 and updates["m1"]["no_percent"] == 1000
+        assert updates["m1"]["last_vote"] == {"choice": "NO", "amount": 3_000_000, "wallet": "0xa"}
+        assert client.acked == client.deleted == ["1-0", "2-0", "3-0", "4-0"]
+        assert queue.stats()["applied"] == 4
+
+    run_with_stream(scenario)
+
+def test_failed_batch_stays_pending_and_retry_is_idempotent():
+    async def scenario(client):
+        db = FakeVoteDB(["m1"])
+        queue = VoteQueue(mode=QUEUED, acquire=db.acquire)
+        entries = [entry(1, "m1", "0xa", "YES", 1_000_000), entry(2, "m1", "0xb", "YES", 1_000_000)]
+
+        db.down = True
+        assert not await queue.write(entries)
+        assert client.acked == [] and queue.failed_batches == 1
+
+        db.down = False
+        assert await queue.write(entries)
+        # A redelivered batch (worker died before XACK) changes nothing
+        assert await queue.write(entries)
+        assert db.markets["m1"] == {"yesPool": 2_000_000, "noPool": 0, "totalBets": 2}
+
+        # Nor does an old entry claimed after a newer vote from the same wallet
+        assert await queue.write([entry(3, "m1", "0xa", "NO", 4_000_000)])
+        assert await queue.write(entries[:1])
+        assert db.markets["m1"] == {"yesPool": 1_000_000, "noPool": 4_000_000, "totalBets": 2}
+        assert db.votes[("m1", "0xa")]["choice"] == "NO"
+
+    run_with_stream(scenario)
+
+def test_busy_stream_still_claims_a_dead_workers_entries():
+    async def scenario(client):
+        db = FakeVoteDB(["m1"])
+        queue = VoteQueue(mode=QUEUED, batch_size=2, claim_idle_ms=20, acquire=db.acquire)
+        # Left pending by a worker that died, three pages' worth at batch_size 2
+        abandoned = [entry(number, "m1", f"0xdead{number}", "NO", 1_000_000) for number in range(1, 6)]
+        fresh = iter(range(100, 10_000))
+        claims = []
+
+        async def xreadgroup(group, consumer, streams, count, block):
+            if streams[STREAM] == "0":
+                return []
+            # New votes never stop arriving, so a read is never empty
+            await asyncio.sleep(0.005)
+            return [(STREAM, [entry(next(fresh), "m1", "0xbusy", "YES", 1)])]
+
+        async def xautoclaim(stream, group, consumer, min_idle, start_id, count):
+            claims.append(start_id)
+            start = 0 if start_id == "0-0" else int(start_id.split("-")[0])
+            page = [e for e in abandoned if int(e[0].split("-")[0]) >= start][:count]
+            rest = [e for e in abandoned if int(e[0].split("-")[0]) >= start][count:]
+            return [rest[0][0] if rest else "0-0", page, []]
+
+        client.xreadgroup, client.xautoclaim = xreadgroup, xautoclaim
+        queue.task = asyncio.create_task(queue._consume())
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+        assert {f"{number}-0" for number in range(1, 6)} <= set(client.acked)
+        assert db.markets["m1"]["noPool"] == 5_000_000
+        # The scan over the abandoned entries ran page after page, then restarted on the timer
+        assert claims[:4] == ["0-0", "3-0", "5-0", "0-0"]
+
+    run_with_stream(scenario)
+
+def test_rejected_votes_are_dead_lettered_without_blocking_the_rest():
+    async def scenario(client):
+        db = FakeVoteDB(["m1"])
+        queue = VoteQueue(mode=QUEUED, acquire=db.acquire)
+        entries = [
+            entry(1, "m1", "0xa", "YES", 1_000_000),
+            entry(2, "gone", "0xa", "YES", 1_000_000),
+            ("3-0", None),  # deleted while pending
+            ("4-0", {"market_id": "m1"}),  # malformed
+        ]
+        assert await queue.write(entries)
+
+        assert db.markets["m1"]["yesPool"] == 1_000_000
+        assert [fields["market_id"] for fields in client.dead] == ["m1", "gone"]
+        assert client.acked == ["1-0", "2-0", "3-0", "4-0"]
+        assert queue.stats()["dead"] == 2 and queue.stats()["applied"] == 1
+
+    run_with_stream(scenario)
+
+def test_batch_endpoint_validates_each_market_once_and_writes_once():
+    async def scenario(client):
+        db = FakeVoteDB(["m1", "m2"])
+        batch = VoteBatchRequest(votes=[
+            {"market_id": "m1", "choice": "YES", "amount": 2, "wallet": "0xa"},
+            {"market_id": "m2", "choice": "NO", "amount": "0.5"},
+            {"market_id": "m1", "choice": "NO", "amount": 1, "wallet": "0xb"},
+            {"market_id": "m1", "choice": "NO", "amount": 1, "wallet": "0xa"},
+        ])
+        response = await predictions.place_votes(batch, db)
+
+        assert db.statements == 1
+        assert response.count == 4
+        first, _, _, last = response.votes
+        assert first.vote_id == last.vote_id  # same wallet, same row
+        assert (last.new_yes_pool, last.new_no_pool, last.no_percent) == (0, 2_000_000, 100.0)
+        assert response.votes[1].new_no_pool == 500_000
+        assert sorted(message["market_id"] for message in client.published) == ["m1", "m2"]
+        assert {"cache:markets", "cache:market:m1", "cache:market:m2:stats"} <= set(client.invalidated)
+
+    run_with_stream(scenario)
+
+def test_batch_endpoint_rejects_everything_if_one_market_is_closed():
+    async def scenario(client):
+        db = FakeVoteDB(["m1"], status="CLOSED")
+        batch = VoteBatchRequest(votes=[{"market_id": "m1", "choice": "YES", "amount": 1}])
+        with pytest.raises(HTTPException) as error:
+            await predictions.place_votes(batch, db)
+        assert error.value.status_code == 400 and "m1" in error.value.detail
+
+        batch = VoteBatchRequest(votes=[{"market_id": "nope", "choice": "YES", "amount": 1}])
+        with pytest.raises(HTTPException) as error:
+            await predictions.place_votes(batch, db)
+        assert error.value.status_code == 404
+        assert db.statements == 0 and client.published == []
+
+    run_with_stream(scenario)
+
+async def market_pools(conn, market_id):
+    row = await conn.fetchrow('SELECT "yesPool", "noPool", "totalBets" FROM "Market" WHERE "marketId" = $1', market_id)
+    return dict(row)
+
+def test_vote_statements_move_pools_by_deltas_against_postgres(pg):
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "m1")
+            await pg.insert_market(conn, "m2")
+
+            first = await votes.apply_vote(conn, PendingVote("v1", "m1", "0xa", "YES", 5_000_000))
+            again = await votes.apply_vote(conn, PendingVote("v2", "m1", "0xa", "NO", 2_000_000))
+            assert again['voteId'] == first['voteId'] == "v1"
+            assert await market_pools(conn, "m1") == {"yesPool": 0, "noPool": 2_000_000, "totalBets": 1}
+
+            result = await votes.apply_vote_batch(conn, [
+                PendingVote("v3", "m1", "0xa", "YES", 1_000_000),
+                PendingVote("v4", "m1", "0xb", "NO", 3_000_000),
+                PendingVote("v5", "m2", "0xa", "YES", 4_000_000),
+            ])
+            assert {wallet: vote["vote_id"] for wallet, vote in result["m1"]["votes"].items()} == {"0xa": "v1", "0xb": "v4"}
+            assert await market_pools(conn, "m1") == {"yesPool": 1_000_000, "noPool": 3_000_000, "totalBets": 2}
+            assert await market_pools(conn, "m2") == {"yesPool": 4_000_000, "noPool": 0, "totalBets": 1}
+
+            with pytest.raises(asyncpg.ForeignKeyViolationError):
+                await votes.apply_vote_batch(conn, [PendingVote("v6", "gone", "0xa", "YES", 1)])
+
+            # Deletes outside the API still move the pools
+            await conn.execute('DELETE FROM "Vote" WHERE "marketId" = \'m1\' AND "walletAddress" = \'0xb\'')
+            assert await market_pools(conn, "m1") == {"yesPool": 1_000_000, "noPool": 0, "totalBets": 1}
+            assert await find_pool_drift(conn) == []
+            await conn.execute('DELETE FROM "Market" WHERE "marketId" = \'m2\'')
+            assert await conn.fetchval('SELECT COUNT(*) FROM "Vote" WHERE "marketId" = \'m2\'') == 0
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
+
+def test_older_votes_never_replace_newer_ones_against_postgres(pg):
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "m1")
+            await votes.apply_vote(conn, PendingVote("v1", "m1", "0xa", "YES", 5_000_000, seq=20))
+            stale = await votes.apply_vote(conn, PendingVote("v0", "m1", "0xa", "NO", 2_000_000, seq=10))
+            assert stale['voteId'] == "v1" and not stale['applied']
+            assert (stale['choice'], stale['amount']) == ("YES", 5_000_000)
+            assert await market_pools(conn, "m1") == {"yesPool": 5_000_000, "noPool": 0, "totalBets": 1}
+
+            result = await votes.apply_vote_batch(conn, [
+                PendingVote("v2", "m1", "0xa", "NO", 1_000_000, seq=10),
+                PendingVote("v3", "m1", "0xb", "NO", 3_000_000, seq=30),
+            ])
+            assert result["m1"]["votes"] == {
+                "0xa": {"vote_id": "v1", "applied": False, "choice": "YES", "amount": 5_000_000},
+                "0xb": {"vote_id": "v3", "applied": True, "choice": "NO", "amount": 3_000_000},
+            }
+            assert await market_pools(conn, "m1") == {"yesPool": 5_000_000, "noPool": 3_000_000, "totalBets": 2}
+
+            # A batch of nothing but stale votes still reports the market's pools
+            result = await votes.apply_vote_batch(conn, [PendingVote("v4", "m1", "0xb", "YES", 1, seq=30)])
+            assert (result["m1"]["yes_pool"], result["m1"]["no_pool"]) == (5_000_000, 3_000_000)
+            assert await conn.fetchval('SELECT choice FROM "Vote" WHERE "walletAddress" = \'0xa\'') == "YES"
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
+
+def test_vote_sequence_comes_from_the_database_against_postgres(pg):
+    """Votes are ordered by the vote_seq sequence, not by any host's clock"""
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "m1")
+            # Starts above the clock-based seqs written before it existed
+            first = await votes.next_vote_seq(conn)
+            assert first > time.time_ns() // 1000
+            written = await votes.apply_vote(conn, PendingVote("v1", "m1", "0xa", "YES", 5_000_000))
+            assert written['applied']
+            assert await conn.fetchval('SELECT seq FROM "Vote"') > first
+
+            # A vote accepted earlier (queued, or from a slower request) loses
+            # to the stored one, and the endpoint says so instead of "applied"
+            await conn.execute('UPDATE "Vote" SET seq = seq + 1000')
+            response = await predictions.place_vote(VoteRequest(market_id="m1", choice="NO", amount=2, wallet="0xa"), conn)
+            assert (response.status, response.vote_id, response.choice, response.amount) == ("superseded", "v1", "YES", 5_000_000)
+            assert await market_pools(conn, "m1") == {"yesPool": 5_000_000, "noPool": 0, "totalBets": 1}
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
+
+def test_votes_on_a_resolved_market_write_nothing_against_postgres(pg):
+    async def scenario():
+        conn = await pg.connect()
+        try:
+            await pg.insert_market(conn, "open")
+            await pg.insert_market(conn, "done", status="RESOLVED")
+
+            with pytest.raises(votes.MarketNotActive):
+                await votes.apply_vote(conn, PendingVote("v1", "done", "0xa", "YES", 5_000_000))
+            with pytest.raises(votes.MarketNotActive) as error:
+                await votes.apply_vote_batch(conn, [
+                    PendingVote("v2", "open", "0xa", "YES", 1_000_000),
+                    PendingVote("v3", "done", "0xb", "NO", 2_000_000),
+                ])
+            assert error.value.market_id == "done"
+
+            assert await conn.fetchval('SELECT COUNT(*) FROM "Vote"') == 0
+            assert await market_pools(conn, "open") == {"yesPool": 0, "noPool": 0, "totalBets": 0}
+            assert await market_pools(conn, "done") == {"yesPool": 0, "noPool": 0, "totalBets": 0}
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
+
+def test_concurrent_first_votes_from_one_wallet_count_once_against_postgres(pg):
+    async def scenario():
+        setup, first, second = await pg.connect(), await pg.connect(), await pg.connect()
+        try:
+            await pg.insert_market(setup, "m1")
+            # The first vote is written but not yet committed while the second arrives
+            transaction = first.transaction()
+            await transaction.start()
+            await votes.apply_vote(first, PendingVote("v1", "m1", votes.ANONYMOUS_WALLET, "YES", 5_000_000))
+            single = asyncio.create_task(
+                votes.apply_vote(second, PendingVote("v2", "m1", votes.ANONYMOUS_WALLET, "NO", 2_000_000))
+            )
+            batch = asyncio.create_task(setup_batch(pg))
+            await asyncio.sleep(0.3)
+            assert not single.done() and not batch.done()
+            await transaction.commit()
+            await asyncio.gather(single, batch)
+
+            assert await market_pools(setup, "m1") == {"yesPool": 1_000_000, "noPool": 0, "totalBets": 1}
+        finally:
+            for conn in (setup, first, second):
+                await conn.close()
+
+    async def setup_batch(pg):
+        await asyncio.sleep(0.1)
+        async with pg.acquire() as conn:
+            await votes.apply_vote_batch(conn, [PendingVote("v3", "m1", votes.ANONYMOUS_WALLET, "YES", 1_000_000)])
+
+    asyncio.run(scenario())
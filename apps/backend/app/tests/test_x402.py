@@ -16,6 +16,25 @@ def test_x402_quote():
     assert "X-Quote-ID" in response.headers
     assert response.headers["Payment-Required"]
 
+def test_unparsable_stake_is_a_validation_error():
+    response = client.post("/api/v1/x402/place-bet", json={
+        "market_id": "test-market",
+        "side": "home",
+        "stake": "abc"
+    })
+    assert response.status_code == 422
+
+@pytest.mark.parametrize("stake", [-50, 0, 2])
+def test_out_of_range_stake_is_rejected_before_reserving(stake):
+    from app.api.v1.x402 import market_mgr
+    response = client.post("/api/v1/x402/place-bet", json={
+        "market_id": "bounds-market",
+        "side": "home",
+        "stake": stake
+    })
+    assert response.status_code == 422
+    assert market_mgr.exposure_store.totals.get("bounds-market:home", 0) == 0
+
 def test_markets_list():
     """Test markets endpoint"""
     response = client.get("/api/v1/markets?sport=soccer")
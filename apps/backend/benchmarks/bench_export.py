@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Rows/sec of the streaming vote export against a real database
+
+Seeds a temporary "bench-export" market with 2M votes, then drains
+stream_export as NDJSON and CSV for a few cursor prefetch sizes, reporting
+rows/sec, MB/sec and the process's peak RSS (which should not grow with the
+row count). Removes the market afterwards.
+
+Usage: DATABASE_URL=... python3 benchmarks/bench_export.py [--rows 2000000]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import database
+from app.services.export import CSV, NDJSON, VOTES, stream_export
+
+MARKET_ID = "bench-export"
+PREFETCH_SIZES = [1000, 5000, 20000]
+
+async def seed(rows: int):
+    async with database.acquire_connection() as conn:
+        await conn.execute('DELETE FROM "Market" WHERE "marketId" = $1', MARKET_ID)
+        await conn.execute(
+            '''
+            INSERT INTO "Market" ("marketId", question, "endDate", "contractAddress", "gnosisSafeAddress")
+            VALUES ($1, 'Export benchmark', NOW() + INTERVAL '1 day', '0x0', '0x0')
+            ''',
+            MARKET_ID
+        )
+        await conn.execute(
+            '''
+            INSERT INTO "Vote" ("marketId", "walletAddress", choice, amount, "createdAt")
+            SELECT $1, 'bench-wallet-' || w, CASE WHEN w % 2 = 0 THEN 'YES' ELSE 'NO' END,
+                   1000000 + w, NOW() - (w || ' milliseconds')::interval
+            FROM generate_series(1, $2) AS w
+            ''',
+            MARKET_ID,
+            rows
+        )
+        await conn.execute('ANALYZE "Vote"')
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def drain(fmt: str, prefetch: int, rows: int):
+    total_bytes = 0
+    started = time.perf_counter()
+    async for chunk in stream_export(MARKET_ID, VOTES, fmt, prefetch=prefetch):
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{fmt:>7} {prefetch:>9} {rows / elapsed:>12.0f} "
+        f"{total_bytes / elapsed / 1e6:>9.1f} {peak_rss_mb():>14.1f}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description="Streaming export throughput")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    await database.init_db_pool()
+    if database.db_pool is None:
+        sys.exit(1)
+    try:
+        print(f"Seeding {args.rows} votes...")
+        await seed(args.rows)
+        print(f"{'format':>7} {'prefetch':>9} {'rows/sec':>12} {'MB/sec':>9} {'peak RSS (MB)':>14}")
+        for fmt in (NDJSON, CSV):
+            for prefetch in PREFETCH_SIZES:
+                await drain(fmt, prefetch, args.rows)
+    finally:
+        async with database.acquire_connection() as conn:
+            await conn.execute('DELETE FROM "Market" WHERE "marketId" = $1', MARKET_ID)
+        await database.close_db_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())
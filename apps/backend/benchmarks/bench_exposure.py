@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Quote throughput under contention for the exposure ledger
+
+Many concurrent quote requests hammer the same market/side. Reports
+quotes/sec and how many stakes were admitted versus the limit, for the
+in-process store and (with --redis-url) the Redis store. With Redis it
+also runs the old check-then-update sequence, which over-admits when
+requests interleave.
+
+Usage: python3 benchmarks/bench_exposure.py [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.money import SCALE
+from app.services.exposure import InMemoryExposureStore, RedisExposureStore
+
+REQUESTS = 20_000
+CONCURRENCY = 200
+# Base units: 0.01 per quote against a limit of 10
+STAKE = SCALE // 100
+LIMIT = 10 * SCALE
+
+async def drive(reserve) -> tuple:
+    admitted = 0
+    remaining = iter(range(REQUESTS))
+
+    async def worker():
+        nonlocal admitted
+        for _ in remaining:
+            if await reserve(f"{uuid.uuid4()}"):
+                admitted += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return REQUESTS / (time.perf_counter() - started), admitted
+
+async def main():
+    parser = argparse.ArgumentParser(description="Exposure ledger contention benchmark")
+    parser.add_argument("--redis-url", help="Also benchmark the Redis store")
+    args = parser.parse_args()
+
+    stores = {"in-memory": InMemoryExposureStore()}
+    client = None
+    if args.redis_url:
+        import redis.asyncio as redis
+        client = redis.from_url(args.redis_url, decode_responses=True)
+        await client.delete("exposure:bench:home", RedisExposureStore.RESERVATIONS_KEY)
+        stores["redis (lua)"] = RedisExposureStore(client)
+
+    print(f"Limit {LIMIT / SCALE:g} at stake {STAKE / SCALE:g}: at most {LIMIT // STAKE} quotes may be admitted")
+    print(f"{'store':>16} {'quotes/sec':>12} {'admitted':>10}")
+    for name, store in stores.items():
+        rate, admitted = await drive(lambda quote_id: store.reserve("bench:home", STAKE, LIMIT, quote_id, 300))
+        print(f"{name:>16} {rate:>12.0f} {admitted:>10}")
+
+    if client is not None:
+        await client.delete("exposure:bench:naive")
+
+        async def check_then_update(quote_id: str) -> bool:
+            current = int(await client.get("exposure:bench:naive") or 0)
+            if current + STAKE > LIMIT:
+                return False
+            await client.incrby("exposure:bench:naive", STAKE)
+            return True
+
+        rate, admitted = await drive(check_then_update)
+        print(f"{'redis (2-step)':>16} {rate:>12.0f} {admitted:>10}")
+        await client.delete("exposure:bench:home", "exposure:bench:naive", RedisExposureStore.RESERVATIONS_KEY)
+
+if __name__ == "__main__":
+    asyncio.run(main())
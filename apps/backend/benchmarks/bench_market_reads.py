@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /predictions/markets read paths against a real database
+
+Compares the old per-market COUNT(*) loop (N+1 queries) with the single
+query over the denormalized "totalBets" column, for growing market counts.
+Creates temporary markets prefixed with "bench-" and removes them afterwards.
+
+Usage: DATABASE_URL=... python3 benchmarks/bench_market_reads.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import asyncpg
+
+MARKET_COUNTS = [10, 100, 500]
+VOTES_PER_MARKET = 200
+ROUNDS = 20
+
+async def seed(conn: asyncpg.Connection, market_count: int):
+    await conn.execute('DELETE FROM "Market" WHERE "marketId" LIKE \'bench-%\'')
+    market_ids = [f"bench-{i}" for i in range(market_count)]
+    await conn.executemany(
+        '''
+        INSERT INTO "Market" ("marketId", question, "endDate", "contractAddress", "gnosisSafeAddress", "totalBets")
+        VALUES ($1, 'Benchmark market', NOW() + INTERVAL '1 day', '0x0', '0x0', $2)
+        ''',
+        [(market_id, VOTES_PER_MARKET) for market_id in market_ids]
+    )
+    await conn.execute(
+        '''
+        INSERT INTO "Vote" ("marketId", "walletAddress", choice, amount)
+        SELECT m, 'bench-wallet-' || w, CASE WHEN w % 2 = 0 THEN 'YES' ELSE 'NO' END, 1000000
+        FROM unnest($1::text[]) AS m, generate_series(1, $2) AS w
+        ''',
+        market_ids,
+        VOTES_PER_MARKET
+    )
+
+async def read_n_plus_one(conn: asyncpg.Connection):
+    rows = await conn.fetch('SELECT "marketId" FROM "Market" ORDER BY "createdAt" DESC')
+    for row in rows:
+        await conn.fetchval('SELECT COUNT(*) FROM "Vote" WHERE "marketId" = $1', row['marketId'])
+
+async def read_single_query(conn: asyncpg.Connection):
+    await conn.fetch('SELECT "marketId", "totalBets" FROM "Market" ORDER BY "createdAt" DESC')
+
+async def time_reads(conn: asyncpg.Connection, read) -> float:
+    samples = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        await read(conn)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+async def main():
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        print(f"{'markets':>8} {'N+1 (ms)':>10} {'single (ms)':>12} {'speedup':>8}")
+        for market_count in MARKET_COUNTS:
+            await seed(conn, market_count)
+            old = await time_reads(conn, read_n_plus_one)
+            new = await time_reads(conn, read_single_query)
+            print(f"{market_count:>8} {old:>10.2f} {new:>12.2f} {old / new:>7.1f}x")
+    finally:
+        await conn.execute('DELETE FROM "Market" WHERE "marketId" LIKE \'bench-%\'')
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
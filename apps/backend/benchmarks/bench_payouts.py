@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Settlement math for large markets: list of dicts vs columnar arrays
+
+Computes pools, winners and parimutuel payouts (2% house edge) for markets
+of growing size three ways: the per-position reference over a list of
+dicts, and parallel columns (PositionColumns below) fed to
+payouts.payout_amounts with Python integers (array module) and with NumPy
+when it is installed. Reports time and the memory held by the position
+data.
+
+Usage: python3 benchmarks/bench_payouts.py
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Any, Iterable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import payouts
+from app.services.payouts import parimutuel_payout, payout_amounts
+
+SIZES = [10_000, 100_000, 500_000]
+EDGE_BPS = 200
+
+CHOICES = {"YES": 1, "NO": 0}
+
+class PositionColumns:
+    """Positions as parallel columns instead of a list of dicts"""
+
+    __slots__ = ("wallets", "choices", "amounts")
+
+    def __init__(self, wallets: List[str], choices: array, amounts: array):
+        self.wallets = wallets
+        self.choices = choices
+        self.amounts = amounts
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]):
+        wallets, choices, amounts = [], array("b"), array("q")
+        for row in rows:
+            wallets.append(row['walletAddress'])
+            choices.append(CHOICES[row['choice']])
+            amounts.append(row['amount'])
+        return cls(wallets, choices, amounts)
+
+def make_rows(count: int):
+    rng = random.Random(count)
+    return [
+        {"walletAddress": f"0x{i:040x}", "choice": "YES" if rng.random() < 0.5 else "NO", "amount": rng.randint(1_000_000, 500_000_000)}
+        for i in range(count)
+    ]
+
+def settle_dicts(positions, winner: str):
+    total_pool = sum(p["amount"] for p in positions)
+    winners = [p for p in positions if p["choice"] == winner]
+    winning_pool = sum(p["amount"] for p in winners)
+    return [parimutuel_payout(p["amount"], total_pool, winning_pool, EDGE_BPS) for p in winners]
+
+def settle_columns(columns: PositionColumns, winner: str):
+    """The winners' payouts; NumPy picks the winners too when payouts.np is set"""
+    code = CHOICES[winner]
+    if payouts.np is not None:
+        choices = payouts.np.frombuffer(columns.choices, dtype=payouts.np.int8)
+        amounts = payouts.np.frombuffer(columns.amounts, dtype=payouts.np.int64)
+        winning = array("q", amounts[choices == code].tobytes())
+    else:
+        winning = array("q", (amount for choice, amount in zip(columns.choices, columns.amounts) if choice == code))
+    return payout_amounts(winning, sum(columns.amounts), sum(winning), EDGE_BPS)
+
+def measure(build, settle) -> tuple:
+    tracemalloc.start()
+    data = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    result = settle(data)
+    return (time.perf_counter() - started) * 1000, held / 1_000_000, result
+
+def main():
+    numpy = payouts.np
+    print(f"{'positions':>10} {'method':>14} {'ms':>9} {'data MB':>9}")
+    for count in SIZES:
+        rows = make_rows(count)
+        methods = {"dicts": (lambda: [dict(row) for row in rows], lambda data: settle_dicts(data, "YES"))}
+        columnar = (lambda: PositionColumns.from_rows(rows), lambda data: settle_columns(data, "YES"))
+        methods["columns+array"] = columnar
+        if numpy is not None:
+            methods["columns+numpy"] = columnar
+
+        expected = None
+        for name, (build, settle) in methods.items():
+            payouts.np = numpy if name == "columns+numpy" else None
+            ms, held, result = measure(build, settle)
+            expected = expected or result
+            assert result == expected, f"{name} disagrees with the reference"
+            print(f"{count:>10} {name:>14} {ms:>9.1f} {held:>9.1f}")
+    payouts.np = numpy
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Quote -> confirm cycles per second
+
+Runs the /x402/place-bet and /bets/confirm handlers back to back for many
+concurrent bettors, against the in-process stores or (with --redis-url)
+the Redis quote store and exposure ledger. Minting is replaced by a
+stand-in so only the quote path and mint queue are measured.
+
+Usage: python3 benchmarks/bench_quotes.py [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Request
+from app.api.v1 import bets, x402
+from app.services import redis as redis_service
+from app.services.rate_limit import RateLimiter
+
+CYCLES = 5_000
+CONCURRENCY = 100
+
+class StandInContracts:
+    async def mint_position(self, quote_id, market_id, side, stake, odds, wallet):
+        return "0x" + quote_id.replace("-", "")
+
+async def cycle(index: int):
+    request = Request({"type": "http", "headers": [], "client": (f"10.0.{index % 250}.1", 0)})
+    bet = x402.BetRequest(market_id=f"bench-{index % 50}", side="home", stake=0.001)
+    response = await x402.place_bet_quote(bet, request)
+    quote_id = response.headers["X-Quote-ID"]
+    await bets.confirm_bet(bets.ConfirmBet(quote_id=quote_id))
+
+async def run(label: str):
+    remaining = iter(range(CYCLES))
+
+    async def worker():
+        for index in remaining:
+            await cycle(index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10} {CYCLES / elapsed:>12.0f} {elapsed / CYCLES * 1000:>12.3f}")
+    await bets.mint_pipeline.stop()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Quote to confirm throughput")
+    parser.add_argument("--redis-url", help="Also benchmark the Redis-backed stores")
+    args = parser.parse_args()
+
+    bets.contracts = StandInContracts()
+    x402.quote_limiter = RateLimiter("bench", limit=10**9, window=60)
+    # Exposure is committed on every confirm; lift the cap so it never rejects
+    x402.market_mgr.exposure_limits["home"] = bets.market_mgr.exposure_limits["home"] = 1e12
+
+    print(f"{'store':>10} {'cycles/sec':>12} {'ms/cycle':>12}")
+    await run("in-memory")
+
+    if args.redis_url:
+        import redis.asyncio as redis
+        redis_service.redis_client = redis.from_url(args.redis_url, decode_responses=True)
+        await run("redis")
+        keys = [key async for key in redis_service.redis_client.scan_iter("exposure:bench-*")]
+        keys += [key async for key in redis_service.redis_client.scan_iter("ratelimit:bench:*")]
+        if keys:
+            await redis_service.redis_client.delete(*keys)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Settle a 100k-position market against a real database
+
+Seeds a temporary "bench-settlement" market with 100k votes, then runs
+SettlementService for several winners-per-transaction batch sizes. Payout
+transactions go to a stand-in chain (no RPC), so the numbers cover
+streaming winners, computing payouts and journaling checkpoints.
+Removes the market afterwards.
+
+Usage: DATABASE_URL=... python3 benchmarks/bench_settlement.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.settlement import SettlementService
+
+MARKET_ID = "bench-settlement"
+POSITIONS = 100_000
+BATCH_SIZES = [50, 200, 500]
+
+class StandInChain:
+    def __init__(self):
+        self.transactions = 0
+
+    async def payout_batch(self, market_id, batch_number, payouts):
+        self.transactions += 1
+        return f"0x{batch_number:064x}"
+
+async def seed(conn: asyncpg.Connection):
+    await conn.execute('DELETE FROM "Market" WHERE "marketId" = $1', MARKET_ID)
+    await conn.execute(
+        '''
+        INSERT INTO "Market" ("marketId", question, "endDate", "contractAddress", "gnosisSafeAddress")
+        VALUES ($1, 'Settlement benchmark', NOW() + INTERVAL '1 day', '0x0', '0x0')
+        ''',
+        MARKET_ID
+    )
+    await conn.execute(
+        '''
+        INSERT INTO "Vote" ("marketId", "walletAddress", choice, amount)
+        SELECT $1, 'bench-wallet-' || w, CASE WHEN w % 2 = 0 THEN 'YES' ELSE 'NO' END, 1000000 + w
+        FROM generate_series(1, $2) AS w
+        ''',
+        MARKET_ID,
+        POSITIONS
+    )
+
+async def reset(conn: asyncpg.Connection):
+    await conn.execute('DELETE FROM "Settlement" WHERE "marketId" = $1', MARKET_ID)
+    await conn.execute('UPDATE "Market" SET status = \'CLOSED\', winner = NULL WHERE "marketId" = $1', MARKET_ID)
+
+async def main():
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ ERROR: DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        await seed(conn)
+        print(f"{POSITIONS} positions, {POSITIONS // 2} winners")
+        print(f"{'batch':>6} {'txs':>6} {'seconds':>8} {'winners/sec':>12}")
+        for batch_size in BATCH_SIZES:
+            await reset(conn)
+            chain = StandInChain()
+            started = time.perf_counter()
+            summary = await SettlementService(chain, batch_size=batch_size).settle_market(conn, MARKET_ID, "YES")
+            elapsed = time.perf_counter() - started
+            print(f"{batch_size:>6} {chain.transactions:>6} {elapsed:>8.2f} {summary['paid_count'] / elapsed:>12.0f}")
+    finally:
+        await conn.execute('DELETE FROM "Market" WHERE "marketId" = $1', MARKET_ID)
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
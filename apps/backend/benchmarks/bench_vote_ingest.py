@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Sustained votes/sec and latency, synchronous vs write-behind ingestion
+
+Drives the place_vote handler from many concurrent voters through the
+application pool, first writing every vote in the request (sync) and then
+appending it to the Redis Stream for the vote writer (queued). Reports the
+acknowledged votes/sec with p50/p99 latency, and for queued mode also the
+rate at which the writer drained the stream into Postgres. Seeds temporary
+"bench-ingest-*" markets and removes them afterwards.
+
+Usage: DATABASE_URL=... REDIS_URL=... python3 benchmarks/bench_vote_ingest.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.v1 import predictions
+from app.models.prediction import VoteRequest
+from app.services import database
+from app.services import redis as redis_service
+from app.services.vote_queue import QUEUED, SYNC, STREAM, vote_queue
+
+MARKETS = 20
+VOTES = 20_000
+WALLETS = 5_000
+CONCURRENCY = 200
+
+async def seed():
+    async with database.acquire_connection() as conn:
+        await conn.execute('DELETE FROM "Market" WHERE "marketId" LIKE \'bench-ingest-%\'')
+        await conn.executemany(
+            '''
+            INSERT INTO "Market" ("marketId", question, "endDate", "contractAddress", "gnosisSafeAddress")
+            VALUES ($1, 'Ingestion benchmark', NOW() + INTERVAL '1 day', '0x0', '0x0')
+            ''',
+            [(f"bench-ingest-{i}",) for i in range(MARKETS)]
+        )
+
+async def run(label: str):
+    await seed()
+    remaining = iter(range(VOTES))
+    latencies = []
+
+    async def voter():
+        for index in remaining:
+            vote = VoteRequest(
+                market_id=f"bench-ingest-{index % MARKETS}",
+                choice="YES" if index % 3 else "NO",
+                amount=1 + index % 7,
+                wallet=f"bench-wallet-{index % WALLETS}"
+            )
+            started = time.perf_counter()
+            async with database.acquire_connection() as conn:
+                await predictions.place_vote(vote, conn)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    applied_before = vote_queue.applied
+    started = time.perf_counter()
+    await asyncio.gather(*(voter() for _ in range(CONCURRENCY)))
+    acked = time.perf_counter() - started
+    line = (
+        f"{label:>7} {VOTES / acked:>10.0f} {statistics.median(latencies):>9.2f} "
+        f"{statistics.quantiles(latencies, n=100)[98]:>9.2f}"
+    )
+    if vote_queue.enabled:
+        while vote_queue.applied - applied_before < VOTES:
+            await asyncio.sleep(0.01)
+        line += f" {VOTES / (time.perf_counter() - started):>12.0f}"
+    print(line)
+
+async def main():
+    if not os.getenv("DATABASE_URL") or not os.getenv("REDIS_URL"):
+        print("❌ ERROR: DATABASE_URL and REDIS_URL environment variables must be set")
+        sys.exit(1)
+
+    await redis_service.init_redis()
+    await database.init_db_pool()
+    if redis_service.redis_client is None or database.db_pool is None:
+        sys.exit(1)
+    try:
+        print(f"{'mode':>7} {'votes/sec':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'applied/sec':>12}")
+        vote_queue.mode = SYNC
+        await run(SYNC)
+
+        vote_queue.mode = QUEUED
+        await vote_queue.start()
+        await run(QUEUED)
+        await vote_queue.stop()
+        print(vote_queue.stats())
+    finally:
+        async with database.acquire_connection() as conn:
+            await conn.execute('DELETE FROM "Market" WHERE "marketId" LIKE \'bench-ingest-%\'')
+        await redis_service.redis_client.delete(STREAM)
+        await database.close_db_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Bytes-on-wire and server CPU per message for the WebSocket encodings
+
+Encodes a stream of market_update messages and protocol v2 ticks as JSON,
+permessage-deflate compressed JSON, MessagePack and compressed MessagePack.
+Compression mimics permessage-deflate with context takeover: one raw
+deflate stream per connection, flushed with Z_SYNC_FLUSH after each message
+and the trailing 00 00 ff ff removed.
+
+Usage: python3 benchmarks/bench_ws_encodings.py
+"""
+
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.frames import Frame
+from app.services.ticks import MarketTicker
+
+MESSAGES = 20_000
+
+def market_updates(count: int):
+    yes_pool, no_pool, total_bets = 525.0, 725.0, 120
+    for _ in range(count):
+        if random.random() < 0.5:
+            yes_pool += round(random.uniform(0.1, 5), 2)
+        else:
+            no_pool += round(random.uniform(0.1, 5), 2)
+        total_bets += 1
+        total_pool = yes_pool + no_pool
+        yield {
+            "type": "market_update",
+            "market_id": "eden-haus-hackathon",
+            "yes_pool": yes_pool,
+            "no_pool": no_pool,
+            "total_pool": total_pool,
+            "yes_percent": round(yes_pool / total_pool * 100, 1),
+            "no_percent": round(no_pool / total_pool * 100, 1),
+            "total_bets": total_bets,
+            "status": "ACTIVE",
+            "vote": {"choice": "YES", "amount": 2.5, "wallet": "0x8ba1f109551bD432803012645Ac136ddd64DBA72"},
+        }
+
+def deflate_stream():
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def compress(payload: bytes) -> bytes:
+        return (compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+    return compress
+
+def measure(messages, encode) -> tuple:
+    started = time.process_time()
+    total_bytes = sum(len(encode(message)) for message in messages)
+    cpu_us = (time.process_time() - started) / len(messages) * 1_000_000
+    return total_bytes / len(messages), cpu_us
+
+def report(title: str, messages):
+    json_deflate = deflate_stream()
+    msgpack_deflate = deflate_stream()
+    encoders = {
+        "json": lambda m: Frame(m).text.encode("utf-8"),
+        "json+deflate": lambda m: json_deflate(Frame(m).text.encode("utf-8")),
+        "msgpack": lambda m: Frame(m).binary,
+        "msgpack+deflate": lambda m: msgpack_deflate(Frame(m).binary),
+    }
+    print(f"\n{title}")
+    print(f"{'encoding':>16} {'bytes/msg':>10} {'cpu us/msg':>11}")
+    for name, encode in encoders.items():
+        size, cpu = measure(messages, encode)
+        print(f"{name:>16} {size:>10.1f} {cpu:>11.2f}")
+
+def main():
+    random.seed(7)
+    updates = list(market_updates(MESSAGES))
+    ticker = MarketTicker()
+    ticks = [tick for tick in (ticker.advance(u["market_id"], u) for u in updates) if tick]
+
+    report("Protocol 1: full market_update messages", updates)
+    report("Protocol 2: delta ticks", ticks)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Load test for the WebSocket fan-out path: publish -> broadcaster -> client
+
+Connects 1k/5k/10k simulated WebSocket clients to the shared broadcaster and
+measures end-to-end latency from PUBLISH until each client's send completes.
+Runs against an in-process Redis stand-in by default; pass --redis-url to
+publish through a real Redis server instead.
+
+Usage: python3 benchmarks/bench_ws_fanout.py [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import websocket as ws
+from app.services.broadcaster import MarketBroadcaster
+from app.services.snapshot_cache import MarketSnapshotCache
+from app.services.channels import market_channel
+
+CONNECTION_COUNTS = [1_000, 5_000, 10_000]
+MESSAGES = 20
+MARKET_ID = "bench-market"
+
+class StandInPubSub:
+    """Just enough of redis.asyncio.client.PubSub for the broadcaster"""
+
+    def __init__(self, server: "StandInRedis"):
+        self.server = server
+        self.patterns = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def psubscribe(self, *patterns):
+        for pattern in patterns:
+            self.patterns.add(pattern)
+            self.queue.put_nowait({"type": "psubscribe", "channel": pattern, "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        self.server.pubsubs.discard(self)
+
+class StandInRedis:
+    def __init__(self):
+        self.pubsubs = set()
+
+    def pubsub(self):
+        pubsub = StandInPubSub(self)
+        self.pubsubs.add(pubsub)
+        return pubsub
+
+    async def publish(self, channel: str, data: str):
+        for pubsub in self.pubsubs:
+            for pattern in pubsub.patterns:
+                if fnmatch.fnmatchcase(channel, pattern):
+                    pubsub.queue.put_nowait({"type": "pmessage", "pattern": pattern, "channel": channel, "data": data})
+
+class RecordingSocket:
+    """Stands in for a WebSocket and records delivery latency"""
+
+    def __init__(self, latencies: list):
+        self.latencies = latencies
+
+    async def send_json(self, data):
+        self.latencies.append(time.perf_counter() - data["sent_at"])
+
+    async def send_text(self, data):
+        self.latencies.append(time.perf_counter() - json.loads(data)["sent_at"])
+
+async def no_db(market_id: str):
+    return None
+
+async def run(connections: int, client) -> dict:
+    # Market snapshots come from the message itself, not PostgreSQL
+    hub = MarketBroadcaster(queue_size=MESSAGES, snapshots=MarketSnapshotCache(no_db))
+    await hub.start(client)
+    latencies: list = []
+    pumps = []
+    for _ in range(connections):
+        subscriber = await hub.subscribe(MARKET_ID)
+        pumps.append(asyncio.create_task(ws.pump_updates(RecordingSocket(latencies), subscriber)))
+
+    expected = connections * MESSAGES
+    started = time.perf_counter()
+    for seq in range(MESSAGES):
+        await client.publish(market_channel(MARKET_ID), json.dumps({"seq": seq, "sent_at": time.perf_counter()}))
+        await asyncio.sleep(0.005)
+    while len(latencies) < expected and time.perf_counter() - started < 30:
+        await asyncio.sleep(0.01)
+
+    for pump in pumps:
+        pump.cancel()
+    await asyncio.gather(*pumps, return_exceptions=True)
+    await hub.stop()
+
+    latencies.sort()
+    return {
+        "delivered": len(latencies),
+        "expected": expected,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="WebSocket fan-out latency benchmark")
+    parser.add_argument("--redis-url", help="Publish through a real Redis server")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis.asyncio as redis
+        client = redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        client = StandInRedis()
+
+    print(f"{'clients':>8} {'delivered':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for connections in CONNECTION_COUNTS:
+        result = await run(connections, client)
+        print(
+            f"{connections:>8} {result['delivered']:>6}/{result['expected']:<6}"
+            f"{result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} {result['max_ms']:>10.2f}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,14 +9,30 @@ load_dotenv()
 from app.api.v1 import x402, markets, bets, predictions
 from app.api.websocket import router as websocket_router
 from app.services.redis import init_redis
+from app.services.database import init_db_pool, close_db_pool, pool_metrics
+from app.services.broadcaster import broadcaster
+from app.services.vote_queue import vote_queue
+from app.services.market_cache import market_cache
+from app.services.pool_snapshots import snapshot_writer
+from app.core.rpc import close_rpc_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Sportsbook Backend starting...")
     await init_redis()
+    await init_db_pool()
+    await broadcaster.start()
+    await vote_queue.start()
+    await snapshot_writer.start()
     yield
     # Shutdown
+    await broadcaster.stop()
+    await vote_queue.stop()
+    await snapshot_writer.stop()
+    await bets.mint_pipeline.stop()
+    await close_db_pool()
+    await close_rpc_client()
     print("🛑 Backend shutdown")
 
 app = FastAPI(
@@ -83,6 +99,31 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool usage: size, in-use/idle connections and acquire waits"""
+    return pool_metrics()
+
+@app.get("/metrics/mint")
+async def mint_metrics():
+    """Position mint pipeline: queue depth, in-flight mints and submit latency"""
+    return bets.mint_pipeline.stats()
+
+@app.get("/metrics/votes")
+async def vote_metrics():
+    """Vote ingestion: mode, queued/applied votes, batch sizes and write-behind lag"""
+    return vote_queue.stats()
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Market read cache: L1/Redis hits, misses, coalesced loads and invalidations"""
+    return market_cache.stats()
+
+@app.get("/metrics/snapshots")
+async def snapshot_metrics():
+    """Pool snapshot writer: runs, runs skipped for another worker's lock and snapshots written"""
+    return snapshot_writer.stats()
+
 @app.get("/debug/cors")
 async def debug_cors():
     """Debug endpoint to check CORS configuration"""
@@ -0,0 +1,29 @@
+-- Denormalized Vote Count Migration
+-- Run this after 002_add_votes_table.sql
+--
+-- "Market"."totalBets" mirrors COUNT(*) FROM "Vote" per market so market
+-- reads no longer issue one COUNT query per row. The API increments it in
+-- the same transaction that inserts a new vote.
+
+BEGIN;
+
+ALTER TABLE "Market"
+    ADD COLUMN IF NOT EXISTS "totalBets" INTEGER NOT NULL DEFAULT 0 CHECK ("totalBets" >= 0);
+
+-- Backfill from existing votes
+UPDATE "Market" m
+SET "totalBets" = v.vote_count
+FROM (
+    SELECT "marketId", COUNT(*) AS vote_count
+    FROM "Vote"
+    GROUP BY "marketId"
+) v
+WHERE m."marketId" = v."marketId";
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT "marketId", "totalBets" FROM "Market" ORDER BY "createdAt" DESC;
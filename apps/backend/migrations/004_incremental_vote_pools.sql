@@ -0,0 +1,23 @@
+-- Incremental Pool Updates Migration
+-- Run this after 003_add_market_total_bets.sql
+--
+-- trigger_sync_market_pools re-summed every vote in a market on each vote
+-- write. The API now adjusts "yesPool"/"noPool" by the delta between the new
+-- and replaced vote in the same statement as the upsert, so the trigger is
+-- dropped. Drift can be checked with:
+--   python3 -m app.services.reconciliation [--fix]
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trigger_sync_market_pools ON "Vote";
+DROP FUNCTION IF EXISTS sync_market_pools();
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+-- Only the updatedAt trigger should remain on Vote
+SELECT tgname FROM pg_trigger
+WHERE tgrelid = '"Vote"'::regclass AND NOT tgisinternal;
@@ -0,0 +1,86 @@
+-- Settlement Checkpoints Migration
+-- Run this after 004_incremental_vote_pools.sql
+--
+-- SettlementService pays winners in batches (one payout transaction per
+-- batch). "Settlement" records the pools a market was settled against and
+-- how far through its winning votes settlement has got; "SettlementBatch"
+-- journals every batch before it is sent, so a restarted settlement resends
+-- unconfirmed batches (idempotent on-chain by batch number) instead of
+-- paying anyone twice.
+
+BEGIN;
+
+-- ============================================================================
+-- SETTLEMENT TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS "Settlement" (
+    "marketId" TEXT PRIMARY KEY,
+
+    winner TEXT NOT NULL CHECK (winner IN ('YES', 'NO')),
+    "totalPool" BIGINT NOT NULL CHECK ("totalPool" >= 0),
+    "winningPool" BIGINT NOT NULL CHECK ("winningPool" >= 0),
+
+    status TEXT DEFAULT 'IN_PROGRESS' CHECK (status IN ('IN_PROGRESS', 'COMPLETED')),
+
+    -- Highest "Vote".id included in a journaled batch (resume point)
+    "lastVoteId" TEXT,
+    "batchCount" INTEGER NOT NULL DEFAULT 0,
+    "paidCount" INTEGER NOT NULL DEFAULT 0,
+    "paidAmount" BIGINT NOT NULL DEFAULT 0,
+
+    "createdAt" TIMESTAMP DEFAULT NOW(),
+    "updatedAt" TIMESTAMP DEFAULT NOW(),
+    "completedAt" TIMESTAMP,
+
+    FOREIGN KEY ("marketId") REFERENCES "Market"("marketId") ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_settlement_status ON "Settlement"(status);
+
+CREATE TRIGGER update_settlement_updated_at BEFORE UPDATE ON "Settlement"
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- ============================================================================
+-- SETTLEMENT BATCH TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS "SettlementBatch" (
+    id TEXT PRIMARY KEY DEFAULT encode(gen_random_bytes(12), 'base64'),
+
+    "marketId" TEXT NOT NULL,
+    "batchNumber" INTEGER NOT NULL CHECK ("batchNumber" >= 1),
+
+    -- Winning votes in this batch: "marketId" + winner, id between these
+    "firstVoteId" TEXT NOT NULL,
+    "lastVoteId" TEXT NOT NULL,
+    "winnerCount" INTEGER NOT NULL CHECK ("winnerCount" > 0),
+    "totalAmount" BIGINT NOT NULL CHECK ("totalAmount" >= 0),
+
+    status TEXT DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'SENT')),
+    "txHash" TEXT,
+
+    "createdAt" TIMESTAMP DEFAULT NOW(),
+    "sentAt" TIMESTAMP,
+
+    FOREIGN KEY ("marketId") REFERENCES "Settlement"("marketId") ON DELETE CASCADE,
+    UNIQUE ("marketId", "batchNumber")
+);
+
+CREATE INDEX IF NOT EXISTS idx_settlementbatch_pending ON "SettlementBatch"("marketId") WHERE status = 'PENDING';
+
+-- ============================================================================
+-- VOTE INDEX FOR STREAMING WINNERS
+-- ============================================================================
+
+-- Keyset scans: WHERE "marketId" = $1 AND choice = $2 AND id > $3 ORDER BY id
+CREATE INDEX IF NOT EXISTS idx_vote_market_choice_id ON "Vote"("marketId", choice, id);
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT table_name FROM information_schema.tables
+WHERE table_schema = 'public' AND table_name IN ('Settlement', 'SettlementBatch');
@@ -0,0 +1,22 @@
+-- Settlement House Edge Migration
+-- Run this after 005_settlement_checkpoints.sql
+--
+-- The house fee (in basis points of the total pool) is recorded when
+-- settlement starts, so a resumed settlement pays the same amounts even if
+-- SETTLEMENT_HOUSE_EDGE_BPS changed in between.
+
+BEGIN;
+
+ALTER TABLE "Settlement"
+    ADD COLUMN IF NOT EXISTS "houseEdgeBps" INTEGER NOT NULL DEFAULT 0
+    CHECK ("houseEdgeBps" >= 0 AND "houseEdgeBps" <= 10000);
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT column_name, data_type, column_default
+FROM information_schema.columns
+WHERE table_name = 'Settlement' AND column_name = 'houseEdgeBps';
@@ -0,0 +1,50 @@
+-- Vote History Keyset Indexes Migration
+-- Run this after 006_settlement_house_edge.sql
+--
+-- The vote listings (/predictions/markets/{id}/votes and
+-- /predictions/users/{wallet}/votes) page by keyset on ("createdAt", "voteId")
+-- newest first. These indexes match that order per market and per wallet and
+-- carry the listed columns, so a page is a short index range scan (index-only
+-- once the visibility map is current) instead of a sort or an OFFSET walk.
+--
+-- On a large "Vote" table, create the indexes with CREATE INDEX CONCURRENTLY
+-- outside a transaction first; the IF NOT EXISTS below then skips them.
+
+BEGIN;
+
+-- ============================================================================
+-- KEYSET COLUMNS
+-- ============================================================================
+
+-- Row comparisons on ("createdAt", "voteId") skip NULLs, so the column the
+-- API always sets is made mandatory
+UPDATE "Vote" SET "createdAt" = COALESCE("updatedAt", NOW()) WHERE "createdAt" IS NULL;
+ALTER TABLE "Vote" ALTER COLUMN "createdAt" SET NOT NULL;
+
+-- ============================================================================
+-- INDEXES
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_vote_market_created
+    ON "Vote" ("marketId", "createdAt" DESC, "voteId" DESC)
+    INCLUDE ("walletAddress", choice, amount);
+
+CREATE INDEX IF NOT EXISTS idx_vote_wallet_created
+    ON "Vote" ("walletAddress", "createdAt" DESC, "voteId" DESC)
+    INCLUDE ("marketId", choice, amount, "updatedAt");
+
+-- Covered by the indexes above (and UNIQUE ("marketId", "walletAddress")),
+-- so they only cost extra writes on every vote
+DROP INDEX IF EXISTS idx_vote_marketId;
+DROP INDEX IF EXISTS idx_vote_wallet;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'Vote'
+ORDER BY indexname;
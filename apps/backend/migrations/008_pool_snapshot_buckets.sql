@@ -0,0 +1,99 @@
+-- Pool Snapshot Buckets Migration
+-- Run this after 007_vote_history_indexes.sql
+--
+-- services/pool_snapshots.py records a "PoolSnapshot" per open market when
+-- its pools change and rolls each one into "PoolSnapshotBucket": one row per
+-- market, resolution (bucket width in seconds) and bucket start, holding the
+-- YES percentage OHLC (tenths of a percent, as money.percent_tenths rounds)
+-- and the pools at the bucket's last snapshot. The odds-history endpoint
+-- (/predictions/markets/{id}/history) reads a range of buckets by primary
+-- key instead of scanning "Vote" or "PoolSnapshot".
+
+BEGIN;
+
+-- ============================================================================
+-- POOL SNAPSHOT BUCKETS TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS "PoolSnapshotBucket" (
+    "marketId" TEXT NOT NULL,
+    resolution INTEGER NOT NULL CHECK (resolution > 0),
+    "bucketStart" TIMESTAMP NOT NULL,
+
+    "yesOpen" INTEGER NOT NULL CHECK ("yesOpen" BETWEEN 0 AND 1000),
+    "yesHigh" INTEGER NOT NULL CHECK ("yesHigh" BETWEEN 0 AND 1000),
+    "yesLow" INTEGER NOT NULL CHECK ("yesLow" BETWEEN 0 AND 1000),
+    "yesClose" INTEGER NOT NULL CHECK ("yesClose" BETWEEN 0 AND 1000),
+
+    -- Pools at the last snapshot in the bucket
+    "yesPool" BIGINT NOT NULL CHECK ("yesPool" >= 0),
+    "noPool" BIGINT NOT NULL CHECK ("noPool" >= 0),
+    "totalBets" INTEGER NOT NULL CHECK ("totalBets" >= 0),
+    samples INTEGER NOT NULL DEFAULT 1 CHECK (samples > 0),
+
+    PRIMARY KEY ("marketId", resolution, "bucketStart"),
+    FOREIGN KEY ("marketId") REFERENCES "Market"("marketId") ON DELETE CASCADE
+);
+
+-- ============================================================================
+-- POOL SNAPSHOT INDEXES
+-- ============================================================================
+
+-- The writer compares each market with its latest snapshot
+CREATE INDEX IF NOT EXISTS idx_poolsnapshot_market_created
+    ON "PoolSnapshot" ("marketId", "createdAt" DESC);
+
+-- Covered by the index above
+DROP INDEX IF EXISTS idx_poolsnapshot_marketId;
+
+-- ============================================================================
+-- BACKFILL
+-- ============================================================================
+
+-- Roll up snapshots written before the writer existed (seed_data.py)
+-- at the resolutions in pool_snapshots.RESOLUTIONS
+INSERT INTO "PoolSnapshotBucket" (
+    "marketId", resolution, "bucketStart",
+    "yesOpen", "yesHigh", "yesLow", "yesClose",
+    "yesPool", "noPool", "totalBets", samples
+)
+SELECT
+    s."marketId",
+    r.resolution,
+    s."bucketStart",
+    (array_agg(s.yes ORDER BY s."createdAt"))[1],
+    MAX(s.yes),
+    MIN(s.yes),
+    (array_agg(s.yes ORDER BY s."createdAt" DESC))[1],
+    (array_agg(s."yesPool" ORDER BY s."createdAt" DESC))[1],
+    (array_agg(s."noPool" ORDER BY s."createdAt" DESC))[1],
+    (array_agg(s."totalBets" ORDER BY s."createdAt" DESC))[1],
+    COUNT(*)
+FROM (VALUES (60), (300), (3600), (86400)) AS r(resolution)
+CROSS JOIN LATERAL (
+    SELECT
+        ps."marketId",
+        ps."yesPool",
+        ps."noPool",
+        ps."totalBets",
+        ps."createdAt",
+        TIMESTAMP 'epoch' + FLOOR(EXTRACT(EPOCH FROM ps."createdAt") / r.resolution) * r.resolution * INTERVAL '1 second' AS "bucketStart",
+        CASE WHEN ps."yesPool" + ps."noPool" = 0 THEN 500
+             ELSE ((ps."yesPool" * 2000 + ps."yesPool" + ps."noPool") / (2 * (ps."yesPool" + ps."noPool")))::INTEGER
+        END AS yes
+    FROM "PoolSnapshot" ps
+    WHERE ps."createdAt" IS NOT NULL
+) s
+GROUP BY s."marketId", r.resolution, s."bucketStart"
+ON CONFLICT ("marketId", resolution, "bucketStart") DO NOTHING;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT resolution, COUNT(*) AS buckets, COUNT(DISTINCT "marketId") AS markets
+FROM "PoolSnapshotBucket"
+GROUP BY resolution
+ORDER BY resolution;
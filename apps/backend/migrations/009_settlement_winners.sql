@@ -0,0 +1,51 @@
+-- Settlement Winners Migration
+-- Run this after 008_pool_snapshot_buckets.sql
+--
+-- SettlementService used to stream winners straight from "Vote", so a vote
+-- changed or added after the market was resolved (the frontend writes "Vote"
+-- and "Market" directly) could be paid although it isn't in the pools the
+-- payouts were computed from. "SettlementWinner" is a copy of the winning
+-- votes taken in the same statement that records those pools; batches are
+-- journaled and paid from it.
+
+BEGIN;
+
+-- ============================================================================
+-- SETTLEMENT WINNER TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS "SettlementWinner" (
+    "marketId" TEXT NOT NULL,
+    -- "Vote".id of the winning vote; batches are ranges of it
+    "voteId" TEXT NOT NULL,
+    "walletAddress" TEXT NOT NULL,
+    amount BIGINT NOT NULL CHECK (amount >= 0),
+
+    PRIMARY KEY ("marketId", "voteId"),
+    FOREIGN KEY ("marketId") REFERENCES "Settlement"("marketId") ON DELETE CASCADE
+);
+
+-- ============================================================================
+-- BACKFILL
+-- ============================================================================
+
+-- Settlements interrupted before this migration resume from the votes as
+-- they are now, which is what they would have read anyway
+INSERT INTO "SettlementWinner" ("marketId", "voteId", "walletAddress", amount)
+SELECT v."marketId", v.id, v."walletAddress", v.amount
+FROM "Settlement" s
+JOIN "Vote" v ON v."marketId" = s."marketId" AND v.choice = s.winner
+WHERE s.status = 'IN_PROGRESS'
+ON CONFLICT ("marketId", "voteId") DO NOTHING;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT s."marketId", s.status, COUNT(w."voteId") AS winners
+FROM "Settlement" s
+LEFT JOIN "SettlementWinner" w ON w."marketId" = s."marketId"
+GROUP BY s."marketId", s.status
+ORDER BY s."marketId";
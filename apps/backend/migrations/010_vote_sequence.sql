@@ -0,0 +1,27 @@
+-- Vote Sequence Migration
+-- Run this after 009_settlement_winners.sql
+--
+-- The queued vote writer (services/vote_queue.py) applies stream entries at
+-- least once, so an old entry can be written again after a newer vote from
+-- the same wallet. "seq" records when the stored vote was accepted
+-- (microseconds since the epoch, see votes.vote_seq); the vote upserts only
+-- replace a row with an older seq and leave the pools alone otherwise.
+
+BEGIN;
+
+-- ============================================================================
+-- VOTE SEQUENCE COLUMN
+-- ============================================================================
+
+-- Existing votes (and rows written without one) sort before every new vote
+ALTER TABLE "Vote" ADD COLUMN IF NOT EXISTS seq BIGINT NOT NULL DEFAULT 0;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT column_name, data_type, column_default
+FROM information_schema.columns
+WHERE table_name = 'Vote' AND column_name = 'seq';
@@ -0,0 +1,40 @@
+-- Market Version Migration
+-- Run this after 010_vote_sequence.sql
+--
+-- GET /predictions/markets/{id} tags its response with the market's version.
+-- The version used to live in Redis and was only bumped by the backend, so
+-- the frontend's direct "Market" updates (resolve, bet confirmation) left
+-- clients holding a stale body that still matched its ETag. The version is
+-- now a column every UPDATE bumps, whoever runs it.
+
+BEGIN;
+
+-- ============================================================================
+-- MARKET VERSION COLUMN
+-- ============================================================================
+
+ALTER TABLE "Market" ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+-- ============================================================================
+-- FUNCTIONS & TRIGGERS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION bump_market_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version = OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bump_market_version ON "Market";
+CREATE TRIGGER bump_market_version BEFORE UPDATE ON "Market"
+    FOR EACH ROW EXECUTE FUNCTION bump_market_version();
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT "marketId", version FROM "Market" ORDER BY "marketId";
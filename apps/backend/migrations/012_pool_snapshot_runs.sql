@@ -0,0 +1,27 @@
+-- Pool Snapshot Runs Migration
+-- Run this after 011_market_version.sql
+--
+-- Every worker runs the snapshot writer (services/pool_snapshots.py). The
+-- time of the last full run ("any change at all") used to be kept in each
+-- worker's memory, so a full run happened once per interval per worker.
+-- It is now recorded here, in the same transaction as the snapshots it
+-- wrote, and claimed under the writer's advisory lock.
+
+BEGIN;
+
+-- ============================================================================
+-- POOL SNAPSHOT RUN TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS "PoolSnapshotRun" (
+    name TEXT PRIMARY KEY,
+    "lastRunAt" TIMESTAMP NOT NULL
+);
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT name, "lastRunAt" FROM "PoolSnapshotRun" ORDER BY name;
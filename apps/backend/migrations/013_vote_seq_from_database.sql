@@ -0,0 +1,32 @@
+-- Vote Sequence From Database Migration
+-- Run this after 012_pool_snapshot_runs.sql
+--
+-- "Vote".seq (010_vote_sequence.sql) was each API server's wall-clock time,
+-- so a host whose clock ran behind could have a newer vote dropped as
+-- older. Sequence numbers now come from one Postgres sequence: taken when
+-- a queued vote is accepted (votes.next_vote_seq) or, for direct writes,
+-- when the upsert runs.
+
+BEGIN;
+
+-- ============================================================================
+-- VOTE SEQUENCE
+-- ============================================================================
+
+CREATE SEQUENCE IF NOT EXISTS vote_seq AS BIGINT;
+
+-- Continue above every seq stored so far and every clock-based seq still
+-- queued; the minute of slack covers hosts whose clocks ran a little ahead
+SELECT setval('vote_seq', GREATEST(
+    (SELECT last_value FROM vote_seq),
+    COALESCE((SELECT MAX(seq) FROM "Vote"), 0),
+    (EXTRACT(EPOCH FROM clock_timestamp()) * 1000000)::bigint + 60000000
+));
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT last_value FROM vote_seq;
@@ -0,0 +1,21 @@
+-- Drop Vote Winner Index Migration
+-- Run this after 013_vote_seq_from_database.sql
+--
+-- idx_vote_market_choice_id (005_settlement_checkpoints.sql) served the
+-- keyset scans that streamed winners straight from "Vote". Since
+-- 009_settlement_winners.sql settlement pages through "SettlementWinner"
+-- instead, and the one-off copy of a market's winning votes is covered by
+-- idx_vote_market_created, so every vote write was maintaining an index
+-- nothing reads.
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_vote_market_choice_id;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT indexname FROM pg_indexes WHERE tablename = 'Vote' ORDER BY indexname;
@@ -0,0 +1,54 @@
+-- Vote Delete Pool Deltas Migration
+-- Run this after 014_drop_vote_winner_index.sql
+--
+-- 004_incremental_vote_pools.sql dropped trigger_sync_market_pools because
+-- the vote upserts now move "yesPool"/"noPool"/"totalBets" themselves. That
+-- left deletes uncovered: a vote removed outside the API (admin cleanup, a
+-- cascade) kept counting in its market until reconciliation ran. This trigger
+-- only handles DELETE and subtracts each statement's removed votes once per
+-- market, so inserts and updates keep their single-statement deltas.
+
+BEGIN;
+
+-- ============================================================================
+-- FUNCTIONS & TRIGGERS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION subtract_deleted_votes()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Markets deleted in the same statement (ON DELETE CASCADE) are already
+    -- gone, so the join simply skips them
+    UPDATE "Market" m
+    SET
+        "yesPool" = GREATEST(m."yesPool" - d.yes_total, 0),
+        "noPool" = GREATEST(m."noPool" - d.no_total, 0),
+        "totalBets" = GREATEST(m."totalBets" - d.vote_count, 0),
+        "updatedAt" = NOW()
+    FROM (
+        SELECT
+            "marketId",
+            COALESCE(SUM(amount) FILTER (WHERE choice = 'YES'), 0) AS yes_total,
+            COALESCE(SUM(amount) FILTER (WHERE choice = 'NO'), 0) AS no_total,
+            COUNT(*) AS vote_count
+        FROM deleted_votes
+        GROUP BY "marketId"
+    ) d
+    WHERE m."marketId" = d."marketId";
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS subtract_deleted_votes ON "Vote";
+CREATE TRIGGER subtract_deleted_votes AFTER DELETE ON "Vote"
+    REFERENCING OLD TABLE AS deleted_votes
+    FOR EACH STATEMENT EXECUTE FUNCTION subtract_deleted_votes();
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION
+-- ============================================================================
+
+SELECT tgname FROM pg_trigger
+WHERE tgrelid = '"Vote"'::regclass AND NOT tgisinternal;
@@ -40,6 +40,19 @@ def get_migration_files():
     migrations = [
         script_dir / "001_initial_schema.sql",
         script_dir / "002_add_votes_table.sql",
+        script_dir / "003_add_market_total_bets.sql",
+        script_dir / "004_incremental_vote_pools.sql",
+        script_dir / "005_settlement_checkpoints.sql",
+        script_dir / "006_settlement_house_edge.sql",
+        script_dir / "007_vote_history_indexes.sql",
+        script_dir / "008_pool_snapshot_buckets.sql",
+        script_dir / "009_settlement_winners.sql",
+        script_dir / "010_vote_sequence.sql",
+        script_dir / "011_market_version.sql",
+        script_dir / "012_pool_snapshot_runs.sql",
+        script_dir / "013_vote_seq_from_database.sql",
+        script_dir / "014_drop_vote_winner_index.sql",
+        script_dir / "015_vote_delete_pool_deltas.sql",
     ]
     return migrations
 
@@ -42,6 +42,136 @@ fi
 
 echo "✅ Migration 002_add_votes_table.sql completed"
 echo ""
+echo "📝 Running migration: 003_add_market_total_bets.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/003_add_market_total_bets.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 003_add_market_total_bets.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 003_add_market_total_bets.sql completed"
+echo ""
+echo "📝 Running migration: 004_incremental_vote_pools.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/004_incremental_vote_pools.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 004_incremental_vote_pools.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 004_incremental_vote_pools.sql completed"
+echo ""
+echo "📝 Running migration: 005_settlement_checkpoints.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/005_settlement_checkpoints.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 005_settlement_checkpoints.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 005_settlement_checkpoints.sql completed"
+echo ""
+echo "📝 Running migration: 006_settlement_house_edge.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/006_settlement_house_edge.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 006_settlement_house_edge.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 006_settlement_house_edge.sql completed"
+echo ""
+echo "📝 Running migration: 007_vote_history_indexes.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/007_vote_history_indexes.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 007_vote_history_indexes.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 007_vote_history_indexes.sql completed"
+echo ""
+echo "📝 Running migration: 008_pool_snapshot_buckets.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/008_pool_snapshot_buckets.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 008_pool_snapshot_buckets.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 008_pool_snapshot_buckets.sql completed"
+
+echo "📝 Running migration: 009_settlement_winners.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/009_settlement_winners.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 009_settlement_winners.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 009_settlement_winners.sql completed"
+
+echo "📝 Running migration: 010_vote_sequence.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/010_vote_sequence.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 010_vote_sequence.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 010_vote_sequence.sql completed"
+
+echo "📝 Running migration: 011_market_version.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/011_market_version.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 011_market_version.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 011_market_version.sql completed"
+
+echo "📝 Running migration: 012_pool_snapshot_runs.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/012_pool_snapshot_runs.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 012_pool_snapshot_runs.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 012_pool_snapshot_runs.sql completed"
+
+echo "📝 Running migration: 013_vote_seq_from_database.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/013_vote_seq_from_database.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 013_vote_seq_from_database.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 013_vote_seq_from_database.sql completed"
+
+echo "📝 Running migration: 014_drop_vote_winner_index.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/014_drop_vote_winner_index.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 014_drop_vote_winner_index.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 014_drop_vote_winner_index.sql completed"
+
+echo "📝 Running migration: 015_vote_delete_pool_deltas.sql"
+psql "$DATABASE_URL" < "$SCRIPT_DIR/015_vote_delete_pool_deltas.sql"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Migration 015_vote_delete_pool_deltas.sql failed!"
+    exit 1
+fi
+
+echo "✅ Migration 015_vote_delete_pool_deltas.sql completed"
+echo ""
 echo "✅ All migrations completed successfully!"
 echo ""
 echo "🎉 Database is ready to use"